@@ -17,6 +17,9 @@ public:
     Image& operator=(Image&& other) noexcept;
     ~Image() = default;
     
+    // shares the buffer of `mat` instead of cloning it (e.g. memory owned by numpy)
+    static Image wrap(const cv::Mat& mat);
+    
     // basic properties
     int width() const;
     int height() const;
@@ -26,6 +26,7 @@ public:
     Image rotate(const Image& input, double angle, const cv::Point2f& center = cv::Point2f(-1, -1));
     Image flip(const Image& input, int flip_code);
     Image affineTransform(const Image& input, const cv::Mat& transform_matrix);
+    Image affineTransform(const Image& input, const cv::Mat& transform_matrix, const cv::Size& output_size);
     
     Image convertColorSpace(const Image& input, int code);
 
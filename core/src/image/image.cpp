@@ -30,6 +30,12 @@ Image& Image::operator=(Image&& other) noexcept {
     return *this;
 }
 
+Image Image::wrap(const cv::Mat& mat) {
+    Image image;
+    image.data_ = mat;
+    return image;
+}
+
 int Image::width() const {
     return data_.cols;
 }
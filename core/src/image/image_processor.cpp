@@ -92,22 +92,23 @@ Image ImageProcessor::gaussianBlur(const Image& input, double sigma_x, double si
 
 Image ImageProcessor::unsharpMask(const Image& input, double sigma, double strength, double threshold) {
     Image blurred = gaussianBlur(input, sigma);
-    Image result = input.clone();
-    cv::Mat& original = result.data();
-    const cv::Mat& blur = blurred.data();
     
-    cv::Mat mask;
+    // float mask: with 8/16-bit data the subtraction would clamp negative values to 0
+    cv::Mat original, blur, mask;
+    input.data().convertTo(original, CV_32F);
+    blurred.data().convertTo(blur, CV_32F);
     cv::subtract(original, blur, mask);
     
     if (threshold > 0.0) {
         cv::Mat thresh_mask;
         cv::threshold(cv::abs(mask), thresh_mask, threshold, 1.0, cv::THRESH_BINARY);
-        thresh_mask.convertTo(thresh_mask, mask.type());
         cv::multiply(mask, thresh_mask, mask);
     }
     
     cv::addWeighted(original, 1.0, mask, strength, 0.0, original);
     
+    Image result;
+    original.convertTo(result.data(), input.data().depth());
     return result;
 }
 
@@ -168,6 +169,13 @@ Image ImageProcessor::affineTransform(const Image& input, const cv::Mat& transfo
     return result;
 }
 
+Image ImageProcessor::affineTransform(const Image& input, const cv::Mat& transform_matrix,
+                                      const cv::Size& output_size) {
+    Image result;
+    cv::warpAffine(input.data(), result.data(), transform_matrix, output_size);
+    return result;
+}
+
 Image ImageProcessor::convertColorSpace(const Image& input, int code) {
     Image result;
     cv::cvtColor(input.data(), result.data(), code);
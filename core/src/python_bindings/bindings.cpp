@@ -0,0 +1,223 @@
+#include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+#include <pybind11/stl.h>
+
+#include "bettergimp/core.hpp"
+#include "bettergimp/image/image_processor.hpp"
+
+#include <utility>
+
+namespace py = pybind11;
+
+using bettergimp::Image;
+using bettergimp::ImageProcessor;
+
+namespace {
+
+int depthOf(const py::array& array) {
+    if (py::isinstance<py::array_t<uint8_t>>(array)) {
+        return CV_8U;
+    }
+    if (py::isinstance<py::array_t<uint16_t>>(array)) {
+        return CV_16U;
+    }
+    if (py::isinstance<py::array_t<float>>(array)) {
+        return CV_32F;
+    }
+    throw py::type_error("Unsupported dtype: expected uint8, uint16 or float32");
+}
+
+int channelsOf(const py::array& array) {
+    if (array.ndim() == 2) {
+        return 1;
+    }
+    if (array.ndim() == 3 && array.shape(2) >= 1 && array.shape(2) <= 4) {
+        return static_cast<int>(array.shape(2));
+    }
+    throw py::value_error("Expected an (H, W) or (H, W, C) array with 1 to 4 channels");
+}
+
+// cv::Mat only supports a row stride: pixels within a row must be packed
+bool hasPackedRows(const py::array& array, int channels) {
+    const auto itemsize = array.itemsize();
+    return array.strides(0) > 0
+        && array.strides(1) == itemsize * channels
+        && (array.ndim() == 2 || array.strides(2) == itemsize);
+}
+
+// View over the numpy buffer, without copying. Tiles cut from a larger array
+// (row stride wider than the row) are wrapped as-is.
+Image wrapArray(const py::array& array, int channels) {
+    cv::Mat view(
+        static_cast<int>(array.shape(0)),
+        static_cast<int>(array.shape(1)),
+        CV_MAKETYPE(depthOf(array), channels),
+        const_cast<void*>(array.data()),
+        static_cast<size_t>(array.strides(0))
+    );
+    return Image::wrap(view);
+}
+
+py::dtype dtypeOf(int depth) {
+    switch (depth) {
+        case CV_8U: return py::dtype::of<uint8_t>();
+        case CV_16U: return py::dtype::of<uint16_t>();
+        case CV_32F: return py::dtype::of<float>();
+        default: throw py::type_error("Unsupported result depth");
+    }
+}
+
+// Hands the result buffer over to numpy: the capsule keeps the cv::Mat (and its
+// reference-counted data) alive as long as the array exists
+py::array toArray(Image&& image, bool squeeze) {
+    auto* mat = new cv::Mat(std::move(image.data()));
+    py::capsule owner(mat, [](void* pointer) { delete static_cast<cv::Mat*>(pointer); });
+
+    const auto rows = static_cast<py::ssize_t>(mat->rows);
+    const auto cols = static_cast<py::ssize_t>(mat->cols);
+    const auto element = static_cast<py::ssize_t>(mat->elemSize());
+    const auto row_step = static_cast<py::ssize_t>(mat->step[0]);
+
+    if (squeeze && mat->channels() == 1) {
+        return py::array(dtypeOf(mat->depth()), {rows, cols}, {row_step, element}, mat->data, owner);
+    }
+    return py::array(
+        dtypeOf(mat->depth()),
+        {rows, cols, static_cast<py::ssize_t>(mat->channels())},
+        {row_step, element, static_cast<py::ssize_t>(mat->elemSize1())},
+        mat->data,
+        owner
+    );
+}
+
+// Runs `operation` on a view of `array` with the GIL released, so several
+// Python threads can process images in parallel
+template <typename Operation>
+py::array apply(const py::array& array, Operation&& operation) {
+    const int channels = channelsOf(array);
+    const py::array input = hasPackedRows(array, channels)
+        ? array
+        : py::array::ensure(array, py::array::c_style);
+
+    Image view = wrapArray(input, channels);
+    Image result;
+    {
+        py::gil_scoped_release release;
+        result = operation(view);
+    }
+    return toArray(std::move(result), array.ndim() == 2);
+}
+
+cv::Mat affineMatrix(const py::array_t<double, py::array::c_style | py::array::forcecast>& matrix) {
+    if (matrix.ndim() != 2 || matrix.shape(0) != 2 || matrix.shape(1) != 3) {
+        throw py::value_error("Expected a 2x3 affine matrix");
+    }
+    return cv::Mat(2, 3, CV_64F, const_cast<double*>(matrix.data())).clone();
+}
+
+}
+
+PYBIND11_MODULE(bettergimp_py, m) {
+    m.doc() = "Better GIMP C++ core: numpy arrays in and out without copies";
+
+    m.def("getVersion", &bettergimp::getVersion);
+    m.def("initialize", &bettergimp::initialize, py::arg("num_threads") = 0);
+    m.def("cleanup", &bettergimp::cleanup);
+    m.def("isSimdAvailable", &bettergimp::isSimdAvailable);
+
+    py::class_<ImageProcessor>(m, "ImageProcessor")
+        .def(py::init<>())
+
+        .def("adjustBrightness", [](ImageProcessor& self, const py::array& image, double brightness) {
+            return apply(image, [&](const Image& view) { return self.adjustBrightness(view, brightness); });
+        }, py::arg("image"), py::arg("brightness"))
+        .def("adjustContrast", [](ImageProcessor& self, const py::array& image, double contrast) {
+            return apply(image, [&](const Image& view) { return self.adjustContrast(view, contrast); });
+        }, py::arg("image"), py::arg("contrast"))
+        .def("adjustBrightnessContrast", [](ImageProcessor& self, const py::array& image, double brightness, double contrast) {
+            return apply(image, [&](const Image& view) { return self.adjustBrightnessContrast(view, brightness, contrast); });
+        }, py::arg("image"), py::arg("brightness"), py::arg("contrast"))
+        .def("adjustSaturation", [](ImageProcessor& self, const py::array& image, double saturation) {
+            return apply(image, [&](const Image& view) { return self.adjustSaturation(view, saturation); });
+        }, py::arg("image"), py::arg("saturation"))
+        .def("adjustHue", [](ImageProcessor& self, const py::array& image, double hue_shift) {
+            return apply(image, [&](const Image& view) { return self.adjustHue(view, hue_shift); });
+        }, py::arg("image"), py::arg("hue_shift"))
+
+        .def("gaussianBlur", [](ImageProcessor& self, const py::array& image, double sigma_x, double sigma_y) {
+            return apply(image, [&](const Image& view) { return self.gaussianBlur(view, sigma_x, sigma_y); });
+        }, py::arg("image"), py::arg("sigma_x"), py::arg("sigma_y") = 0.0)
+        .def("unsharpMask", [](ImageProcessor& self, const py::array& image, double sigma, double strength, double threshold) {
+            return apply(image, [&](const Image& view) { return self.unsharpMask(view, sigma, strength, threshold); });
+        }, py::arg("image"), py::arg("sigma"), py::arg("strength"), py::arg("threshold") = 0.0)
+        .def("medianBlur", [](ImageProcessor& self, const py::array& image, int kernel_size) {
+            return apply(image, [&](const Image& view) { return self.medianBlur(view, kernel_size); });
+        }, py::arg("image"), py::arg("kernel_size"))
+        .def("bilateralFilter", [](ImageProcessor& self, const py::array& image, int d, double sigma_color, double sigma_space) {
+            return apply(image, [&](const Image& view) { return self.bilateralFilter(view, d, sigma_color, sigma_space); });
+        }, py::arg("image"), py::arg("d"), py::arg("sigma_color"), py::arg("sigma_space"))
+
+        .def("resize", [](ImageProcessor& self, const py::array& image, int width, int height, int interpolation) {
+            return apply(image, [&](const Image& view) { return self.resize(view, width, height, interpolation); });
+        }, py::arg("image"), py::arg("width"), py::arg("height"), py::arg("interpolation") = static_cast<int>(cv::INTER_LINEAR))
+        .def("resizeBicubic", [](ImageProcessor& self, const py::array& image, int width, int height) {
+            return apply(image, [&](const Image& view) { return self.resizeBicubic(view, width, height); });
+        }, py::arg("image"), py::arg("width"), py::arg("height"))
+        .def("resizeLanczos", [](ImageProcessor& self, const py::array& image, int width, int height) {
+            return apply(image, [&](const Image& view) { return self.resizeLanczos(view, width, height); });
+        }, py::arg("image"), py::arg("width"), py::arg("height"))
+        .def("rotate", [](ImageProcessor& self, const py::array& image, double angle, std::pair<float, float> center) {
+            return apply(image, [&](const Image& view) {
+                return self.rotate(view, angle, cv::Point2f(center.first, center.second));
+            });
+        }, py::arg("image"), py::arg("angle"), py::arg("center") = std::make_pair(-1.0f, -1.0f))
+        .def("flip", [](ImageProcessor& self, const py::array& image, int flip_code) {
+            return apply(image, [&](const Image& view) { return self.flip(view, flip_code); });
+        }, py::arg("image"), py::arg("flip_code"))
+        .def("affineTransform", [](ImageProcessor& self, const py::array& image,
+                                   const py::array_t<double, py::array::c_style | py::array::forcecast>& matrix,
+                                   int width, int height) {
+            cv::Mat transform = affineMatrix(matrix);
+            return apply(image, [&](const Image& view) {
+                if (width <= 0 || height <= 0) {
+                    return self.affineTransform(view, transform);
+                }
+                return self.affineTransform(view, transform, cv::Size(width, height));
+            });
+        }, py::arg("image"), py::arg("matrix"), py::arg("width") = 0, py::arg("height") = 0)
+        .def("convertColorSpace", [](ImageProcessor& self, const py::array& image, int code) {
+            return apply(image, [&](const Image& view) { return self.convertColorSpace(view, code); });
+        }, py::arg("image"), py::arg("code"))
+
+        .def("adjustCurves", [](ImageProcessor& self, const py::array& image, const std::vector<std::pair<float, float>>& points) {
+            std::vector<cv::Point2f> curve_points;
+            curve_points.reserve(points.size());
+            for (const auto& point : points) {
+                curve_points.emplace_back(point.first, point.second);
+            }
+            return apply(image, [&](const Image& view) { return self.adjustCurves(view, curve_points); });
+        }, py::arg("image"), py::arg("points"))
+        .def("adjustLevels", [](ImageProcessor& self, const py::array& image, double input_min, double input_max,
+                                double gamma, double output_min, double output_max) {
+            return apply(image, [&](const Image& view) {
+                return self.adjustLevels(view, input_min, input_max, gamma, output_min, output_max);
+            });
+        }, py::arg("image"), py::arg("input_min"), py::arg("input_max"), py::arg("gamma"),
+           py::arg("output_min"), py::arg("output_max"))
+        .def("autoLevels", [](ImageProcessor& self, const py::array& image) {
+            return apply(image, [&](const Image& view) { return self.autoLevels(view); });
+        }, py::arg("image"))
+        .def("autoContrast", [](ImageProcessor& self, const py::array& image) {
+            return apply(image, [&](const Image& view) { return self.autoContrast(view); });
+        }, py::arg("image"))
+
+        .def("supportedFormat", &ImageProcessor::supportedFormat, py::arg("extension"))
+        .def("getSupportedFormats", &ImageProcessor::getSupportedFormats)
+        .def_static("calculateOptimalSize", [](std::pair<int, int> size, int max_dimension) {
+            cv::Size optimal = ImageProcessor::calculateOptimalSize(cv::Size(size.first, size.second), max_dimension);
+            return std::make_pair(optimal.width, optimal.height);
+        }, py::arg("size"), py::arg("max_dimension"))
+        .def_static("calculateOptimalSigma", [](std::pair<int, int> size) {
+            return ImageProcessor::calculateOptimalSigma(cv::Size(size.first, size.second));
+        }, py::arg("size"));
+}
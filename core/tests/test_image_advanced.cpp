@@ -81,6 +81,33 @@ TEST_F(ImageAdvancedTest, AdvancedFiltering) {
     EXPECT_EQ(bilateral.height(), test_image.height());
 }
 
+TEST_F(ImageAdvancedTest, UnsharpMaskBothSidesOfEdge) {
+    bettergimp::Image edge(100, 100, CV_8UC1);
+    edge.data() = cv::Scalar(100);
+    edge.data()(cv::Rect(50, 0, 50, 100)) = cv::Scalar(150);
+    
+    bettergimp::Image sharpened = processor.unsharpMask(edge, 2.0, 1.0);
+    EXPECT_EQ(sharpened.type(), edge.type());
+    // overshoot on the bright side, undershoot on the dark side
+    EXPECT_GT(sharpened.data().at<uchar>(50, 50), 150);
+    EXPECT_LT(sharpened.data().at<uchar>(50, 49), 100);
+}
+
+TEST_F(ImageAdvancedTest, WrapSharesBuffer) {
+    cv::Mat buffer(10, 20, CV_8UC3, cv::Scalar(1, 2, 3));
+    bettergimp::Image wrapped = bettergimp::Image::wrap(buffer);
+    EXPECT_EQ(wrapped.data().data, buffer.data);
+    
+    // rows of a larger buffer (non-continuous view) are wrapped as well
+    bettergimp::Image region = bettergimp::Image::wrap(buffer(cv::Rect(5, 2, 10, 5)));
+    EXPECT_EQ(region.width(), 10);
+    EXPECT_EQ(region.data().step, buffer.step);
+    
+    bettergimp::Image blurred = processor.gaussianBlur(region, 1.0);
+    EXPECT_EQ(blurred.width(), 10);
+    EXPECT_EQ(blurred.height(), 5);
+}
+
 TEST_F(ImageAdvancedTest, GeometricTransforms) {
     // Test bicubic resize
     bettergimp::Image bicubic = processor.resizeBicubic(test_image, 200, 200);
@@ -92,6 +119,12 @@ TEST_F(ImageAdvancedTest, GeometricTransforms) {
     EXPECT_EQ(lanczos.width(), 50);
     EXPECT_EQ(lanczos.height(), 50);
     
+    // Test affine transform into a larger canvas
+    cv::Mat translation = (cv::Mat_<double>(2, 3) << 1, 0, 10, 0, 1, 20);
+    bettergimp::Image moved = processor.affineTransform(test_image, translation, cv::Size(120, 130));
+    EXPECT_EQ(moved.width(), 120);
+    EXPECT_EQ(moved.height(), 130);
+    
     // Test flip
     bettergimp::Image flipped = processor.flip(test_image, 1); // Horizontal flip
     EXPECT_EQ(flipped.width(), test_image.width());
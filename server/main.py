@@ -4,6 +4,7 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -11,7 +12,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from api.router import api_router
-from models.database import engine, Base
+from src.models.database import engine, get_effective_settings
+from src.models.migrations import run_migrations
+from src.services.project_stats import run_stats_reconciler
+from src.services.executor import processing_executor
+from src.services.job_service import job_manager
+from src.services.core_service import core_service
 
 
 @asynccontextmanager
@@ -20,17 +26,41 @@ async def lifespan(app: FastAPI):
     print("démarrage du serveur...")
     
     try:
-        Base.metadata.create_all(bind=engine)
+        await run_migrations()
         print("✅ Base de données initialisée")
+        
+        settings = await get_effective_settings()
+        pragmas = ", ".join(f"{name}={value}" for name, value in settings["pragmas"].items())
+        print(f"✅ Profil base de données '{settings['profile']}': {pragmas}")
+        print(
+            f"   pool={settings['pool']['size']}+{settings['pool']['max_overflow']}, "
+            f"statement_cache={settings['statement_cache_size']}, "
+            f"query_cache={settings['query_cache_size']}"
+        )
     except Exception as e:
         print(f"❌ Erreur lors de l'initialisation de la DB: {e}")
         raise
     
+    stats_reconciler = asyncio.create_task(run_stats_reconciler())
+    await job_manager.start()
+    print("✅ File de tâches démarrée")
+
+    backend_autotune = None
+    if core_service.backends.needs_benchmark():
+        backend_autotune = asyncio.create_task(core_service.backends.autotune())
+        print("⏱️ Calibration des implémentations en arrière-plan")
+    
     print("✅ Serveur prêt!")
     
     yield
     
     print("🛑 Arrêt du serveur...")
+    stats_reconciler.cancel()
+    if backend_autotune:
+        backend_autotune.cancel()
+    await job_manager.stop()
+    processing_executor.shutdown()
+    await engine.dispose()
     print("✅ Nettoyage terminé")
 
 
@@ -51,6 +81,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
     
     app.include_router(api_router, prefix="/api")
@@ -1,66 +1,134 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable, List, Literal
 import io
+import time
 import numpy as np
-from PIL import Image
 import logging
 
 from src.services.core_service import core_service
+from src.services.executor import processing_executor
+from src.services.decode_cache import decode_cache
+from src.services.result_cache import result_cache
 from src.services.image_service import ImageService
+from src.services.batch_service import BatchService, BATCH_CONCURRENCY, BATCH_MAX_IMAGES, summarize, missing_items
+from src.models.image import Image as ImageModel, ImageProcess, ProcessingOperation
+from src.models.database import ProjectDB
+from src.services.pipeline_service import parse_steps, scale_steps, optimize_steps, run_pipeline
+from src.services.tone_service import parse_adjustment, apply_adjustments
+from src.services import codec
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/filters", tags=["Image Filters"])
 
-class GaussianBlurRequest(BaseModel):
+class FilterRequest(BaseModel):
     image_id: str = Field(..., description="ID de l'image à traiter")
-    sigma: float = Field(default=1.0, ge=0.1, le=10.0, description="Écart-type du flou gaussien")
+    viewport_width: Optional[int] = Field(None, gt=0, le=8192, description="Largeur d'affichage: active le mode proxy")
+    viewport_height: Optional[int] = Field(None, gt=0, le=8192, description="Hauteur d'affichage: active le mode proxy")
 
-class SharpenRequest(BaseModel):
-    image_id: str = Field(..., description="ID de l'image à traiter")
+class GaussianBlurRequest(FilterRequest):
+    sigma: float = Field(default=1.0, ge=0.1, le=200.0, description="Écart-type du flou gaussien")
+
+class SharpenRequest(FilterRequest):
     strength: float = Field(default=1.0, ge=0.0, le=3.0, description="Force du filtre de netteté")
 
-class BrightnessContrastRequest(BaseModel):
-    image_id: str = Field(..., description="ID de l'image à traiter")
+class BrightnessContrastRequest(FilterRequest):
     brightness: float = Field(default=0.0, ge=-100.0, le=100.0, description="Ajustement de luminosité")
     contrast: float = Field(default=1.0, ge=0.1, le=3.0, description="Facteur de contraste")
 
-class ResizeRequest(BaseModel):
-    image_id: str = Field(..., description="ID de l'image à traiter")
+class ResizeRequest(FilterRequest):
     width: int = Field(..., gt=0, le=8192, description="Nouvelle largeur")
     height: int = Field(..., gt=0, le=8192, description="Nouvelle hauteur")
     interpolation: str = Field(default="lanczos", description="Algorithme d'interpolation")
 
-class RotateRequest(BaseModel):
-    image_id: str = Field(..., description="ID de l'image à traiter")
+class RotateRequest(FilterRequest):
     angle: float = Field(..., ge=-360.0, le=360.0, description="Angle de rotation en degrés")
 
+Channel = Literal["all", "red", "green", "blue"]
+
+class LevelsRequest(FilterRequest):
+    input_min: float = Field(default=0.0, ge=0.0, le=255.0, description="Niveau d'entrée ramené au noir")
+    input_max: float = Field(default=255.0, ge=0.0, le=255.0, description="Niveau d'entrée ramené au blanc")
+    gamma: float = Field(default=1.0, ge=0.1, le=10.0, description="Exposant appliqué entre les bornes (>1 assombrit)")
+    output_min: float = Field(default=0.0, ge=0.0, le=255.0, description="Niveau de sortie du noir")
+    output_max: float = Field(default=255.0, ge=0.0, le=255.0, description="Niveau de sortie du blanc")
+    channel: Channel = Field(default="all", description="Canal ajusté")
+
+class GammaRequest(FilterRequest):
+    gamma: float = Field(default=1.0, ge=0.1, le=10.0, description="Exposant (>1 assombrit)")
+    channel: Channel = Field(default="all", description="Canal ajusté")
+
+class CurvesRequest(FilterRequest):
+    points: List[Tuple[float, float]] = Field(..., min_length=2, description="Points [x, y] dans [0, 1]")
+    interpolation: Literal["linear", "smooth"] = Field(default="linear", description="Interpolation entre les points")
+    channel: Channel = Field(default="all", description="Canal ajusté")
+
+class ToneRequest(FilterRequest):
+    steps: List[ImageProcess] = Field(..., min_length=1, max_length=64, description="Ajustements ponctuels, dans l'ordre")
+
+class PipelineRequest(FilterRequest):
+    steps: List[ImageProcess] = Field(..., min_length=1, max_length=32, description="Opérations, dans l'ordre")
+    approximate: bool = Field(
+        False,
+        description="Autorise les réordonnancements approchés (réduction avant un flou gaussien): plus rapide, écart de l'ordre d'un niveau"
+    )
+
+class BatchRequest(BaseModel):
+    project_id: Optional[str] = Field(None, description="Traiter toutes les images du projet")
+    image_ids: Optional[List[str]] = Field(None, min_length=1, max_length=BATCH_MAX_IMAGES, description="Ou une liste d'images")
+    operation: ProcessingOperation = Field(..., description="Opération appliquée à chaque image")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de l'opération")
+    concurrency: int = Field(default=BATCH_CONCURRENCY, ge=1, le=32, description="Images traitées simultanément")
+
+class BackendOverrides(BaseModel):
+    overrides: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Implémentation imposée par opération ('resize') ou par opération, type et taille ('resize/uint8/large')"
+    )
+
+class BackendBenchmarkRequest(BaseModel):
+    operations: Optional[List[str]] = Field(None, min_length=1, description="Opérations à recalibrer (toutes par défaut)")
+
 @router.get("/core/info")
 async def get_core_info() -> Dict[str, Any]:
     return core_service.get_core_info()
 
+@router.put("/core/info")
+async def set_backend_overrides(request: BackendOverrides) -> Dict[str, Any]:
+    """Remplace les choix forcés; les autres cas suivent la table calibrée"""
+    try:
+        await run_in_threadpool(core_service.backends.set_overrides, request.overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return core_service.get_core_info()
+
+@router.post("/core/benchmark")
+async def run_backend_benchmark(request: Optional[BackendBenchmarkRequest] = None) -> Dict[str, Any]:
+    """Recalibre les implémentations (plusieurs secondes) et renvoie la nouvelle table"""
+    operations = request.operations if request else None
+    try:
+        await run_in_threadpool(core_service.backends.benchmark, operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return core_service.get_core_info()
+
 @router.post("/gaussian-blur")
 async def apply_gaussian_blur(
     request: GaussianBlurRequest,
     image_service: ImageService = Depends()
 ) -> StreamingResponse:
     try:
-        db_image = await image_service.get_image(request.image_id)
-        if not db_image:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_array = _bytes_to_numpy(db_image.data)
-        
-        filtered_array = core_service.apply_gaussian_blur(image_array, request.sigma)
-        
-        result_bytes = _numpy_to_bytes(filtered_array, db_image.format)
-        
-        return StreamingResponse(
-            io.BytesIO(result_bytes), 
-            media_type=f"image/{db_image.format.lower()}"
+        return await _render_filter(
+            image_service, request, "gaussian_blur",
+            lambda image_array, scale: processing_executor.run_core(
+                "apply_gaussian_blur", image_array, request.sigma * scale
+            )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error applying Gaussian blur: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,19 +139,15 @@ async def apply_sharpen_filter(
     image_service: ImageService = Depends()
 ) -> StreamingResponse:
     try:
-        db_image = await image_service.get_image(request.image_id)
-        if not db_image:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_array = _bytes_to_numpy(db_image.data)
-        filtered_array = core_service.apply_sharpen_filter(image_array, request.strength)
-        result_bytes = _numpy_to_bytes(filtered_array, db_image.format)
-        
-        return StreamingResponse(
-            io.BytesIO(result_bytes), 
-            media_type=f"image/{db_image.format.lower()}"
+        return await _render_filter(
+            image_service, request, "sharpen",
+            lambda image_array, scale: processing_executor.run_core(
+                "apply_sharpen_filter", image_array, request.strength, radius=scale
+            )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error applying sharpen filter: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -94,21 +158,15 @@ async def adjust_brightness_contrast(
     image_service: ImageService = Depends()
 ) -> StreamingResponse:
     try:
-        db_image = await image_service.get_image(request.image_id)
-        if not db_image:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_array = _bytes_to_numpy(db_image.data)
-        adjusted_array = core_service.adjust_brightness_contrast(
-            image_array, request.brightness, request.contrast
-        )
-        result_bytes = _numpy_to_bytes(adjusted_array, db_image.format)
-        
-        return StreamingResponse(
-            io.BytesIO(result_bytes), 
-            media_type=f"image/{db_image.format.lower()}"
+        return await _render_filter(
+            image_service, request, "brightness_contrast",
+            lambda image_array, scale: processing_executor.run_core(
+                "adjust_brightness_contrast", image_array, request.brightness, request.contrast
+            )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adjusting brightness/contrast: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -119,21 +177,19 @@ async def resize_image(
     image_service: ImageService = Depends()
 ) -> StreamingResponse:
     try:
-        db_image = await image_service.get_image(request.image_id)
-        if not db_image:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_array = _bytes_to_numpy(db_image.data)
-        resized_array = core_service.resize_image(
-            image_array, request.width, request.height, request.interpolation
-        )
-        result_bytes = _numpy_to_bytes(resized_array, db_image.format)
-        
-        return StreamingResponse(
-            io.BytesIO(result_bytes), 
-            media_type=f"image/{db_image.format.lower()}"
+        return await _render_filter(
+            image_service, request, "resize",
+            lambda image_array, scale: processing_executor.run_core(
+                "resize_image",
+                image_array,
+                max(1, round(request.width * scale)),
+                max(1, round(request.height * scale)),
+                request.interpolation
+            )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error resizing image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -144,47 +200,239 @@ async def rotate_image(
     image_service: ImageService = Depends()
 ) -> StreamingResponse:
     try:
-        db_image = await image_service.get_image(request.image_id)
-        if not db_image:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_array = _bytes_to_numpy(db_image.data)
-        rotated_array = core_service.rotate_image(image_array, request.angle)
-        result_bytes = _numpy_to_bytes(rotated_array, db_image.format)
-        
-        return StreamingResponse(
-            io.BytesIO(result_bytes), 
-            media_type=f"image/{db_image.format.lower()}"
+        return await _render_filter(
+            image_service, request, "rotate",
+            lambda image_array, scale: processing_executor.run_core("rotate_image", image_array, request.angle)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error rotating image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def _bytes_to_numpy(image_bytes: bytes) -> np.ndarray:
+@router.post("/levels")
+async def adjust_levels(
+    request: LevelsRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    return await _render_tone(image_service, request, "levels", [_tone_step(ProcessingOperation.LEVELS, request)])
+
+@router.post("/gamma")
+async def adjust_gamma(
+    request: GammaRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    return await _render_tone(image_service, request, "gamma", [_tone_step(ProcessingOperation.GAMMA, request)])
+
+@router.post("/curves")
+async def adjust_curves(
+    request: CurvesRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    return await _render_tone(image_service, request, "curves", [_tone_step(ProcessingOperation.CURVES, request)])
+
+@router.post("/auto-levels")
+async def auto_levels(
+    request: FilterRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    return await _render_tone(image_service, request, "auto_levels", [_tone_step(ProcessingOperation.AUTO_LEVELS, request)])
+
+@router.post("/auto-contrast")
+async def auto_contrast(
+    request: FilterRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    return await _render_tone(image_service, request, "auto_contrast", [_tone_step(ProcessingOperation.AUTO_CONTRAST, request)])
+
+@router.post("/tone")
+async def apply_tone(
+    request: ToneRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    """Chaîne d'ajustements ponctuels compilée en une seule LUT: dix réglages coûtent autant qu'un"""
+    return await _render_tone(image_service, request, "tone", request.steps)
+
+def _tone_step(operation: ProcessingOperation, request: FilterRequest) -> ImageProcess:
+    parameters = request.model_dump(exclude=set(FilterRequest.model_fields))
+    return ImageProcess(operation=operation, parameters=parameters)
+
+async def _render_tone(
+    image_service: ImageService,
+    request: FilterRequest,
+    operation: str,
+    steps: List[ImageProcess]
+) -> StreamingResponse:
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        return np.array(image)
+        adjustments = [parse_adjustment(step.operation, step.parameters) for step in steps]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return await _render_filter(
+            image_service, request, operation,
+            lambda image_array, scale: processing_executor.run_threaded(apply_adjustments, image_array, adjustments)
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error converting bytes to numpy: {e}")
+        logger.error(f"Error applying {operation}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/pipeline")
+async def apply_pipeline(
+    request: PipelineRequest,
+    image_service: ImageService = Depends()
+) -> StreamingResponse:
+    """
+    Enchaîne plusieurs opérations avec un seul décodage et un seul encodage.
+    Les étapes sont réordonnées/fusionnées quand le résultat est équivalent
+    (ou presque, avec `approximate`).
+    """
+    try:
+        steps = parse_steps(request.steps)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def apply(image_array: np.ndarray, scale: float) -> np.ndarray:
+        height, width = image_array.shape[:2]
+        plan = optimize_steps(scale_steps(steps, scale), (width, height), request.approximate)
+        logger.debug(f"Pipeline plan: {[step.describe() for step in plan]}")
+        return await processing_executor.run_threaded(run_pipeline, image_array, plan)
+    
+    try:
+        return await _render_filter(image_service, request, "pipeline", apply)
+        
+    except HTTPException:
         raise
+    except Exception as e:
+        logger.error(f"Error applying pipeline: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-def _numpy_to_bytes(image_array: np.ndarray, format: str = "JPEG") -> bytes:
+@router.post("/batch")
+async def apply_batch(
+    request: BatchRequest,
+    batch_service: BatchService = Depends()
+) -> Dict[str, Any]:
+    """
+    Applique une opération à un projet entier ou à une liste d'images, en une
+    seule requête: chaque résultat devient une nouvelle image du projet de la
+    source, avec une entrée d'historique. Les échecs sont signalés par image.
+    Contrairement à POST /api/images/{id}/process, rien n'est ajouté à la pile de
+    retouches des sources: un lot produit des fichiers, comme un export.
+    """
+    if (request.project_id is None) == (request.image_ids is None):
+        raise HTTPException(status_code=400, detail="Provide either 'project_id' or 'image_ids'")
+    
+    process_data = ImageProcess(operation=request.operation, parameters=request.parameters)
+    try:
+        steps = parse_steps([process_data])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        image = Image.fromarray(image_array.astype(np.uint8))
+        if request.project_id is not None and not await batch_service.db.get(ProjectDB, request.project_id):
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        output = io.BytesIO()
-        image.save(output, format=format.upper())
-        return output.getvalue()
+        started = time.perf_counter()
+        images, missing = await batch_service.resolve_images(request.project_id, request.image_ids)
+        items = await batch_service.run(images, process_data, steps, request.concurrency)
+        return summarize(request.operation.value, items + missing_items(missing), started)
         
-    except Exception as e:
-        logger.error(f"Error converting numpy to bytes: {e}")
+    except HTTPException:
         raise
+    except Exception as e:
+        logger.error(f"Error applying batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _render_filter(
+    image_service: ImageService,
+    request: FilterRequest,
+    operation: str,
+    apply: Callable[[np.ndarray, float], Awaitable[np.ndarray]]
+) -> StreamingResponse:
+    """
+    Résultat encodé d'un filtre: servi depuis le cache (mémoire puis disque)
+    quand le même contenu a déjà été traité avec les mêmes paramètres.
+    En mode proxy, `apply` reçoit l'image réduite et l'échelle pour adapter
+    les paramètres exprimés en pixels (sigma, dimensions...).
+    """
+    db_image = await _get_image_or_404(image_service, request.image_id)
+    image_format = codec.image_format(db_image.content_type)
+    media_type = f"image/{image_format.lower()}"
+    scale = _proxy_scale(db_image, request)
+    headers = {"X-Proxy-Scale": f"{scale:.6g}"}
+    
+    cache_key = None
+    if db_image.checksum:
+        parameters = request.model_dump(exclude={"image_id", "viewport_width", "viewport_height"})
+        if scale < 1.0:
+            parameters["proxy_scale"] = round(scale, 6)
+        cache_key = result_cache.make_key(
+            db_image.checksum, operation, parameters, image_format, core_service.processing_version()
+        )
+        result_bytes = await run_in_threadpool(result_cache.get, cache_key)
+        if result_bytes is not None:
+            return StreamingResponse(io.BytesIO(result_bytes), media_type=media_type, headers={**headers, "X-Cache": "HIT"})
+    
+    if scale < 1.0:
+        image_array = await _load_proxy_array(image_service, db_image, scale)
+    else:
+        _, image_array = await _load_image_array(image_service, request.image_id, db_image)
+    result_array = await apply(image_array, scale)
+    result_bytes = await processing_executor.run_threaded(codec.encode, result_array, image_format)
+    
+    if cache_key:
+        await run_in_threadpool(result_cache.put, cache_key, result_bytes)
+    return StreamingResponse(io.BytesIO(result_bytes), media_type=media_type, headers={**headers, "X-Cache": "MISS"})
+
+def _proxy_scale(image: ImageModel, request: FilterRequest) -> float:
+    """Facteur de réduction pour tenir dans le viewport (1.0 = pleine résolution)"""
+    if not (request.viewport_width or request.viewport_height) or not (image.width and image.height):
+        return 1.0
+    
+    scale = min(
+        (request.viewport_width or image.width) / image.width,
+        (request.viewport_height or image.height) / image.height
+    )
+    return min(scale, 1.0)
+
+async def _load_proxy_array(image_service: ImageService, db_image: ImageModel, scale: float) -> np.ndarray:
+    size = (max(1, round(db_image.width * scale)), max(1, round(db_image.height * scale)))
+    proxy_key = f"{db_image.checksum}@{size[0]}x{size[1]}" if db_image.checksum else None
+    
+    image_array = decode_cache.get(db_image.id, proxy_key)
+    if image_array is None:
+        image_bytes = await image_service.get_image_bytes(db_image.id)
+        image_array = decode_cache.put(
+            db_image.id, proxy_key,
+            await processing_executor.run_threaded(codec.decode_proxy, image_bytes, size)
+        )
+    return image_array
+
+async def _get_image_or_404(image_service: ImageService, image_id: str) -> ImageModel:
+    db_image = await image_service.get_image(image_id)
+    if not db_image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return db_image
+
+async def _load_image_array(
+    image_service: ImageService,
+    image_id: str,
+    db_image: Optional[ImageModel] = None
+) -> Tuple[ImageModel, np.ndarray]:
+    db_image = db_image or await _get_image_or_404(image_service, image_id)
+    
+    image_array = decode_cache.get(image_id, db_image.checksum)
+    if image_array is None:
+        image_bytes = await image_service.get_image_bytes(image_id)
+        image_array = decode_cache.put(
+            image_id, db_image.checksum,
+            await processing_executor.run_threaded(codec.decode, image_bytes)
+        )
+    return db_image, image_array
 
 @router.post("/process-upload")
 async def process_uploaded_image(
@@ -198,26 +446,26 @@ async def process_uploaded_image(
     try:
         content = await file.read()
         
-        image_array = _bytes_to_numpy(content)
-        
         if filter_type == "gaussian_blur":
-            result_array = core_service.apply_gaussian_blur(image_array, sigma or 1.0)
+            operation, args = "apply_gaussian_blur", (sigma or 1.0,)
         elif filter_type == "sharpen":
-            result_array = core_service.apply_sharpen_filter(image_array, strength or 1.0)
+            operation, args = "apply_sharpen_filter", (strength or 1.0,)
         elif filter_type == "brightness_contrast":
-            result_array = core_service.adjust_brightness_contrast(
-                image_array, brightness or 0.0, contrast or 1.0
-            )
+            operation, args = "adjust_brightness_contrast", (brightness or 0.0, contrast or 1.0)
         else:
             raise HTTPException(status_code=400, detail="Unsupported filter type")
         
-        result_bytes = _numpy_to_bytes(result_array, "JPEG")
+        image_array = await processing_executor.run_threaded(codec.decode, content)
+        result_array = await processing_executor.run_core(operation, image_array, *args)
+        result_bytes = await processing_executor.run_threaded(codec.encode, result_array, "JPEG")
         
         return StreamingResponse(
             io.BytesIO(result_bytes), 
             media_type="image/jpeg"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing uploaded image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
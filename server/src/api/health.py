@@ -1,8 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import psutil
 import os
 
+from src.models.database import get_db, get_effective_settings
+from src.services.content_service import get_dedup_report
+from src.services.decode_cache import decode_cache
+from src.services.result_cache import result_cache
+from src.services.checkpoint_cache import checkpoint_cache
+from src.services.executor import processing_executor
+from src.services.job_service import job_manager
+
 router = APIRouter()
 
 
@@ -44,3 +53,32 @@ async def get_system_info():
             "error": "Could not retrieve system information",
             "details": str(e)
         }
+
+
+@router.get("/database")
+async def get_database_info():
+    return await get_effective_settings()
+
+
+@router.get("/dedup")
+async def get_dedup_info(db: AsyncSession = Depends(get_db)):
+    return await get_dedup_report(db)
+
+
+@router.get("/caches")
+async def get_caches_info():
+    return {
+        "decoded_images": decode_cache.stats(),
+        "filter_results": result_cache.stats(),
+        "render_checkpoints": checkpoint_cache.stats()
+    }
+
+
+@router.get("/executors")
+async def get_executors_info():
+    return processing_executor.stats()
+
+
+@router.get("/jobs")
+async def get_jobs_info():
+    return job_manager.stats()
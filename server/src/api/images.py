@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from fastapi.responses import StreamingResponse, Response
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request, Query
+from fastapi.responses import Response
 from typing import List, Optional
 import uuid
 import io
@@ -8,15 +8,41 @@ from PIL import Image as PILImage
 
 from src.models.image import Image, ImageCreate, ImageProcess, ImageImport
 from src.services.image_service import ImageService
+from src.services.edit_service import EditService
+from src.services.upload_service import receive_upload, UploadTooLarge
+from src.services.content_service import BlobMissing
 
 router = APIRouter()
 
 
-@router.post("/upload")
+@router.post("/upload", response_model=Image)
 async def upload_image(
+    request: Request,
+    filename: Optional[str] = None,
+    project_id: Optional[str] = None,
     image_service: ImageService = Depends()
 ):
-    return {"message": "Upload endpoint - à implémenter avec file upload"}
+    """
+    Upload binaire en flux: multipart/form-data (champ fichier + project_id) ou
+    corps brut avec ?filename=&project_id=. Le corps est lu directement depuis
+    la requête: UploadFile mettrait tout le fichier en tampon avant l'appel.
+    """
+    try:
+        upload = await receive_upload(
+            request.headers.get("content-type", ""),
+            request.stream(),
+            filename=filename,
+            project_id=project_id
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {str(e)}")
+    
+    try:
+        return await image_service.create_image_from_upload(upload)
+    except BlobMissing as e:
+        raise HTTPException(status_code=409, detail=f"Upload removed concurrently, retry: {str(e)}")
 
 
 @router.get("/{image_id}")
@@ -33,51 +59,133 @@ async def get_image_info(
 @router.get("/{image_id}/preview")
 async def get_image_preview(
     image_id: str,
-    width: Optional[int] = 300,
-    height: Optional[int] = 300,
-    image_service: ImageService = Depends()
+    request: Request,
+    width: int = Query(300, ge=1, le=4096),
+    height: int = Query(300, ge=1, le=4096),
+    edit_service: EditService = Depends()
 ):
-    image_data = await image_service.get_image_data(image_id)
-    if not image_data:
+    """Aperçu de l'image avec ses retouches"""
+    version = await edit_service.version(image_id)
+    if version is None and not await edit_service.image_service.get_image(image_id):
         raise HTTPException(status_code=404, detail="Image not found")
     
+    # contenu adressé par checksum, pile identifiée par son empreinte: l'aperçu d'un état ne change jamais
+    etag = f'"{version}-{width}x{height}"' if version else None
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
     try:
-        pil_image = PILImage.open(io.BytesIO(image_data.data))
-        pil_image.thumbnail((width, height), PILImage.Resampling.LANCZOS)
-        
-        img_byte_arr = io.BytesIO()
-        pil_image.save(img_byte_arr, format='JPEG')
-        img_byte_arr.seek(0)
-        
-        return StreamingResponse(
-            io.BytesIO(img_byte_arr.getvalue()), 
-            media_type="image/jpeg"
-        )
+        preview = await edit_service.get_preview(image_id, width, height)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating preview: {str(e)}")
+    
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"} if etag else None
+    return Response(content=preview, media_type="image/jpeg", headers=headers)
 
 
 @router.post("/{image_id}/process")
 async def process_image(
     image_id: str,
     process_data: ImageProcess,
-    image_service: ImageService = Depends()
+    edit_service: EditService = Depends()
 ):
-    """Appliquer un traitement à une image"""
-    # TODO: Intégration avec le core C++ ici
-    result = await image_service.process_image(image_id, process_data)
-    if not result:
+    """Ajoute un traitement à la pile de retouches de l'image (rendu à la lecture)"""
+    try:
+        edit = await edit_service.add_edit(image_id, process_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not edit:
         raise HTTPException(status_code=404, detail="Image not found")
     
     return {
         "image_id": image_id,
         "operation": process_data.operation,
         "parameters": process_data.parameters,
-        "result_id": result.id,
-        "message": "Image processed successfully"
+        "edit_id": edit.id,
+        "position": edit.position,
+        "message": "Edit added to stack"
     }
 
 
+@router.get("/{image_id}/edits")
+async def get_image_edits(
+    image_id: str,
+    edit_service: EditService = Depends()
+):
+    """Pile de retouches, dans l'ordre d'application"""
+    if not await edit_service.image_service.get_image(image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return {"image_id": image_id, "edits": await edit_service.get_stack(image_id)}
+
+
+@router.delete("/{image_id}/edits")
+async def clear_image_edits(
+    image_id: str,
+    edit_service: EditService = Depends()
+):
+    """Retour à l'original"""
+    if not await edit_service.image_service.get_image(image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return {"image_id": image_id, "removed": await edit_service.clear_stack(image_id)}
+
+
+@router.delete("/{image_id}/edits/{edit_id}")
+async def remove_image_edit(
+    image_id: str,
+    edit_id: str,
+    edit_service: EditService = Depends()
+):
+    if not await edit_service.remove_edit(image_id, edit_id):
+        raise HTTPException(status_code=404, detail="Edit not found")
+    return {"message": "Edit removed"}
+
+
+@router.get("/{image_id}/render")
+async def render_image(
+    image_id: str,
+    request: Request,
+    edit_service: EditService = Depends()
+):
+    """Image avec ses retouches, à pleine résolution, dans le format de l'original"""
+    version = await edit_service.version(image_id)
+    etag = f'"{version}"' if version else None
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    try:
+        rendered = await edit_service.render(image_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering image: {str(e)}")
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    headers = {
+        "X-Edit-Count": str(rendered.edit_count),
+        "X-Cache": "HIT" if rendered.cached else "MISS",
+        "Cache-Control": "private, max-age=86400"
+    }
+    if etag:
+        headers["ETag"] = etag
+    return Response(content=rendered.data, media_type=rendered.media_type, headers=headers)
+
+
+@router.post("/{image_id}/flatten")
+async def flatten_image(
+    image_id: str,
+    edit_service: EditService = Depends()
+):
+    """Export explicite: écrit le rendu comme nouveau contenu de l'image et vide la pile"""
+    try:
+        result = await edit_service.flatten(image_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error flattening image: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    image, flattened = result
+    return {"image": image, "flattened": flattened}
+
+
 @router.delete("/{image_id}")
 async def delete_image(
     image_id: str,
@@ -147,14 +255,15 @@ async def import_image(
 async def export_image(
     image_id: str,
     format: Optional[str] = "png",
-    image_service: ImageService = Depends()
+    edit_service: EditService = Depends()
 ):
+    """Téléchargement du rendu (retouches comprises), sans modifier l'image"""
     try:
-        image_data = await image_service.get_image_data(image_id)
-        if not image_data:
+        rendered = await edit_service.render(image_id)
+        if rendered is None:
             raise HTTPException(status_code=404, detail="Image not found")
         
-        pil_image = PILImage.open(io.BytesIO(image_data.data))
+        pil_image = PILImage.open(io.BytesIO(rendered.data))
         
         output_buffer = io.BytesIO()
         if format.lower() == 'jpg' or format.lower() == 'jpeg':
@@ -176,5 +285,7 @@ async def export_image(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exporting image: {str(e)}")
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import json
+
+from src.models.job import Job, JobCreate, JobStatus, JobType, FINISHED_STATUSES
+from src.services.job_service import JobService, job_manager
+
+router = APIRouter()
+
+
+@router.post("/", response_model=Job, status_code=202)
+async def submit_job(
+    job_data: JobCreate,
+    job_service: JobService = Depends()
+):
+    try:
+        return await job_service.submit_job(job_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=List[Job])
+async def get_jobs(
+    status: Optional[JobStatus] = None,
+    type: Optional[JobType] = None,
+    limit: int = Query(50, ge=1, le=500),
+    job_service: JobService = Depends()
+):
+    return await job_service.get_jobs(status, type, limit)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str,
+    job_service: JobService = Depends()
+):
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(
+    job_id: str,
+    job_service: JobService = Depends()
+):
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status.value}")
+
+    return await job_service.cancel_job(job_id)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    job_service: JobService = Depends()
+):
+    """Avancement en Server-Sent Events, jusqu'à la fin de la tâche (résultat via GET /jobs/{id})"""
+    if not await job_service.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in job_manager.events(job_id):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse
 from typing import List, Optional
 from uuid import uuid4
 from datetime import datetime
 
 from src.models.project import Project, ProjectCreate, ProjectUpdate
+from src.models.image import ImagePayloadBatch
 from src.services.project_service import ProjectService
+from src.models.job import JobCreate, JobType
+from src.services.archive_service import stream_project_archive, import_project_archive, stage_archive
+from src.services.job_service import JobService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Project])
 async def list_projects(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     project_service: ProjectService = Depends()
 ):
-    return await project_service.get_projects(skip=skip, limit=limit)
+    try:
+        projects, next_cursor = await project_service.get_projects(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # même convention que les images du projet: le curseur de la page suivante passe par un header
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return projects
 
 
 @router.post("/", response_model=Project)
@@ -63,9 +78,20 @@ async def delete_project(
 @router.get("/{project_id}/images")
 async def get_project_images(
     project_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
     project_service: ProjectService = Depends()
 ):
-    images = await project_service.get_project_images(project_id)
+    try:
+        images, next_cursor = await project_service.get_project_images(
+            project_id, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return {"project_id": project_id, "images": images}
 
 
@@ -89,6 +115,26 @@ async def upload_image_to_project(
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
 
 
+@router.post("/{project_id}/images/bulk")
+async def upload_images_to_project(
+    project_id: str,
+    payload: ImagePayloadBatch,
+    project_service: ProjectService = Depends()
+):
+    project = await project_service.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    try:
+        images, failures = await project_service.add_images_to_project(
+            project_id, [image.model_dump() for image in payload.images]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"project_id": project_id, "images": images, "failed_images": failures}
+
+
 @router.get("/{project_id}/export")
 async def export_project(
     project_id: str,
@@ -100,8 +146,18 @@ async def export_project(
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
+        if format == "zip":
+            # archive complète (manifest + images) produite en flux
+            return StreamingResponse(
+                stream_project_archive(project),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename={project.name.replace(' ', '_')}_export.zip"
+                }
+            )
+        
         # Get all project images
-        images = await project_service.get_project_images(project_id)
+        images = await project_service.get_all_project_images(project_id)
         
         # Create export data
         export_data = {
@@ -129,6 +185,8 @@ async def export_project(
             "filename": f"{project.name.replace(' ', '_')}_export.json"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to export project: {str(e)}")
 
@@ -160,19 +218,43 @@ async def import_project(
         imported_project = await project_service.create_project(new_project_data)
         
         # Import images if any
-        imported_images = []
+        imported_images, failed_images = [], []
         if "images" in project_data and project_data["images"]:
-            for image_data in project_data["images"]:
-                try:
-                    image = await project_service.add_image_to_project(imported_project.id, image_data)
-                    imported_images.append(image)
-                except Exception as e:
-                    print(f"Failed to import image: {e}")
+            imported_images, failed_images = await project_service.add_images_to_project(
+                imported_project.id, project_data["images"]
+            )
         
         return {
             "success": True,
             "project": imported_project,
             "imported_images_count": len(imported_images),
+            "failed_images": failed_images,
+            "message": "Project imported successfully"
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to import project: {str(e)}")
+
+
+@router.post("/import/archive")
+async def import_project_archive_file(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Importer dans une tâche de fond (réponse 202 avec la tâche)"),
+    project_service: ProjectService = Depends(),
+    job_service: JobService = Depends()
+):
+    try:
+        if background:
+            archive = await run_in_threadpool(stage_archive, file.file)
+            job = await job_service.submit_job(JobCreate(type=JobType.IMPORT, payload={"archive": archive}))
+            return JSONResponse(status_code=202, content=job.model_dump(mode="json"))
+
+        result = await import_project_archive(project_service, file.file)
+        return {
+            "success": True,
+            **result,
             "message": "Project imported successfully"
         }
         
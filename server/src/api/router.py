@@ -3,6 +3,7 @@ from src.api.projects import router as projects_router
 from src.api.images import router as images_router
 from src.api.health import router as health_router
 from src.api.filters import router as filters_router
+from src.api.jobs import router as jobs_router
 
 api_router = APIRouter()
 
@@ -24,6 +25,12 @@ api_router.include_router(
     tags=["Images"]
 )
 
+api_router.include_router(
+    jobs_router,
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
 api_router.include_router(
     filters_router,
     tags=["Image Filters"]
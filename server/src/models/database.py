@@ -1,22 +1,53 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, LargeBinary, Float
+from sqlalchemy import Column, String, Integer, DateTime, Text, LargeBinary, Float, Index, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred
 from sqlalchemy.dialects.sqlite import BLOB
 from datetime import datetime
 import os
 from pathlib import Path
+from typing import Dict, Any
 
-DATABASE_DIR = Path(__file__).parent.parent.parent / "data"
-DATABASE_DIR.mkdir(exist_ok=True)
-DATABASE_URL = f"sqlite:///{DATABASE_DIR}/bettergimp.db"
+from src.models.db_profile import load_profile
 
-engine = create_engine(
+DATABASE_DIR = Path(os.getenv("DATABASE_DIR", str(Path(__file__).parent.parent.parent / "data")))
+DATABASE_DIR.mkdir(parents=True, exist_ok=True)
+DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_DIR}/bettergimp.db"
+
+db_profile = load_profile()
+
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=True
+    echo=db_profile.echo,
+    pool_size=db_profile.pool_size,
+    max_overflow=db_profile.max_overflow,
+    pool_timeout=db_profile.pool_timeout,
+    query_cache_size=db_profile.query_cache_size,
+    connect_args={"cached_statements": db_profile.statement_cache_size}
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine.sync_engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={db_profile.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={db_profile.synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={db_profile.mmap_size}")
+        cursor.execute(f"PRAGMA cache_size={db_profile.cache_size}")
+        cursor.execute(f"PRAGMA busy_timeout={db_profile.busy_timeout}")
+        cursor.execute(f"PRAGMA temp_store={db_profile.temp_store}")
+    finally:
+        cursor.close()
+
+# expire_on_commit=False: les objets restent lisibles après commit sans
+# relancer de requête implicite (interdit en async)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
 
@@ -35,6 +66,11 @@ class ProjectDB(Base):
     image_count = Column(Integer, default=0)
     file_size = Column(Integer, default=0)
     canvas_state = Column(Text, nullable=True)  # JSON string du state du canvas
+    
+    __table_args__ = (
+        # pagination par clé (created_at, id)
+        Index("ix_projects_created_at_id", "created_at", "id"),
+    )
 
 
 class ImageDB(Base):
@@ -50,9 +86,32 @@ class ImageDB(Base):
     color_mode = Column(String(50), nullable=True)
     file_size = Column(Integer, default=0)
     checksum = Column(String(32), nullable=True)
-    data = Column(LargeBinary, nullable=False)
+    blob_key = Column(String(64), nullable=True, index=True)  # clé dans le blob store
+    # stockage inline historique, vidé par la migration; jamais chargé implicitement
+    data = deferred(Column(LargeBinary, nullable=True))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # pagination par clé des images d'un projet
+        Index("ix_images_project_id_created_at_id", "project_id", "created_at", "id"),
+        # déduplication dans un projet
+        Index("ix_images_checksum_project_id", "checksum", "project_id"),
+    )
+
+
+class ImageContentDB(Base):
+    """Contenu binaire unique (par checksum), partagé par toutes les images identiques"""
+    __tablename__ = "image_contents"
+    
+    checksum = Column(String(32), primary_key=True)
+    blob_key = Column(String(64), nullable=False)
+    file_size = Column(Integer, default=0)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    channels = Column(Integer, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class ImageHistoryDB(Base):
@@ -64,20 +123,75 @@ class ImageHistoryDB(Base):
     parameters = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     user_id = Column(String, nullable=True)
+    # rang dans la pile de retouches de l'image (rendue à la lecture);
+    # NULL pour une entrée de journal (retouche aplatie, résultat enregistré à part)
+    position = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_image_history_image_id_position", "image_id", "position"),
+    )
+
+
+class JobDB(Base):
+    """Tâche de fond persistante, exécutée par services/job_service"""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    priority = Column(Integer, nullable=False, default=0)
+    progress = Column(Float, default=0.0)
+    message = Column(Text, nullable=True)
+    payload = Column(Text, nullable=True)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    checkpoint = Column(Text, nullable=True)  # JSON: état de reprise après redémarrage
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # sélection des prochaines tâches à lancer
+        Index("ix_jobs_status_job_type_priority_created_at", "status", "job_type", "priority", "created_at"),
+    )
 
 
 async def init_db():
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         print("Database tables created successfully")
     except Exception as e:
         print(f"Error creating database tables: {e}")
         raise
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_effective_settings() -> Dict[str, Any]:
+    """Relit les PRAGMA sur une connexion du pool pour vérifier ce qui est réellement appliqué"""
+    pragmas = ["journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "temp_store"]
+    
+    async with engine.connect() as conn:
+        effective = {
+            pragma: (await conn.execute(text(f"PRAGMA {pragma}"))).scalar()
+            for pragma in pragmas
+        }
+    
+    return {
+        "profile": db_profile.name,
+        "pragmas": effective,
+        "pool": {
+            "size": db_profile.pool_size,
+            "max_overflow": db_profile.max_overflow,
+            "timeout": db_profile.pool_timeout,
+            "status": engine.pool.status()
+        },
+        "statement_cache_size": db_profile.statement_cache_size,
+        "query_cache_size": db_profile.query_cache_size,
+        "echo": db_profile.echo
+    }
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
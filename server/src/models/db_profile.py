@@ -0,0 +1,73 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Any, Literal
+import os
+
+
+class DatabaseProfile(BaseModel):
+    """Réglages de performance SQLite appliqués à chaque connexion"""
+    name: str = Field(..., description="Nom du profil")
+    journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL"] = Field(
+        default="WAL", description="PRAGMA journal_mode"
+    )
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = Field(
+        default="NORMAL", description="PRAGMA synchronous"
+    )
+    mmap_size: int = Field(default=256 * 1024 * 1024, ge=0, description="PRAGMA mmap_size en bytes")
+    cache_size: int = Field(default=-64000, description="PRAGMA cache_size (négatif = KiB)")
+    busy_timeout: int = Field(default=5000, ge=0, description="PRAGMA busy_timeout en millisecondes")
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = Field(default="MEMORY", description="PRAGMA temp_store")
+    pool_size: int = Field(default=5, gt=0, description="Connexions gardées ouvertes dans le pool")
+    max_overflow: int = Field(default=10, ge=0, description="Connexions supplémentaires autorisées")
+    pool_timeout: float = Field(default=30.0, gt=0, description="Attente max d'une connexion libre (s)")
+    statement_cache_size: int = Field(default=256, ge=0, description="Requêtes préparées gardées par connexion sqlite3")
+    query_cache_size: int = Field(default=500, ge=0, description="Requêtes compilées gardées par SQLAlchemy")
+    echo: bool = Field(default=False, description="Log de chaque requête SQL")
+
+    @field_validator("journal_mode", "synchronous", "temp_store", mode="before")
+    @classmethod
+    def _uppercase(cls, value: Any) -> Any:
+        return value.upper() if isinstance(value, str) else value
+
+
+PROFILES: Dict[str, DatabaseProfile] = {
+    "development": DatabaseProfile(
+        name="development",
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-16000,
+        pool_size=2,
+        max_overflow=4,
+        statement_cache_size=128,
+        query_cache_size=250,
+    ),
+    "production": DatabaseProfile(
+        name="production",
+        mmap_size=1024 * 1024 * 1024,
+        cache_size=-262144,
+        busy_timeout=15000,
+        pool_size=10,
+        max_overflow=20,
+        statement_cache_size=512,
+        query_cache_size=1200,
+    ),
+}
+
+
+def load_profile() -> DatabaseProfile:
+    """
+    Sélectionne le profil via DB_PROFILE (défaut: ENVIRONMENT, puis "development").
+    Chaque champ peut être surchargé individuellement, ex: DB_MMAP_SIZE=0, DB_ECHO=true
+    """
+    profile_name = os.getenv("DB_PROFILE", os.getenv("ENVIRONMENT", "development")).lower()
+    if profile_name not in PROFILES:
+        raise ValueError(
+            f"Unknown database profile '{profile_name}', expected one of {sorted(PROFILES)}"
+        )
+
+    overrides: Dict[str, Any] = {}
+    for field in DatabaseProfile.model_fields:
+        value = os.getenv(f"DB_{field.upper()}")
+        if value is not None and field != "name":
+            overrides[field] = value
+
+    profile = PROFILES[profile_name]
+    return DatabaseProfile.model_validate({**profile.model_dump(), **overrides})
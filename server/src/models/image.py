@@ -17,6 +17,11 @@ class ProcessingOperation(str, Enum):
     BRIGHTNESS = "brightness"
     CONTRAST = "contrast"
     BRIGHTNESS_CONTRAST = "brightness_contrast"
+    LEVELS = "levels"
+    GAMMA = "gamma"
+    CURVES = "curves"
+    AUTO_LEVELS = "auto_levels"
+    AUTO_CONTRAST = "auto_contrast"
     GAUSSIAN_BLUR = "gaussian_blur"
     UNSHARP_MASK = "unsharp_mask"
     RESIZE = "resize"
@@ -43,6 +48,16 @@ class ImageImport(BaseModel):
     size: int = Field(..., description="Taille du fichier en bytes")
 
 
+class ImagePayload(BaseModel):
+    name: str = Field(default="uploaded_image.jpg", description="Nom du fichier")
+    type: str = Field(default="image/jpeg", description="Type MIME de l'image")
+    data: str = Field(..., description="Données de l'image en base64")
+
+
+class ImagePayloadBatch(BaseModel):
+    images: List[ImagePayload] = Field(..., description="Images ajoutées au projet en une transaction")
+
+
 class ImageProcess(BaseModel):
     operation: ProcessingOperation = Field(..., description="Type d'opération à effectuer")
     parameters: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de l'opération")
@@ -97,6 +112,7 @@ class ImageHistory(BaseModel):
     parameters: Dict[str, Any]
     timestamp: datetime
     user_id: Optional[str] = None
+    position: Optional[int] = Field(None, description="Rang dans la pile de retouches, absent une fois aplatie")
 
 
 class ImageMetadata(BaseModel):
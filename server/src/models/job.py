@@ -0,0 +1,76 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from enum import Enum
+
+from src.models.image import ProcessingOperation
+
+
+class JobType(str, Enum):
+    FILTER = "filter"
+    BATCH = "batch"
+    IMPORT = "import"
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class FilterJobPayload(BaseModel):
+    image_id: str = Field(..., description="ID de l'image à traiter")
+    operation: ProcessingOperation = Field(..., description="Opération appliquée")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de l'opération")
+
+
+class BatchJobPayload(BaseModel):
+    project_id: Optional[str] = Field(None, description="Traiter toutes les images du projet")
+    image_ids: Optional[List[str]] = Field(None, min_length=1, max_length=10000, description="Ou une liste d'images")
+    operation: ProcessingOperation = Field(..., description="Opération appliquée à chaque image")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de l'opération")
+    concurrency: Optional[int] = Field(None, ge=1, le=32, description="Images traitées simultanément")
+
+
+class ImportJobPayload(BaseModel):
+    archive: str = Field(..., description="Archive déposée par POST /api/projects/import/archive?background=true")
+
+
+class JobCreate(BaseModel):
+    type: JobType = Field(..., description="Type de tâche")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de la tâche")
+    priority: int = Field(default=0, ge=-10, le=10, description="Les priorités hautes passent en premier")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "type": "filter",
+                "priority": 5,
+                "payload": {
+                    "image_id": "550e8400-e29b-41d4-a716-446655440001",
+                    "operation": "resize",
+                    "parameters": {"width": 8000, "height": 6000}
+                }
+            }
+        }
+
+
+class Job(BaseModel):
+    id: str
+    type: JobType
+    status: JobStatus
+    priority: int = 0
+    progress: float = Field(default=0.0, description="Avancement entre 0 et 1")
+    message: Optional[str] = None
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = Field(default=0, description="Nombre de démarrages (redémarrages compris)")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
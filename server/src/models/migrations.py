@@ -0,0 +1,162 @@
+import hashlib
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.models.database import Base, engine
+from src.storage.blob_store import blob_store
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = 100
+
+
+async def run_migrations(bind: AsyncEngine = engine):
+    """
+    Met à niveau une base existante vers le schéma courant.
+    Chaque étape est idempotente et peut être relancée sans risque.
+    """
+    async with bind.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+    moved = await _move_inline_blobs(bind)
+
+    async with bind.begin() as conn:
+        rebuilt = await conn.run_sync(_relax_legacy_blob_column)
+        await conn.run_sync(_backfill_image_contents)
+
+    if moved or rebuilt:
+        print(f"✅ Migration blob store: {moved} image(s) déplacée(s) hors de la base")
+        print("ℹ️  Lancer VACUUM pour récupérer l'espace disque de la base")
+
+
+def _add_missing_columns(conn: Connection):
+    """Ajoute les colonnes présentes dans les modèles mais absentes de la base"""
+    inspector = inspect(conn)
+
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(
+                f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+            ))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _create_missing_indexes(conn: Connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+async def _move_inline_blobs(bind: AsyncEngine) -> int:
+    """Copie les données inline de `images.data` dans le blob store, par lots"""
+    async with bind.connect() as conn:
+        pending_ids = [
+            row.id for row in await conn.execute(text(
+                "SELECT id FROM images WHERE blob_key IS NULL AND data IS NOT NULL"
+            ))
+        ]
+
+    moved = 0
+    for start in range(0, len(pending_ids), MIGRATION_BATCH_SIZE):
+        batch = pending_ids[start:start + MIGRATION_BATCH_SIZE]
+
+        async with bind.begin() as conn:
+            moved += await conn.run_sync(_move_inline_blob_batch, batch)
+
+        logger.info(f"Moved {moved}/{len(pending_ids)} inline image blobs to blob store")
+
+    return moved
+
+
+def _move_inline_blob_batch(conn: Connection, image_ids: list) -> int:
+    # sur une table historique (NOT NULL) les données sont vidées par la reconstruction
+    clear_inline = not _is_inline_blob_required(conn)
+    update_sql = "UPDATE images SET checksum = :checksum, blob_key = :blob_key"
+    if clear_inline:
+        update_sql += ", data = NULL"
+    update_sql += " WHERE id = :id"
+
+    for image_id in image_ids:
+        row = conn.execute(
+            text("SELECT checksum, data FROM images WHERE id = :id"),
+            {"id": image_id}
+        ).one()
+
+        checksum = row.checksum or hashlib.md5(row.data).hexdigest()
+        blob_key = blob_store.put(row.data, checksum)
+
+        conn.execute(
+            text(update_sql),
+            {"checksum": checksum, "blob_key": blob_key, "id": image_id}
+        )
+
+    return len(image_ids)
+
+
+def _is_inline_blob_required(conn: Connection) -> bool:
+    columns = conn.execute(text("PRAGMA table_info(images)")).fetchall()
+
+    data_column = next((column for column in columns if column.name == "data"), None)
+    return bool(data_column is not None and data_column.notnull)
+
+
+def _relax_legacy_blob_column(conn: Connection) -> bool:
+    """
+    Les anciennes bases déclarent `images.data` NOT NULL, ce que SQLite ne permet
+    pas de modifier: la table est reconstruite sans les données inline
+    """
+    if not _is_inline_blob_required(conn):
+        return False
+
+    images_table = Base.metadata.tables["images"]
+    column_names = [column.name for column in images_table.columns]
+    select_columns = ", ".join(
+        "CASE WHEN blob_key IS NULL THEN data END" if name == "data" else f'"{name}"'
+        for name in column_names
+    )
+    insert_columns = ", ".join(f'"{name}"' for name in column_names)
+
+    legacy_indexes = conn.execute(text(
+        "SELECT name FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'images' AND sql IS NOT NULL"
+    )).fetchall()
+    for index in legacy_indexes:
+        conn.execute(text(f'DROP INDEX "{index.name}"'))
+
+    conn.execute(text("ALTER TABLE images RENAME TO images_legacy"))
+    images_table.create(bind=conn)
+    conn.execute(text(
+        f"INSERT INTO images ({insert_columns}) "
+        f"SELECT {select_columns} FROM images_legacy"
+    ))
+    conn.execute(text("DROP TABLE images_legacy"))
+
+    logger.info("Rebuilt images table without inline blob column constraint")
+    return True
+
+
+def _backfill_image_contents(conn: Connection):
+    """Crée les lignes `image_contents` (avec leur compteur) des images qui n'en ont pas"""
+    result = conn.execute(text(
+        "INSERT INTO image_contents "
+        "(checksum, blob_key, file_size, width, height, channels, ref_count, created_at) "
+        "SELECT checksum, MIN(blob_key), MAX(file_size), MAX(width), MAX(height), "
+        "MAX(channels), COUNT(*), MIN(created_at) "
+        "FROM images "
+        "WHERE blob_key IS NOT NULL AND checksum IS NOT NULL "
+        "AND checksum NOT IN (SELECT checksum FROM image_contents) "
+        "GROUP BY checksum"
+    ))
+
+    if result.rowcount:
+        logger.info(f"Backfilled {result.rowcount} image content rows")
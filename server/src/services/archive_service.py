@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import re
+import shutil
+import zipfile
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Any, List, Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.models.database import SessionLocal
+from src.models.project import Project, ProjectCreate
+from src.services.project_service import ProjectService
+from src.services.edit_service import get_stacks, restore_stack
+from src.services.content_service import purge_blob
+from src.storage.blob_store import blob_store
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "bettergimp-project"
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_IMPORT_STAGING_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "imports"
+# archives reçues en attente d'import par une tâche de fond
+IMPORT_STAGING_DIR = Path(os.getenv("IMPORT_STAGING_DIR", str(DEFAULT_IMPORT_STAGING_DIR)))
+_STAGED_NAME = re.compile(r"^[0-9a-f]{32}\.zip$")
+
+
+class _ChunkSink:
+    """Flux non seekable dans lequel zipfile écrit; les octets sont récupérés par `drain()`"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _project_metadata(project: Project) -> Dict[str, Any]:
+    return {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "width": project.width,
+        "height": project.height,
+        "color_mode": project.color_mode,
+        "resolution": project.resolution,
+        "canvas_state": project.canvas_state,
+        "created_at": project.created_at.isoformat(),
+        "updated_at": project.updated_at.isoformat()
+    }
+
+
+async def stream_project_archive(project: Project) -> AsyncIterator[bytes]:
+    """
+    Produit une archive zip (blobs originaux + manifest.json avec les piles de
+    retouches, non aplaties) morceau par morceau.
+    Au plus CHUNK_SIZE octets d'image sont en mémoire à la fois; chaque contenu
+    n'est écrit qu'une fois même s'il est partagé par plusieurs images.
+    """
+    sink = _ChunkSink()
+    manifest_images = []
+    written = set()
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        async with SessionLocal() as db:
+            project_service = ProjectService(db)
+            images, cursor = await project_service.get_project_images(project.id)
+
+            while True:
+                stacks = await get_stacks(db, [image["id"] for image in images])
+                for image in images:
+                    path = f"blobs/{image['checksum']}"
+                    manifest_images.append({**image, "path": path, "edits": stacks.get(image["id"], [])})
+
+                    if image["checksum"] in written:
+                        continue
+                    written.add(image["checksum"])
+
+                    info = zipfile.ZipInfo(path, date_time=datetime.now().timetuple()[:6])
+                    info.file_size = image["file_size"] or 0
+                    chunks = blob_store.iter_chunks(image["checksum"], CHUNK_SIZE)
+
+                    with archive.open(info, mode="w", force_zip64=True) as entry:
+                        while chunk := await run_in_threadpool(next, chunks, b""):
+                            entry.write(chunk)
+                            yield sink.drain()
+                    yield sink.drain()
+
+                if not cursor:
+                    break
+                images, cursor = await project_service.get_project_images(project.id, cursor=cursor)
+
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "export_date": datetime.now().isoformat(),
+            "project": _project_metadata(project),
+            "images": manifest_images
+        }
+        archive.writestr(
+            MANIFEST_NAME,
+            json.dumps(manifest, indent=2),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+    yield sink.drain()
+
+
+def _read_manifest(archive: zipfile.ZipFile) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    except KeyError:
+        raise ValueError("Archive has no manifest.json")
+
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValueError("Not a project archive")
+    if manifest.get("version", 0) > ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported archive version {manifest.get('version')}")
+    return manifest
+
+
+def _extract_blob(archive: zipfile.ZipFile, path: str):
+    """Recopie un membre de l'archive dans le blob store par morceaux (clé recalculée)"""
+    with archive.open(path) as member:
+        return blob_store.put_stream(iter(lambda: member.read(CHUNK_SIZE), b""))
+
+
+def stage_archive(archive_file: BinaryIO) -> str:
+    """Copie une archive reçue dans le dossier d'attente; retourne son nom (appel bloquant)"""
+    IMPORT_STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{uuid4().hex}.zip"
+    with open(IMPORT_STAGING_DIR / name, "wb") as staged:
+        shutil.copyfileobj(archive_file, staged, CHUNK_SIZE)
+    return name
+
+
+def staged_archive_path(name: str) -> Path:
+    """Chemin d'une archive en attente (ValueError si le nom n'en désigne pas une)"""
+    if not _STAGED_NAME.match(name or ""):
+        raise ValueError(f"Invalid staged archive name '{name}'")
+    path = IMPORT_STAGING_DIR / name
+    if not path.is_file():
+        raise ValueError(f"Staged archive '{name}' not found")
+    return path
+
+
+def discard_staged_archive(name: str):
+    if _STAGED_NAME.match(name or ""):
+        (IMPORT_STAGING_DIR / name).unlink(missing_ok=True)
+
+
+async def import_project_archive(
+    project_service: ProjectService,
+    archive_file: BinaryIO,
+    project: Optional[Project] = None,
+    on_project: Optional[Callable[[Project], Awaitable[None]]] = None,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """
+    Importe une archive produite par `stream_project_archive`. Le fichier doit être
+    seekable (UploadFile est déjà mis en tampon sur disque au-delà de 1 Mo).
+    `project`: projet vide créé par une exécution interrompue, à réutiliser;
+    `on_project` est appelé dès que le projet existe, `on_progress` après chaque image extraite.
+    """
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid archive: {e}")
+
+    extracted: Dict[str, str] = {}
+    try:
+        with archive:
+            manifest = await run_in_threadpool(_read_manifest, archive)
+            project_info = manifest.get("project", {})
+
+            if project is None:
+                project = await project_service.create_project(ProjectCreate(
+                    name=f"Imported - {project_info.get('name', 'Untitled')}",
+                    description=project_info.get('description', 'Imported project'),
+                    width=project_info.get('width', 800),
+                    height=project_info.get('height', 600),
+                    color_mode=project_info.get('color_mode', 'RGB'),
+                    resolution=project_info.get('resolution', 72),
+                    canvas_state=project_info.get('canvas_state')
+                ))
+
+            if on_project is not None:
+                await on_project(project)
+
+            stored_images, checksums, failures = [], [], []
+            edits_by_checksum: Dict[str, List[Dict[str, Any]]] = {}
+
+            manifest_images = manifest.get("images", [])
+            for index, image in enumerate(manifest_images):
+                path = image.get("path")
+                try:
+                    if path not in extracted:
+                        checksum, _ = await run_in_threadpool(_extract_blob, archive, path)
+                        extracted[path] = checksum
+                except Exception as e:
+                    failures.append({"index": index, "name": image.get("filename"), "error": str(e)})
+                    continue
+                finally:
+                    if on_progress is not None:
+                        await on_progress(index + 1, len(manifest_images))
+
+                stored_images.append({
+                    "name": image.get("filename") or "imported_image",
+                    "type": image.get("content_type") or "application/octet-stream"
+                })
+                checksums.append(extracted[path])
+                # contenus identiques: une seule image dans le projet, avec la première pile
+                if image.get("edits"):
+                    edits_by_checksum.setdefault(extracted[path], image["edits"])
+
+            # un blob purgé par une suppression concurrente avant d'être référencé est réextrait
+            images, insert_failures = await project_service.add_stored_images_to_project(
+                project.id, stored_images, checksums,
+                rewrites={checksum: partial(_extract_blob, archive, path) for path, checksum in extracted.items()}
+            )
+
+        for created in images:
+            if created["checksum"] in edits_by_checksum:
+                restore_stack(project_service.db, created["id"], edits_by_checksum[created["checksum"]])
+        await project_service.db.commit()
+    except BaseException:
+        await project_service.db.rollback()
+        raise
+    finally:
+        # blobs extraits qu'aucun contenu ne référence (import en échec ou interrompu)
+        for checksum in set(extracted.values()):
+            await purge_blob(project_service.db, checksum)
+
+    return {
+        "project": project,
+        "imported_images_count": len(images),
+        "failed_images": failures + insert_failures
+    }
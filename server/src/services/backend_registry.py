@@ -0,0 +1,319 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND_TABLE_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "backends.json"
+# "auto": calibration au démarrage si la table manque ou ne correspond plus aux
+# bibliothèques installées, "always": à chaque démarrage, "off": jamais (sur demande seulement)
+BACKEND_AUTOTUNE = os.getenv("BACKEND_AUTOTUNE", "auto").lower()
+BACKEND_BENCH_REPEATS = int(os.getenv("BACKEND_BENCH_REPEATS", "3"))
+# écart moyen maximal par défaut (niveaux de gris) avec le candidat de référence pour être retenu
+BACKEND_TOLERANCE = float(os.getenv("BACKEND_TOLERANCE", "2.0"))
+
+# (nom, nombre de pixels maximal, côté de l'image de calibration)
+SIZE_BUCKETS: List[Tuple[str, Optional[int], int]] = [
+    ("small", 512 * 512, 256),
+    ("medium", 2048 * 2048, 1024),
+    ("large", None, 2048),
+]
+BENCH_DTYPES = ("uint8", "float32")
+
+TABLE_VERSION = 1
+
+
+def size_bucket(image_array: np.ndarray) -> str:
+    pixels = image_array.shape[0] * image_array.shape[1]
+    for name, max_pixels, _ in SIZE_BUCKETS:
+        if max_pixels is None or pixels <= max_pixels:
+            return name
+    return SIZE_BUCKETS[-1][0]
+
+
+def table_key(operation: str, dtype: str, bucket: str) -> str:
+    return f"{operation}/{dtype}/{bucket}"
+
+
+def sample_image(side: int, dtype: str) -> np.ndarray:
+    """Image de calibration déterministe: dégradés et ondulations lentes plus un grain léger, comme une photo"""
+    y, x = np.mgrid[0:side, 0:side].astype(np.float32) / side
+    base = 127.5 + 60 * np.sin(6 * x + 3 * y) + 40 * np.cos(9 * y - 2 * x)
+    planes = np.stack([base, np.roll(base, side // 3, axis=1), base[::-1]], axis=-1)
+    grain = np.random.default_rng(side).normal(0, 6, planes.shape).astype(np.float32)
+    image = np.clip(planes + grain, 0, 255)
+    return np.rint(image).astype(np.uint8) if dtype == "uint8" else image.astype(np.float32)
+
+
+class Backend:
+    """Une implémentation candidate d'une opération"""
+
+    def __init__(self, name: str, run: Callable[..., np.ndarray], supports: Optional[Callable[..., bool]] = None):
+        self.name = name
+        self.run = run
+        self._supports = supports
+
+    def supports(self, image_array: np.ndarray, *args) -> bool:
+        return self._supports is None or self._supports(image_array, *args)
+
+
+class BackendRegistry:
+    """
+    Candidats par opération et choix du plus rapide. Une calibration mesure
+    chaque candidat par type (uint8, float32) et taille d'image, et classe ceux
+    dont le résultat reste dans l'écart toléré du candidat de référence (le
+    premier enregistré). La table et les choix forcés sont persistés en JSON.
+    À l'appel, le premier candidat du classement qui accepte les arguments
+    l'emporte; le candidat de référence sert de dernier recours.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._backends: Dict[str, List[Backend]] = {}
+        self._bench_args: Dict[str, Callable[[np.ndarray], tuple]] = {}
+        self._tolerances: Dict[str, float] = {}
+        self._fingerprint: Dict[str, Any] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._overrides: Dict[str, str] = {}
+        self._table_fingerprint: Optional[Dict[str, Any]] = None
+        self._benchmarked_at: Optional[str] = None
+        self._lock = threading.Lock()
+        self._benchmark_lock = threading.Lock()
+        self.benchmark_running = False
+        self._load()
+
+    def register(self, operation: str, backend: Backend):
+        self._backends.setdefault(operation, []).append(backend)
+
+    def set_bench_args(
+        self,
+        operation: str,
+        make_args: Callable[[np.ndarray], tuple],
+        tolerance: float = BACKEND_TOLERANCE
+    ):
+        """Arguments représentatifs de l'opération pour une image de calibration, et écart toléré"""
+        self._bench_args[operation] = make_args
+        self._tolerances[operation] = tolerance
+
+    def set_fingerprint(self, **versions):
+        """Versions des bibliothèques: une table mesurée avec d'autres versions est recalibrée"""
+        self._fingerprint = dict(versions)
+
+    def backend_names(self, operation: str) -> List[str]:
+        return [backend.name for backend in self._backends.get(operation, [])]
+
+    def _fingerprint_with_candidates(self) -> Dict[str, Any]:
+        return {
+            **self._fingerprint,
+            "candidates": {operation: self.backend_names(operation) for operation in sorted(self._backends)},
+        }
+
+    def is_stale(self) -> bool:
+        return self._table_fingerprint is None or self._table_fingerprint != self._fingerprint_with_candidates()
+
+    def needs_benchmark(self) -> bool:
+        if BACKEND_AUTOTUNE == "always":
+            return True
+        return BACKEND_AUTOTUNE == "auto" and self.is_stale()
+
+    def version(self) -> str:
+        """
+        Identifie les implémentations en vigueur (bibliothèques, candidats, classement,
+        choix forcés): change dès qu'un résultat peut changer
+        """
+        with self._lock:
+            state = {
+                "fingerprint": self._fingerprint_with_candidates(),
+                "rankings": {key: entry.get("ranking", []) for key, entry in self._entries.items()},
+                "overrides": self._overrides,
+            }
+        return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:16]
+
+    # sélection
+
+    def select(self, operation: str, image_array: np.ndarray, *args) -> Backend:
+        backends = self._backends[operation]
+        by_name = {backend.name: backend for backend in backends}
+        key = table_key(operation, image_array.dtype.name, size_bucket(image_array))
+
+        preferred = [self._overrides.get(key), self._overrides.get(operation)]
+        preferred += self._entries.get(key, {}).get("ranking", [])
+        for name in preferred:
+            backend = by_name.get(name) if name else None
+            if backend is not None and backend.supports(image_array, *args):
+                return backend
+        return backends[0]
+
+    # choix forcés
+
+    def validate_override(self, key: str, name: str):
+        parts = key.split("/")
+        operation = parts[0]
+        if operation not in self._backends:
+            raise ValueError(f"Unknown operation '{operation}'")
+        if len(parts) not in (1, 3):
+            raise ValueError(f"Invalid key '{key}': expected 'operation' or 'operation/dtype/bucket'")
+        if len(parts) == 3:
+            if parts[1] not in BENCH_DTYPES:
+                raise ValueError(f"Unknown dtype '{parts[1]}'")
+            if parts[2] not in {bucket for bucket, _, _ in SIZE_BUCKETS}:
+                raise ValueError(f"Unknown size bucket '{parts[2]}'")
+        if name not in self.backend_names(operation):
+            raise ValueError(f"Unknown backend '{name}' for '{operation}'")
+
+    def set_overrides(self, overrides: Dict[str, str]):
+        for key, name in overrides.items():
+            self.validate_override(key, name)
+        with self._lock:
+            self._overrides = dict(overrides)
+            self._save()
+
+    # calibration
+
+    def _time(self, backend: Backend, image_array: np.ndarray, args: tuple) -> Tuple[float, np.ndarray]:
+        result = backend.run(image_array, *args)
+        best = float("inf")
+        for _ in range(max(1, BACKEND_BENCH_REPEATS)):
+            started = time.perf_counter()
+            backend.run(image_array, *args)
+            best = min(best, time.perf_counter() - started)
+        return best * 1000, result
+
+    def _benchmark_entry(self, operation: str, image_array: np.ndarray) -> Optional[Dict[str, Any]]:
+        args = self._bench_args[operation](image_array)
+        candidates = [backend for backend in self._backends[operation] if backend.supports(image_array, *args)]
+        if len(candidates) < 2:
+            return None
+
+        timings: Dict[str, float] = {}
+        rejected: Dict[str, str] = {}
+        reference = None
+        for backend in candidates:
+            try:
+                elapsed, result = self._time(backend, image_array, args)
+            except Exception as e:
+                rejected[backend.name] = f"error: {e}"
+                continue
+
+            if reference is None:
+                reference = result.astype(np.float32)
+            elif result.shape != reference.shape:
+                rejected[backend.name] = f"shape {result.shape} != {reference.shape}"
+                continue
+            else:
+                difference = float(np.abs(result.astype(np.float32) - reference).mean())
+                if difference > self._tolerances[operation]:
+                    rejected[backend.name] = f"mean difference {difference:.2f}"
+                    continue
+            timings[backend.name] = round(elapsed, 3)
+
+        return {
+            "ranking": sorted(timings, key=timings.get),
+            "timings_ms": timings,
+            "rejected": rejected,
+            "size": list(image_array.shape[:2]),
+        }
+
+    def benchmark(self, operations: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Mesure les candidats et enregistre la table (appel bloquant, plusieurs secondes)"""
+        for operation in operations or []:
+            if operation not in self._bench_args:
+                raise ValueError(f"Unknown operation '{operation}'")
+
+        with self._benchmark_lock:
+            self.benchmark_running = True
+            started = time.perf_counter()
+            try:
+                entries = dict(self._entries) if operations else {}
+                for dtype in BENCH_DTYPES:
+                    for bucket, _, side in SIZE_BUCKETS:
+                        image_array = sample_image(side, dtype)
+                        for operation in operations or sorted(self._backends):
+                            if operation not in self._bench_args:
+                                continue
+                            entry = self._benchmark_entry(operation, image_array)
+                            key = table_key(operation, dtype, bucket)
+                            if entry is None:
+                                entries.pop(key, None)
+                            else:
+                                entries[key] = entry
+
+                with self._lock:
+                    self._entries = entries
+                    self._table_fingerprint = self._fingerprint_with_candidates()
+                    self._benchmarked_at = datetime.utcnow().isoformat()
+                    self._save()
+            finally:
+                self.benchmark_running = False
+
+        logger.info(f"Backend benchmark finished in {time.perf_counter() - started:.1f}s")
+        return self.describe()
+
+    async def autotune(self):
+        """Calibration de démarrage en tâche de fond: la table précédente sert en attendant"""
+        try:
+            await asyncio.to_thread(self.benchmark)
+        except Exception as e:
+            logger.error(f"Backend benchmark failed: {e}")
+
+    # persistance
+
+    def _load(self):
+        try:
+            with open(self.path) as table_file:
+                table = json.load(table_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable backend table {self.path}: {e}")
+            return
+
+        if table.get("version") != TABLE_VERSION:
+            return
+        self._entries = table.get("entries", {})
+        self._overrides = table.get("overrides", {})
+        self._table_fingerprint = table.get("fingerprint")
+        self._benchmarked_at = table.get("benchmarked_at")
+
+    def _save(self):
+        """Écriture atomique (appelé sous verrou)"""
+        table = {
+            "version": TABLE_VERSION,
+            "fingerprint": self._table_fingerprint,
+            "benchmarked_at": self._benchmarked_at,
+            "entries": self._entries,
+            "overrides": self._overrides,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(table, tmp_file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save backend table {self.path}: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "candidates": {operation: self.backend_names(operation) for operation in sorted(self._backends)},
+            "size_buckets": {
+                name: max_pixels for name, max_pixels, _ in SIZE_BUCKETS
+            },
+            "table": self._entries,
+            "overrides": self._overrides,
+            "benchmarked_at": self._benchmarked_at,
+            "stale": self.is_stale(),
+            "benchmark_running": self.benchmark_running,
+            "autotune": BACKEND_AUTOTUNE,
+            "path": str(self.path),
+        }
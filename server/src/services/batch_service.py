@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import Depends
+from sqlalchemy import select
+
+from src.models.database import ImageDB
+from src.models.image import ImageProcess
+from src.storage.blob_store import blob_store
+from src.services.image_service import ImageService
+from src.services.decode_cache import decode_cache
+from src.services.executor import processing_executor, FILTER_THREADS
+from src.services.pipeline_service import PipelineStep, optimize_steps, run_pipeline
+from src.services import codec
+
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(FILTER_THREADS)))
+# nombre de résultats enregistrés par transaction
+BATCH_WRITE_SIZE = int(os.getenv("BATCH_WRITE_SIZE", "32"))
+BATCH_MAX_IMAGES = 10000
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _render(image_array: np.ndarray, steps: List[PipelineStep]) -> np.ndarray:
+    height, width = image_array.shape[:2]
+    return run_pipeline(image_array, optimize_steps(steps, (width, height)))
+
+
+def summarize(operation: str, items: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    succeeded = sum(1 for item in items if item["status"] == "succeeded")
+    return {
+        "operation": operation,
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "elapsed_ms": _elapsed_ms(started),
+        "items": items
+    }
+
+
+def missing_items(image_ids: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {"image_id": image_id, "status": "failed", "result_image_id": None, "error": "Image not found"}
+        for image_id in image_ids
+    ]
+
+
+class BatchService:
+    """
+    Applique une même opération à un lot d'images: les traitements s'exécutent
+    en parallèle (au plus `concurrency` images décodées à la fois) et les
+    résultats sont enregistrés par ImageService, par transactions de
+    BATCH_WRITE_SIZE images, sur la même session.
+    """
+
+    def __init__(self, image_service: ImageService = Depends()):
+        self.image_service = image_service
+        self.db = image_service.db
+        # la session n'accepte pas d'opérations concurrentes
+        self._db_lock = asyncio.Lock()
+
+    async def resolve_images(
+        self,
+        project_id: Optional[str] = None,
+        image_ids: Optional[List[str]] = None
+    ) -> Tuple[List[ImageDB], List[str]]:
+        """Images du lot (dans l'ordre demandé, ou de création pour un projet) et ids introuvables"""
+        if project_id is not None:
+            query = select(ImageDB).where(ImageDB.project_id == project_id).order_by(ImageDB.created_at, ImageDB.id)
+        else:
+            query = select(ImageDB).where(ImageDB.id.in_(set(image_ids)))
+        images = (await self.db.scalars(query)).all()
+
+        # détachées: le rollback d'un lot d'écriture en échec ne les expire pas
+        for db_image in images:
+            self.db.expunge(db_image)
+
+        if project_id is not None:
+            return list(images), []
+
+        found = {db_image.id: db_image for db_image in images}
+        ordered = list(dict.fromkeys(image_ids))
+        return [found[i] for i in ordered if i in found], [i for i in ordered if i not in found]
+
+    async def run(
+        self,
+        images: List[ImageDB],
+        process_data: ImageProcess,
+        steps: List[PipelineStep],
+        concurrency: int = BATCH_CONCURRENCY,
+        on_progress: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Traite le lot et retourne un résultat (avec durées) par image, dans l'ordre du lot.
+        `on_progress` reçoit les résultats définitifs (échec, ou image enregistrée)
+        au fur et à mesure.
+        """
+        items: List[Optional[Dict[str, Any]]] = [None] * len(images)
+        pending: List[Tuple[int, float, bytes]] = []
+        queue = iter(enumerate(images))
+
+        async def worker():
+            for index, db_image in queue:
+                items[index] = {"image_id": db_image.id, "status": "failed", "result_image_id": None}
+                started = time.perf_counter()
+                try:
+                    timings, data = await self._process(db_image, steps)
+                    items[index]["timings"] = timings
+                except Exception as e:
+                    items[index].update(error=str(e), timings={"total_ms": _elapsed_ms(started)})
+                    finished = [items[index]]
+                else:
+                    pending.append((index, started, data))
+                    finished = []
+                    if len(pending) >= BATCH_WRITE_SIZE:
+                        finished = await self._flush(images, items, pending, process_data)
+
+                if on_progress is not None and finished:
+                    await on_progress(finished)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(images))))))
+        finished = await self._flush(images, items, pending, process_data)
+        if on_progress is not None and finished:
+            await on_progress(finished)
+        return items
+
+    async def _process(self, db_image: ImageDB, steps: List[PipelineStep]) -> Tuple[Dict[str, float], bytes]:
+        timings = {}
+
+        started = time.perf_counter()
+        # les images déjà décodées pour l'éditeur sont réutilisées, sans remplir le cache
+        image_array = decode_cache.get(db_image.id, db_image.checksum)
+        if image_array is None:
+            if db_image.blob_key:
+                data = await processing_executor.run_threaded(blob_store.read, db_image.blob_key)
+            else:
+                async with self._db_lock:
+                    data = await self.image_service.get_image_bytes(db_image.id)
+            image_array = await processing_executor.run_threaded(codec.decode, data)
+        timings["load_ms"] = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        result_array = await processing_executor.run_threaded(_render, image_array, steps)
+        timings["process_ms"] = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        result = await processing_executor.run_threaded(
+            codec.encode, result_array, codec.image_format(db_image.content_type)
+        )
+        timings["encode_ms"] = _elapsed_ms(started)
+
+        return timings, result
+
+    async def _flush(
+        self,
+        images: List[ImageDB],
+        items: List[Dict[str, Any]],
+        pending: List[Tuple[int, float, bytes]],
+        process_data: ImageProcess
+    ) -> List[Dict[str, Any]]:
+        async with self._db_lock:
+            batch, pending[:] = list(pending), []
+            if not batch:
+                return []
+
+            started = time.perf_counter()
+            try:
+                saved = await self.image_service.save_processed_images([
+                    (images[index], data, process_data)
+                    for index, _, data in batch
+                ])
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"Error saving batch results: {e}")
+                saved = [e] * len(batch)
+            save_ms = _elapsed_ms(started)
+
+        for (index, item_started, _), result in zip(batch, saved):
+            item = items[index]
+            if isinstance(result, Exception):
+                item["error"] = str(result)
+            else:
+                item.update(status="succeeded", result_image_id=result.id)
+            item["timings"].update(save_ms=save_ms, total_ms=_elapsed_ms(item_started))
+        return [items[index] for index, _, _ in batch]
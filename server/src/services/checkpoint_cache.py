@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.result_cache import _canonical
+
+# un état float32 d'une photo RGB de 24 Mpx pèse 288 Mo: le budget par défaut en garde deux
+CHECKPOINT_CACHE_BYTES = int(os.getenv("CHECKPOINT_CACHE_BYTES", str(768 * 1024 * 1024)))
+# coût de calcul (ms) à accumuler depuis le dernier état conservé avant d'en garder un
+# nouveau: refaire quelques étapes rapides coûte moins que la mémoire d'un état
+CHECKPOINT_MIN_MS = float(os.getenv("CHECKPOINT_MIN_MS", "20"))
+
+
+def prefix_keys(source: str, edits: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """
+    Clé de l'état après chaque retouche: hash chaîné du contenu source et des
+    retouches précédentes. Modifier la retouche k change les clés à partir de k
+    et laisse intactes celles des états antérieurs.
+    """
+    keys = []
+    key = source
+    for operation, parameters in edits:
+        step = json.dumps([operation, _canonical(parameters)], sort_keys=True, separators=(",", ":"))
+        key = hashlib.sha256(f"{key}\n{step}".encode()).hexdigest()
+        keys.append(key)
+    return keys
+
+
+def _compact(array: np.ndarray) -> np.ndarray:
+    """
+    Forme stockée d'un état: un état float32 qui ne contient que des entiers
+    0..255 (aucune opération non entière encore appliquée) tient sans perte
+    en uint8, quatre fois plus petit. Vue en lecture seule sinon.
+    """
+    if array.dtype == np.float32 and array.size:
+        if array.min() >= 0 and array.max() <= 255 and np.array_equal(array, np.floor(array)):
+            compact = array.astype(np.uint8)
+            compact.flags.writeable = False
+            return compact
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class _Checkpoint:
+    def __init__(self, source: str, array: np.ndarray, dtype: np.dtype, cost_ms: float, priority: float):
+        self.source = source
+        self.array = array
+        # type de l'état calculé, rétabli à la lecture
+        self.dtype = dtype
+        self.cost_ms = cost_ms
+        self.priority = priority
+
+    def state(self) -> np.ndarray:
+        if self.array.dtype == self.dtype:
+            return self.array
+        state = self.array.astype(self.dtype)
+        state.flags.writeable = False
+        return state
+
+
+class CheckpointCache:
+    """
+    États intermédiaires des rendus de piles de retouches (arrays numpy, en
+    lecture seule), indexés par clé de préfixe. Budget mémoire partagé par tout
+    le processus, éviction GreedyDual-Size: la priorité d'un état est son coût
+    de recalcul par Mo, majorée de l'« inflation » courante à chaque accès.
+    Un état cher et compact survit à un état bon marché et volumineux, et un
+    état qui n'est plus lu finit par sortir.
+    """
+
+    def __init__(self, max_bytes: int = CHECKPOINT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: Dict[str, _Checkpoint] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._inflation = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def _value(cost_ms: float, nbytes: int) -> float:
+        return cost_ms / max(nbytes / (1024 * 1024), 1e-3)
+
+    def resume(self, keys: List[str]) -> Tuple[int, Optional[np.ndarray], float]:
+        """
+        État conservé le plus avancé de la suite: (nombre de retouches déjà
+        appliquées, état, coût de calcul qu'il représente), ou (0, None, 0)
+        """
+        with self._lock:
+            for index in range(len(keys) - 1, -1, -1):
+                entry = self._entries.get(keys[index])
+                if entry is None:
+                    continue
+                entry.priority = self._inflation + self._value(entry.cost_ms, entry.array.nbytes)
+                self.hits += 1
+                self.saved_ms += entry.cost_ms
+                return index + 1, entry.state(), entry.cost_ms
+            self.misses += 1
+            return 0, None, 0.0
+
+    def put(self, source: Optional[str], key: str, array: np.ndarray, cost_ms: float) -> bool:
+        """
+        Conserve un état (coût: temps de calcul depuis l'image décodée); False
+        s'il n'est pas retenu. L'array du rendu n'est pas modifié: le cache garde
+        une vue en lecture seule, ou une copie uint8 quand c'est sans perte. Un
+        état plus grand que le budget entier n'est jamais conservé.
+        """
+        if not source:
+            # sans checksum l'entrée ne pourrait pas être invalidée
+            return False
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # même clé, même état: rafraîchi seulement
+                existing.priority = self._inflation + self._value(existing.cost_ms, existing.array.nbytes)
+                return True
+
+        stored = _compact(array)
+        if stored.nbytes > self.max_bytes:
+            return False
+
+        priority = self._inflation + self._value(cost_ms, stored.nbytes)
+        with self._lock:
+            if key in self._entries:
+                return True
+
+            # évictions décidées avant d'en faire aucune: seuls les états de
+            # moindre valeur peuvent céder leur place, et seulement si cela suffit
+            victims, freed = [], 0
+            needed = self._bytes + stored.nbytes - self.max_bytes
+            for victim_key in sorted(self._entries, key=lambda k: self._entries[k].priority):
+                if freed >= needed:
+                    break
+                if self._entries[victim_key].priority > priority:
+                    break
+                victims.append(victim_key)
+                freed += self._entries[victim_key].array.nbytes
+            if freed < needed:
+                return False
+
+            for victim_key in victims:
+                victim = self._entries.pop(victim_key)
+                self._bytes -= victim.array.nbytes
+                self._inflation = max(self._inflation, victim.priority)
+                self.evictions += 1
+
+            self._entries[key] = _Checkpoint(source, stored, array.dtype, cost_ms, priority)
+            self._bytes += stored.nbytes
+            return True
+
+    def invalidate(self, source: str):
+        """États calculés à partir d'un contenu qui disparaît"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.source == source]:
+                self._bytes -= self._entries.pop(key).array.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._inflation = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "min_step_cost_ms": CHECKPOINT_MIN_MS,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_ms": round(self.saved_ms, 1)
+            }
+
+
+checkpoint_cache = CheckpointCache()
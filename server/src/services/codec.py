@@ -0,0 +1,37 @@
+import io
+from typing import Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+
+
+def image_format(content_type: str) -> str:
+    """Format PIL correspondant à un type MIME ('image/jpg' -> 'JPEG')"""
+    subtype = content_type.split("/")[-1].lower()
+    return "JPEG" if subtype in ("jpg", "jpeg") else subtype.upper()
+
+
+def decode(data: bytes) -> np.ndarray:
+    """Décode une image en array RGB uint8 (appel bloquant)"""
+    image = PILImage.open(io.BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(image)
+
+
+def decode_proxy(data: bytes, size: Tuple[int, int]) -> np.ndarray:
+    """Décodage à échelle réduite: les JPEG sont décodés directement en 1/2, 1/4 ou 1/8"""
+    image = PILImage.open(io.BytesIO(data))
+    image.draft("RGB", size)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(image.resize(size, PILImage.Resampling.LANCZOS, reducing_gap=3.0))
+
+
+def encode(image_array: np.ndarray, format: str) -> bytes:
+    """Encode un array dans un format PIL; un array float est arrondi et écrêté à 0..255"""
+    if image_array.dtype != np.uint8:
+        image_array = np.clip(np.rint(image_array), 0, 255).astype(np.uint8)
+    output = io.BytesIO()
+    PILImage.fromarray(image_array).save(output, format=format.upper())
+    return output.getvalue()
@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image as PILImage
+from sqlalchemy import select, update, delete, func, bindparam
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database import ImageContentDB
+from src.storage.blob_store import blob_store
+from src.services.result_cache import result_cache
+from src.services.checkpoint_cache import checkpoint_cache
+from src.services.preview_store import preview_store
+
+logger = logging.getLogger(__name__)
+
+# purge_blob et commit_contents: pas de suppression de blob entre la vérification
+# qu'un blob existe et le commit de la ligne qui le référence
+_blob_lock = asyncio.Lock()
+
+
+class BlobMissing(RuntimeError):
+    """Blob supprimé avant d'être référencé, sans moyen de le réécrire"""
+
+
+class DedupStats:
+    """Compteurs de déduplication depuis le démarrage du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+dedup_stats = DedupStats()
+
+
+def compute_checksum(data: bytes) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+def probe_image(source):
+    """
+    Lit uniquement l'en-tête de l'image (bytes ou chemin de fichier):
+    dimensions et nombre de canaux
+    """
+    width, height, channels = None, None, None
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        with PILImage.open(source) as pil_image:
+            width, height = pil_image.size
+            channels = len(pil_image.getbands()) if pil_image.mode else None
+    except Exception as e:
+        logger.warning(f"Could not extract image metadata: {e}")
+    return width, height, channels
+
+
+def prepare_content(
+    data: Optional[bytes],
+    checksum: str,
+    header: Optional[Tuple[Optional[int], Optional[int], Optional[int]]] = None,
+    rewrite: Optional[Callable[[], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Écrit le blob d'un nouveau contenu et lit ses dimensions (appel bloquant).
+    `data=None` désigne un contenu déjà écrit en flux dans le blob store;
+    `header` évite de relire l'en-tête quand il a déjà été analysé pendant le flux.
+    `rewrite` réécrit ce blob s'il a été supprimé depuis (sinon BlobMissing).
+    """
+    if data is None:
+        blob_key = checksum
+        if not blob_store.exists(blob_key):
+            if rewrite is None:
+                raise BlobMissing(f"Blob {blob_key} was removed before it could be referenced")
+            rewrite()
+        width, height, channels = header or probe_image(blob_store.path_for(blob_key))
+        file_size = blob_store.size(blob_key)
+    else:
+        width, height, channels = probe_image(data)
+        blob_key = blob_store.put(data, checksum)
+        file_size = len(data)
+
+    return {
+        "checksum": checksum,
+        "blob_key": blob_key,
+        "file_size": file_size,
+        "width": width,
+        "height": height,
+        "channels": channels
+    }
+
+
+async def acquire_content(
+    db: AsyncSession,
+    data: bytes,
+    checksum: Optional[str] = None
+) -> ImageContentDB:
+    """
+    Référence un contenu dans la transaction courante et retourne sa ligne.
+    Un contenu déjà connu ne coûte qu'une mise à jour du compteur: pas de
+    décodage, pas d'écriture de blob.
+    """
+    checksum = checksum or await run_in_threadpool(compute_checksum, data)
+
+    contents, errors = await acquire_contents(db, {checksum: data}, {checksum: 1})
+    if checksum in errors:
+        raise errors[checksum]
+    return contents[checksum]
+
+
+async def acquire_contents(
+    db: AsyncSession,
+    data_by_checksum: Dict[str, Optional[bytes]],
+    references: Dict[str, int],
+    headers: Optional[Dict[str, Tuple]] = None,
+    rewrites: Optional[Dict[str, Callable[[], Any]]] = None
+) -> Tuple[Dict[str, ImageContentDB], Dict[str, Exception]]:
+    """
+    Version par lot: `references[checksum]` références sont ajoutées à chaque contenu.
+    Les contenus inconnus sont préparés en parallèle; ceux dont l'écriture échoue
+    sont retournés dans le second dictionnaire au lieu d'interrompre le lot.
+    """
+    headers = headers or {}
+    rewrites = rewrites or {}
+    checksums = list(references)
+    contents_table = ImageContentDB.__table__
+
+    known = set((await db.scalars(
+        select(ImageContentDB.checksum).where(ImageContentDB.checksum.in_(checksums))
+    )).all())
+
+    for checksum in checksums:
+        count = references[checksum]
+        for position in range(count):
+            dedup_stats.record(hit=checksum in known or position > 0)
+
+    unknown = [checksum for checksum in checksums if checksum not in known]
+    prepared = await asyncio.gather(
+        *(run_in_threadpool(
+            prepare_content, data_by_checksum[checksum], checksum, headers.get(checksum), rewrites.get(checksum)
+          ) for checksum in unknown),
+        return_exceptions=True
+    )
+
+    errors: Dict[str, Exception] = {}
+    new_rows = []
+    for checksum, result in zip(unknown, prepared):
+        if isinstance(result, Exception):
+            errors[checksum] = result
+        else:
+            new_rows.append({**result, "ref_count": references[checksum]})
+
+    if known:
+        await db.execute(
+            contents_table.update()
+            .where(contents_table.c.checksum == bindparam("b_checksum"))
+            .values(ref_count=contents_table.c.ref_count + bindparam("b_references")),
+            [{"b_checksum": checksum, "b_references": references[checksum]} for checksum in known]
+        )
+
+    if new_rows:
+        # upsert: deux imports simultanés du même contenu ne se marchent pas dessus
+        upsert = insert(contents_table)
+        await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[contents_table.c.checksum],
+                set_={"ref_count": contents_table.c.ref_count + upsert.excluded.ref_count}
+            ),
+            new_rows
+        )
+
+    acquired = [checksum for checksum in checksums if checksum not in errors]
+    contents = (await db.scalars(
+        select(ImageContentDB)
+        .where(ImageContentDB.checksum.in_(acquired))
+        .execution_options(populate_existing=True)
+    )).all()
+
+    return {content.checksum: content for content in contents}, errors
+
+
+async def commit_contents(
+    db: AsyncSession,
+    blob_keys: Dict[str, Optional[Callable[[], Any]]]
+):
+    """
+    Valide la transaction qui vient de référencer ces blobs. Un blob écrit avant
+    que sa ligne image_contents existe a pu être supprimé entre-temps par
+    purge_blob: il est réécrit par `blob_keys[clé]` (appel bloquant) avant le
+    commit, ou BlobMissing si aucune fonction n'est fournie.
+    """
+    async with _blob_lock:
+        for blob_key, rewrite in blob_keys.items():
+            if await run_in_threadpool(blob_store.exists, blob_key):
+                continue
+            if rewrite is None:
+                raise BlobMissing(f"Blob {blob_key} was removed before it could be referenced")
+            logger.warning(f"Blob {blob_key} removed concurrently, writing it again")
+            await run_in_threadpool(rewrite)
+        await db.commit()
+
+
+async def release_content(db: AsyncSession, checksum: Optional[str]) -> Optional[str]:
+    """
+    Retire une référence dans la transaction courante. Retourne la clé du blob
+    à supprimer (après commit) quand plus aucune image ne l'utilise.
+    """
+    if not checksum:
+        return None
+
+    remaining = await db.scalar(
+        update(ImageContentDB)
+        .where(ImageContentDB.checksum == checksum)
+        .values(ref_count=ImageContentDB.ref_count - 1)
+        .returning(ImageContentDB.ref_count)
+    )
+
+    if remaining is None or remaining > 0:
+        return None
+
+    blob_key = await db.scalar(
+        delete(ImageContentDB)
+        .where(ImageContentDB.checksum == checksum)
+        .returning(ImageContentDB.blob_key)
+    )
+    return blob_key
+
+
+async def purge_blob(db: AsyncSession, blob_key: Optional[str]):
+    """Supprime le blob si aucun contenu ne l'a re-référencé entre-temps"""
+    if not blob_key:
+        return
+
+    async with _blob_lock:
+        still_referenced = await db.scalar(
+            select(ImageContentDB.checksum).where(ImageContentDB.blob_key == blob_key)
+        )
+        if still_referenced is None:
+            await run_in_threadpool(blob_store.delete, blob_key)
+
+    if still_referenced is None:
+        # résultats de filtres, états de rendu et aperçus sont indexés par le checksum (= clé du blob)
+        await run_in_threadpool(result_cache.invalidate, blob_key)
+        checkpoint_cache.invalidate(blob_key)
+        await run_in_threadpool(preview_store.invalidate, blob_key)
+
+
+async def get_dedup_report(db: AsyncSession) -> Dict[str, Any]:
+    contents, references, stored_bytes, saved_bytes = (await db.execute(
+        select(
+            func.count(ImageContentDB.checksum),
+            func.coalesce(func.sum(ImageContentDB.ref_count), 0),
+            func.coalesce(func.sum(ImageContentDB.file_size), 0),
+            func.coalesce(func.sum((ImageContentDB.ref_count - 1) * ImageContentDB.file_size), 0)
+        )
+    )).one()
+
+    return {
+        **dedup_stats.snapshot(),
+        "unique_contents": contents,
+        "references": references,
+        "stored_bytes": stored_bytes,
+        "saved_bytes": saved_bytes
+    }
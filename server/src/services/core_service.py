@@ -1,22 +1,115 @@
 import numpy as np
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
+from pathlib import Path
+import importlib.util
 import cv2
 import logging
+import math
+import os
+import PIL
+from PIL import Image
+
+from src.services.backend_registry import Backend, BackendRegistry, DEFAULT_BACKEND_TABLE_PATH
 
 logger = logging.getLogger(__name__)
 
+CORE_MODULE_NAME = "bettergimp_py"
+# "auto": module C++ s'il est trouvé, "opencv": toujours le repli OpenCV
+CORE_BACKEND = os.getenv("CORE_BACKEND", "auto").lower()
+CORE_BUILD_DIR = Path(__file__).resolve().parents[3] / "core" / "build"
+
+# au-delà, le flou gaussien est approché par des flous boîte successifs: coût
+# constant par pixel quel que soit sigma (noyau exact: 6 * sigma + 1 coefficients)
+BOX_BLUR_MIN_SIGMA = float(os.getenv("BOX_BLUR_MIN_SIGMA", "10"))
+BOX_BLUR_PASSES = 3
+
+# types acceptés par le module C++ sans conversion
+NATIVE_DTYPES = (np.uint8, np.uint16, np.float32)
+
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,
+    'linear': cv2.INTER_LINEAR,
+    'cubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+    'area': cv2.INTER_AREA
+}
+
+
+def box_blur_sizes(sigma: float, passes: int = BOX_BLUR_PASSES) -> List[int]:
+    """
+    Largeurs impaires de `passes` flous boîte dont les variances s'additionnent
+    à sigma² (Kovesi, "Fast Almost-Gaussian Filtering"): les premières passes
+    prennent la largeur impaire inférieure à l'idéal, les suivantes la supérieure.
+    """
+    ideal = math.sqrt(12 * sigma * sigma / passes + 1)
+    lower = int(ideal)
+    if lower % 2 == 0:
+        lower -= 1
+    upper = lower + 2
+    lower_count = round(
+        (12 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes) / (-4 * lower - 4)
+    )
+    return [lower if index < lower_count else upper for index in range(passes)]
+
+
+def _candidate_module_paths():
+    """BETTERGIMP_CORE_PATH (fichier ou dossier), puis les builds de core/build/<preset>"""
+    configured = os.getenv("BETTERGIMP_CORE_PATH")
+    if configured:
+        path = Path(configured)
+        yield from (sorted(path.glob(f"{CORE_MODULE_NAME}*")) if path.is_dir() else [path])
+    if CORE_BUILD_DIR.is_dir():
+        yield from sorted(CORE_BUILD_DIR.glob(f"*/{CORE_MODULE_NAME}*"))
+
+
+def _load_core_module():
+    try:
+        return importlib.import_module(CORE_MODULE_NAME)
+    except ImportError:
+        pass
+
+    for path in _candidate_module_paths():
+        if path.suffix not in (".so", ".pyd"):
+            continue
+        spec = importlib.util.spec_from_file_location(CORE_MODULE_NAME, path)
+        if spec is None or spec.loader is None:
+            continue
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    raise ImportError(f"{CORE_MODULE_NAME} not found")
+
+
 class CoreImageService:
-    """Service pour interfacer avec le core C++ Better GIMP"""
+    """
+    Service pour interfacer avec le core C++ Better GIMP.
+    Chaque opération a plusieurs implémentations (OpenCV, PIL, core C++);
+    le registre choisit la plus rapide selon le type et la taille de l'image.
+    """
     
-    def __init__(self):
+    def __init__(self, backend_table_path: Path = DEFAULT_BACKEND_TABLE_PATH):
         self._core_available = False
         self._core_module = None
+        self._processor = None
         self._initialize_core()
+        self.backends = BackendRegistry(backend_table_path)
+        self._register_backends()
     
     def _initialize_core(self):
+        if CORE_BACKEND == "opencv":
+            logger.info("CORE_BACKEND=opencv: using OpenCV fallback for image processing")
+            return
+
         try:
-            logger.info("Using OpenCV fallback for image processing")
-            self._core_available = False
+            module = _load_core_module()
+            if not module.initialize(0):
+                raise RuntimeError("core initialization failed")
+
+            self._core_module = module
+            self._processor = module.ImageProcessor()
+            self._core_available = True
+            logger.info(f"Using Better GIMP Core {module.getVersion()} ({getattr(module, '__file__', '?')})")
             
         except ImportError:
             logger.warning("Better GIMP Core C++ module not available, using OpenCV fallback")
@@ -25,26 +118,68 @@ class CoreImageService:
             logger.error(f"Error initializing Better GIMP Core: {e}")
             self._core_available = False
 
+    def _register_backends(self):
+        """Le premier candidat de chaque opération est la référence (OpenCV, toujours disponible)"""
+        registry = self.backends
+        registry.register("gaussian_blur", Backend("opencv", self._gaussian_blur_opencv))
+        registry.register("sharpen", Backend("opencv", self._sharpen_opencv))
+        registry.register("brightness_contrast", Backend("opencv", self._brightness_contrast_opencv))
+        registry.register("brightness_contrast", Backend("lut", self._brightness_contrast_lut, _is_uint8))
+        registry.register("resize", Backend("opencv", self._resize_opencv))
+        registry.register("resize", Backend("pil_reduce", self._resize_pil_reduce, _pil_reducible))
+        registry.register("rotate", Backend("opencv", self._rotate_opencv))
+
+        if self._core_available:
+            registry.register("gaussian_blur", Backend("native", self._gaussian_blur_native, _native_compatible))
+            # le repli OpenCV rend de l'uint8 pour ces deux opérations
+            registry.register("sharpen", Backend("native", self._sharpen_native, _is_uint8))
+            registry.register("brightness_contrast", Backend("native", self._brightness_contrast_native, _is_uint8))
+            registry.register("resize", Backend("native", self._resize_native, _native_compatible))
+            registry.register("rotate", Backend("native", self._rotate_native, _native_compatible))
+
+        registry.set_bench_args("gaussian_blur", lambda image: (3.0,))
+        registry.set_bench_args("sharpen", lambda image: (1.0, 2.0))
+        registry.set_bench_args("brightness_contrast", lambda image: (20.0, 1.2))
+        # réduction par moyenne de blocs: le seul cas où PIL (reduce) rend le même résultat que cv2
+        registry.set_bench_args("resize", lambda image: (image.shape[1] // 2, image.shape[0] // 2, 'area'))
+        registry.set_bench_args("rotate", lambda image: (15.0,))
+        registry.set_fingerprint(
+            opencv=cv2.__version__,
+            pil=PIL.__version__,
+            core=self._core_module.getVersion() if self._core_available else None
+        )
+
+    def processing_version(self) -> str:
+        """
+        Version des traitements (implémentations choisies, paramètres du flou par
+        boîtes): fait partie des clés des caches de résultats, qui survivent aux
+        redémarrages
+        """
+        return f"{self.backends.version()}-box{BOX_BLUR_MIN_SIGMA:g}x{BOX_BLUR_PASSES}"
+
     def is_core_available(self) -> bool:
         """Vérifie si le core C++ est disponible"""
         return self._core_available
     
     def get_core_info(self) -> Dict[str, Any]:
-        """Retourne les informations sur le core"""
+        """Retourne les informations sur le core et la table de choix des implémentations"""
         if self._core_available and self._core_module:
-            return {
+            info = {
                 "available": True,
                 "version": self._core_module.getVersion(),
                 "simd_available": self._core_module.isSimdAvailable(),
-                "backend": "C++ Core"
+                "backend": "C++ Core",
+                "module_path": getattr(self._core_module, "__file__", None)
             }
         else:
-            return {
+            info = {
                 "available": False,
                 "version": cv2.__version__,
                 "simd_available": False,
                 "backend": "OpenCV Python"
             }
+        info["backends"] = self.backends.describe()
+        return info
     
     def apply_gaussian_blur(self, image_array: np.ndarray, sigma: float = 1.0) -> np.ndarray:
         """
@@ -58,41 +193,81 @@ class CoreImageService:
             Array numpy de l'image filtrée
         """
         try:
-            kernel_size = int(6 * sigma + 1)
-            if kernel_size % 2 == 0:
-                kernel_size += 1
-            
-            result = cv2.GaussianBlur(image_array, (kernel_size, kernel_size), sigma)
-            logger.info(f"Applied Gaussian blur (sigma={sigma}) using OpenCV")
+            if sigma > BOX_BLUR_MIN_SIGMA:
+                result = self._gaussian_blur_boxes(image_array, sigma)
+                logger.info(f"Applied Gaussian blur (sigma={sigma}) using {BOX_BLUR_PASSES} box blurs")
+                return result
+
+            backend = self.backends.select("gaussian_blur", image_array, sigma)
+            result = backend.run(image_array, sigma)
+            logger.info(f"Applied Gaussian blur (sigma={sigma}) using {backend.name}")
             return result
             
         except Exception as e:
             logger.error(f"Error applying Gaussian blur: {e}")
             raise
+
+    def _gaussian_blur_opencv(self, image_array: np.ndarray, sigma: float) -> np.ndarray:
+        kernel_size = int(6 * sigma + 1)
+        if kernel_size % 2 == 0:
+            kernel_size += 1
+        return cv2.GaussianBlur(image_array, (kernel_size, kernel_size), sigma)
+
+    def _gaussian_blur_boxes(self, image_array: np.ndarray, sigma: float) -> np.ndarray:
+        """
+        Grands rayons: trois flous boîte (cv2.blur, sommes glissantes) en float32.
+        Écart avec le noyau exact, image 8 bits à bords francs: moyenne 0,06 niveau
+        et maximum 2,5 à sigma 10; moyenne 1 et maximum 5 à sigma 200. Pire cas
+        mesuré (mosaïque de blocs contrastés): moyenne 1 et maximum 6, vérifié par
+        tests/test_backends.py.
+        """
+        result = image_array.astype(np.float32)
+        for size in box_blur_sizes(sigma):
+            result = cv2.blur(result, (size, size))
+
+        if image_array.dtype == np.float32:
+            return result
+        limits = np.iinfo(image_array.dtype)
+        return np.clip(np.rint(result), limits.min, limits.max).astype(image_array.dtype)
+
+    def _gaussian_blur_native(self, image_array: np.ndarray, sigma: float) -> np.ndarray:
+        # noyau choisi par le core (ksize 0): jusqu'à 4 sigma en float32
+        return self._processor.gaussianBlur(image_array, sigma)
     
-    def apply_sharpen_filter(self, image_array: np.ndarray, strength: float = 1.0) -> np.ndarray:
+    def apply_sharpen_filter(
+        self,
+        image_array: np.ndarray,
+        strength: float = 1.0,
+        radius: float = 1.0
+    ) -> np.ndarray:
         """
         Applique un filtre de netteté (unsharp mask)
         
         Args:
             image_array: Array numpy de l'image
             strength: Force du filtre (0.0 à 2.0)
+            radius: Sigma du flou soustrait (réduit en mode proxy)
             
         Returns:
             Array numpy de l'image filtrée
         """
         try:
-            blurred = cv2.GaussianBlur(image_array, (0, 0), 1.0)
-            
-            sharpened = cv2.addWeighted(image_array, 1.0 + strength, blurred, -strength, 0)
-            
-            result = np.clip(sharpened, 0, 255).astype(np.uint8)
-            logger.info(f"Applied sharpen filter (strength={strength}) using OpenCV")
+            backend = self.backends.select("sharpen", image_array, strength, radius)
+            result = backend.run(image_array, strength, radius)
+            logger.info(f"Applied sharpen filter (strength={strength}) using {backend.name}")
             return result
             
         except Exception as e:
             logger.error(f"Error applying sharpen filter: {e}")
             raise
+
+    def _sharpen_opencv(self, image_array: np.ndarray, strength: float, radius: float) -> np.ndarray:
+        blurred = cv2.GaussianBlur(image_array, (0, 0), radius)
+        sharpened = cv2.addWeighted(image_array, 1.0 + strength, blurred, -strength, 0)
+        return np.clip(sharpened, 0, 255).astype(np.uint8)
+
+    def _sharpen_native(self, image_array: np.ndarray, strength: float, radius: float) -> np.ndarray:
+        return self._processor.unsharpMask(image_array, radius, strength)
     
     def adjust_brightness_contrast(
         self, 
@@ -112,16 +287,26 @@ class CoreImageService:
             Array numpy de l'image ajustée
         """
         try:
-            alpha = contrast
-            beta = brightness
-            
-            result = cv2.convertScaleAbs(image_array, alpha=alpha, beta=beta)
-            logger.info(f"Applied brightness/contrast (b={brightness}, c={contrast}) using OpenCV")
+            backend = self.backends.select("brightness_contrast", image_array, brightness, contrast)
+            result = backend.run(image_array, brightness, contrast)
+            logger.info(f"Applied brightness/contrast (b={brightness}, c={contrast}) using {backend.name}")
             return result
             
         except Exception as e:
             logger.error(f"Error adjusting brightness/contrast: {e}")
             raise
+
+    def _brightness_contrast_opencv(self, image_array: np.ndarray, brightness: float, contrast: float) -> np.ndarray:
+        return cv2.convertScaleAbs(image_array, alpha=contrast, beta=brightness)
+
+    def _brightness_contrast_lut(self, image_array: np.ndarray, brightness: float, contrast: float) -> np.ndarray:
+        # même calcul que convertScaleAbs, fait une fois par niveau au lieu d'une fois par pixel
+        table = cv2.convertScaleAbs(np.arange(256, dtype=np.uint8), alpha=contrast, beta=brightness)
+        return cv2.LUT(image_array, table)
+
+    def _brightness_contrast_native(self, image_array: np.ndarray, brightness: float, contrast: float) -> np.ndarray:
+        # le core attend des pourcentages: beta = b * 2.55, alpha = (c + 100) / 100
+        return self._processor.adjustBrightnessContrast(image_array, brightness / 2.55, (contrast - 1.0) * 100.0)
     
     def resize_image(
         self, 
@@ -142,21 +327,27 @@ class CoreImageService:
             Array numpy de l'image redimensionnée
         """
         try:
-            interpolation_map = {
-                'nearest': cv2.INTER_NEAREST,
-                'linear': cv2.INTER_LINEAR,
-                'cubic': cv2.INTER_CUBIC,
-                'lanczos': cv2.INTER_LANCZOS4
-            }
-            
-            cv_interpolation = interpolation_map.get(interpolation, cv2.INTER_LANCZOS4)
-            result = cv2.resize(image_array, (width, height), interpolation=cv_interpolation)
-            logger.info(f"Resized image to {width}x{height} using {interpolation} (OpenCV)")
+            backend = self.backends.select("resize", image_array, width, height, interpolation)
+            result = backend.run(image_array, width, height, interpolation)
+            logger.info(f"Resized image to {width}x{height} using {interpolation} ({backend.name})")
             return result
             
         except Exception as e:
             logger.error(f"Error resizing image: {e}")
             raise
+
+    def _resize_opencv(self, image_array: np.ndarray, width: int, height: int, interpolation: str) -> np.ndarray:
+        cv_interpolation = INTERPOLATIONS.get(interpolation, cv2.INTER_LANCZOS4)
+        return cv2.resize(image_array, (width, height), interpolation=cv_interpolation)
+
+    def _resize_pil_reduce(self, image_array: np.ndarray, width: int, height: int, interpolation: str) -> np.ndarray:
+        # moyenne par blocs entiers (équivalent de cv2.INTER_AREA)
+        factors = (image_array.shape[1] // width, image_array.shape[0] // height)
+        return np.array(Image.fromarray(image_array).reduce(factors))
+
+    def _resize_native(self, image_array: np.ndarray, width: int, height: int, interpolation: str) -> np.ndarray:
+        cv_interpolation = INTERPOLATIONS.get(interpolation, cv2.INTER_LANCZOS4)
+        return self._processor.resize(image_array, width, height, cv_interpolation)
     
     def rotate_image(self, image_array: np.ndarray, angle: float) -> np.ndarray:
         """
@@ -170,25 +361,71 @@ class CoreImageService:
             Array numpy de l'image tournée
         """
         try:
-            height, width = image_array.shape[:2]
-            center = (width // 2, height // 2)
-            
-            rotation_matrix = cv2.getRotationMatrix2D(center, -angle, 1.0)
-            
-            cos_val = abs(rotation_matrix[0, 0])
-            sin_val = abs(rotation_matrix[0, 1])
-            new_width = int(height * sin_val + width * cos_val)
-            new_height = int(height * cos_val + width * sin_val)
-            
-            rotation_matrix[0, 2] += (new_width / 2) - center[0]
-            rotation_matrix[1, 2] += (new_height / 2) - center[1]
-            
-            result = cv2.warpAffine(image_array, rotation_matrix, (new_width, new_height))
-            logger.info(f"Rotated image by {angle}° using OpenCV")
+            backend = self.backends.select("rotate", image_array, angle)
+            result = backend.run(image_array, angle)
+            logger.info(f"Rotated image by {angle}° using {backend.name}")
             return result
             
         except Exception as e:
             logger.error(f"Error rotating image: {e}")
             raise
 
-core_service = CoreImageService()
+    @staticmethod
+    def _rotation(image_array: np.ndarray, angle: float) -> Tuple[np.ndarray, int, int]:
+        """Matrice de rotation et taille du canevas agrandi pour contenir toute l'image"""
+        height, width = image_array.shape[:2]
+        center = (width // 2, height // 2)
+        
+        rotation_matrix = cv2.getRotationMatrix2D(center, -angle, 1.0)
+        
+        cos_val = abs(rotation_matrix[0, 0])
+        sin_val = abs(rotation_matrix[0, 1])
+        new_width = int(height * sin_val + width * cos_val)
+        new_height = int(height * cos_val + width * sin_val)
+        
+        rotation_matrix[0, 2] += (new_width / 2) - center[0]
+        rotation_matrix[1, 2] += (new_height / 2) - center[1]
+        return rotation_matrix, new_width, new_height
+
+    def _rotate_opencv(self, image_array: np.ndarray, angle: float) -> np.ndarray:
+        rotation_matrix, new_width, new_height = self._rotation(image_array, angle)
+        return cv2.warpAffine(image_array, rotation_matrix, (new_width, new_height))
+
+    def _rotate_native(self, image_array: np.ndarray, angle: float) -> np.ndarray:
+        rotation_matrix, new_width, new_height = self._rotation(image_array, angle)
+        return self._processor.affineTransform(image_array, rotation_matrix, new_width, new_height)
+
+
+def _is_uint8(image_array: np.ndarray, *args) -> bool:
+    return image_array.dtype == np.uint8
+
+
+def _native_compatible(image_array: np.ndarray, *args) -> bool:
+    """Tableaux acceptés tels quels par le module C++"""
+    if image_array.dtype not in NATIVE_DTYPES:
+        return False
+    return image_array.ndim == 2 or (image_array.ndim == 3 and image_array.shape[2] <= 4)
+
+
+def _pil_compatible(image_array: np.ndarray) -> bool:
+    """uint8 en niveaux de gris, RGB ou RGBA: les modes PIL sans conversion"""
+    if image_array.dtype != np.uint8:
+        return False
+    return image_array.ndim == 2 or (image_array.ndim == 3 and image_array.shape[2] in (3, 4))
+
+
+def _pil_reducible(image_array: np.ndarray, width: int, height: int, interpolation: str) -> bool:
+    """
+    Réductions 'area' d'un facteur entier (au moins 2). `reduce` est une moyenne par
+    blocs: pour les autres interpolations, l'écart avec cv2 atteint des dizaines de
+    niveaux sur une image détaillée
+    """
+    if not _pil_compatible(image_array) or interpolation != 'area':
+        return False
+    source_height, source_width = image_array.shape[:2]
+    if source_width % width or source_height % height:
+        return False
+    return source_width // width >= 2 and source_height // height >= 2
+
+
+core_service = CoreImageService(Path(os.getenv("BACKEND_TABLE_PATH", str(DEFAULT_BACKEND_TABLE_PATH))))
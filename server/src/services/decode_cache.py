@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+
+DECODE_CACHE_BYTES = int(os.getenv("DECODE_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+CacheKey = Tuple[str, str]
+
+
+class DecodedImageCache:
+    """
+    Cache LRU des images décodées (arrays numpy), partagé par tout le processus.
+    La clé (image_id, checksum) change avec le contenu: pas d'entrée périmée possible.
+    Les arrays sont rendus en lecture seule: un filtre qui voudrait modifier
+    son entrée en place échoue au lieu de corrompre le cache.
+    """
+
+    def __init__(self, max_bytes: int = DECODE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, image_id: str, checksum: Optional[str]) -> Optional[np.ndarray]:
+        with self._lock:
+            array = self._entries.get((image_id, checksum))
+            if array is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((image_id, checksum))
+            self.hits += 1
+            return array
+
+    def put(self, image_id: str, checksum: Optional[str], array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        if not checksum or array.nbytes > self.max_bytes:
+            # sans checksum l'entrée ne pourrait pas être invalidée
+            return array
+
+        key = (image_id, checksum)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+
+            self._entries[key] = array
+            self._bytes += array.nbytes
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return array
+
+    def discard_image(self, image_id: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == image_id]:
+                self._bytes -= self._entries.pop(key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+decode_cache = DecodedImageCache()
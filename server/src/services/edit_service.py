@@ -0,0 +1,307 @@
+import io
+import json
+import logging
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database import ImageDB, ImageHistoryDB
+from src.models.image import Image, ImageHistory, ImageProcess
+from src.storage.blob_store import blob_store
+from src.services.image_service import ImageService
+from src.services.project_stats import adjust_project_stats
+from src.services.content_service import (
+    acquire_content, commit_contents, release_content, purge_blob, compute_checksum
+)
+from src.services.decode_cache import decode_cache
+from src.services.result_cache import result_cache, CacheKey
+from src.services.preview_store import preview_store
+from src.services.executor import processing_executor
+from src.services.core_service import core_service
+from src.services.checkpoint_cache import checkpoint_cache, prefix_keys, CHECKPOINT_MIN_MS
+from src.services.pipeline_service import PipelineStep, parse_steps, run_step, quantize
+from src.services import codec
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedImage:
+    """Image avec sa pile de retouches appliquée, encodée dans le format de l'original"""
+
+    def __init__(self, data: bytes, media_type: str, edit_count: int, version: str, cached: bool):
+        self.data = data
+        self.media_type = media_type
+        self.edit_count = edit_count
+        # identifie l'état (contenu source + pile): sert d'ETag
+        self.version = version
+        self.cached = cached
+
+
+def _render_edits(
+    state: np.ndarray,
+    steps: List[PipelineStep],
+    keys: List[str],
+    source: Optional[str],
+    cost_ms: float,
+    image_format: str
+) -> bytes:
+    """
+    Applique les retouches restantes à un état (image décodée ou état conservé)
+    dans l'ordre de la pile, une étape à la fois, et garde au passage les états
+    dont le calcul a coûté au moins CHECKPOINT_MIN_MS depuis le précédent.
+    Les étapes ne sont ni réordonnées ni fusionnées: le rendu ne dépend pas de
+    l'état de départ. Une seule quantification, à la fin.
+    """
+    since_checkpoint = 0.0
+    for step, key in zip(steps, keys):
+        started = time.perf_counter()
+        state = run_step(state, step)
+        elapsed = (time.perf_counter() - started) * 1000
+        cost_ms += elapsed
+        since_checkpoint += elapsed
+        if since_checkpoint >= CHECKPOINT_MIN_MS and checkpoint_cache.put(source, key, state, cost_ms):
+            since_checkpoint = 0.0
+
+    return codec.encode(quantize(state), image_format)
+
+
+async def get_stacks(db: AsyncSession, image_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Piles de plusieurs images en une requête (export d'archive)"""
+    stacks: Dict[str, List[Dict[str, Any]]] = {}
+    if not image_ids:
+        return stacks
+
+    rows = (await db.scalars(
+        select(ImageHistoryDB)
+        .where(ImageHistoryDB.image_id.in_(image_ids), ImageHistoryDB.position.is_not(None))
+        .order_by(ImageHistoryDB.image_id, ImageHistoryDB.position, ImageHistoryDB.timestamp)
+    )).all()
+    for row in rows:
+        stacks.setdefault(row.image_id, []).append({
+            "operation": row.operation,
+            "parameters": json.loads(row.parameters) if row.parameters else {}
+        })
+    return stacks
+
+
+def restore_stack(db: AsyncSession, image_id: str, edits: List[Dict[str, Any]]):
+    """Recrée une pile exportée, dans la transaction courante (sans commit)"""
+    db.add_all(
+        ImageHistoryDB(
+            id=str(uuid4()),
+            image_id=image_id,
+            operation=edit["operation"],
+            parameters=json.dumps(edit.get("parameters") or {}),
+            position=position
+        )
+        for position, edit in enumerate(edits)
+    )
+
+
+class EditService:
+    """
+    Retouches non destructives: chaque opération est une entrée de la pile de
+    l'image (image_history, avec un rang), quelques octets au lieu d'un nouveau
+    fichier. Le résultat est calculé à la lecture et mis en cache (clé: contenu
+    source + pile), puis écrit comme nouveau contenu seulement à l'aplatissement.
+    """
+
+    def __init__(self, image_service: ImageService = Depends()):
+        self.image_service = image_service
+        self.db = image_service.db
+
+    async def get_stack(self, image_id: str) -> List[ImageHistory]:
+        return [self.image_service._history_db_to_model(row) for row in await self._stack_rows(image_id)]
+
+    async def _stack_rows(self, image_id: str) -> List[ImageHistoryDB]:
+        return list((await self.db.scalars(
+            select(ImageHistoryDB)
+            .where(ImageHistoryDB.image_id == image_id, ImageHistoryDB.position.is_not(None))
+            .order_by(ImageHistoryDB.position, ImageHistoryDB.timestamp)
+        )).all())
+
+    async def add_edit(self, image_id: str, process_data: ImageProcess) -> Optional[ImageHistory]:
+        """Empile une opération (ValueError si elle n'est pas applicable)"""
+        if not await self.db.get(ImageDB, image_id):
+            return None
+        parse_steps([process_data])
+
+        last_position = await self.db.scalar(
+            select(func.max(ImageHistoryDB.position)).where(ImageHistoryDB.image_id == image_id)
+        )
+        edit = ImageHistoryDB(
+            id=str(uuid4()),
+            image_id=image_id,
+            operation=process_data.operation.value,
+            parameters=json.dumps(process_data.parameters),
+            position=0 if last_position is None else last_position + 1
+        )
+        self.db.add(edit)
+        await self.db.commit()
+        await self.db.refresh(edit)
+        return self.image_service._history_db_to_model(edit)
+
+    async def remove_edit(self, image_id: str, edit_id: str) -> bool:
+        """Retire une opération de la pile, quelle que soit sa place"""
+        removed = await self.db.scalar(
+            delete(ImageHistoryDB)
+            .where(
+                ImageHistoryDB.id == edit_id,
+                ImageHistoryDB.image_id == image_id,
+                ImageHistoryDB.position.is_not(None)
+            )
+            .returning(ImageHistoryDB.id)
+        )
+        await self.db.commit()
+        return removed is not None
+
+    async def clear_stack(self, image_id: str) -> int:
+        """Retour à l'original: vide la pile"""
+        removed = (await self.db.scalars(
+            delete(ImageHistoryDB)
+            .where(ImageHistoryDB.image_id == image_id, ImageHistoryDB.position.is_not(None))
+            .returning(ImageHistoryDB.id)
+        )).all()
+        await self.db.commit()
+        return len(removed)
+
+    @staticmethod
+    def _edits(stack: List[ImageHistoryDB]) -> List[ImageProcess]:
+        return [
+            ImageProcess(operation=row.operation, parameters=json.loads(row.parameters) if row.parameters else {})
+            for row in stack
+        ]
+
+    @staticmethod
+    def _cache_key(db_image: ImageDB, edits: List[ImageProcess]) -> CacheKey:
+        return result_cache.make_key(
+            db_image.checksum or db_image.id,
+            "edit_stack",
+            {"edits": [[edit.operation.value, edit.parameters] for edit in edits]},
+            codec.image_format(db_image.content_type),
+            core_service.processing_version()
+        )
+
+    @staticmethod
+    def _version(cache_key: CacheKey) -> str:
+        # contenu source et pile: après un aplatissement, la même pile ne donne pas le même ETag
+        checksum, variant = cache_key
+        return f"{checksum}-{variant}"
+
+    async def version(self, image_id: str) -> Optional[str]:
+        """Identifiant de l'état rendu (sans rendre): checksum de l'original si la pile est vide"""
+        db_image = await self.db.get(ImageDB, image_id)
+        if not db_image:
+            return None
+        stack = await self._stack_rows(image_id)
+        if not stack:
+            return db_image.checksum
+        return self._version(self._cache_key(db_image, self._edits(stack)))
+
+    async def render(self, image_id: str) -> Optional[RenderedImage]:
+        db_image = await self.db.get(ImageDB, image_id)
+        if not db_image:
+            return None
+        return await self._render(db_image, await self._stack_rows(image_id))
+
+    async def get_preview(self, image_id: str, width: int, height: int) -> Optional[bytes]:
+        """Aperçu du rendu; sans retouche, celui de la pyramide de l'original"""
+        db_image = await self.db.get(ImageDB, image_id)
+        if not db_image:
+            return None
+
+        stack = await self._stack_rows(image_id)
+        if not stack:
+            return await self.image_service.get_preview(image_id, width, height)
+
+        rendered = await self._render(db_image, stack)
+        return await processing_executor.run_threaded(
+            preview_store.render, None, io.BytesIO(rendered.data), width, height
+        )
+
+    async def _render(self, db_image: ImageDB, stack: List[ImageHistoryDB]) -> RenderedImage:
+        image_format = codec.image_format(db_image.content_type)
+        media_type = f"image/{image_format.lower()}"
+
+        if not stack:
+            data = await self.image_service._read_image_bytes(db_image)
+            return RenderedImage(data, db_image.content_type, 0, db_image.checksum or "", cached=True)
+
+        edits = self._edits(stack)
+        cache_key = self._cache_key(db_image, edits)
+        version = self._version(cache_key)
+
+        if db_image.checksum:
+            data = await run_in_threadpool(result_cache.get, cache_key)
+            if data is not None:
+                return RenderedImage(data, media_type, len(stack), version, cached=True)
+
+        # reprise au dernier état conservé de la pile: modifier la retouche k ne
+        # recalcule que les retouches suivant l'état le plus proche avant k
+        keys = prefix_keys(
+            f"{db_image.checksum or db_image.id}:{core_service.processing_version()}",
+            [(edit.operation.value, edit.parameters) for edit in edits]
+        )
+        start, state, cost_ms = checkpoint_cache.resume(keys) if db_image.checksum else (0, None, 0.0)
+        if state is None:
+            state = decode_cache.get(db_image.id, db_image.checksum)
+        if state is None:
+            state = decode_cache.put(
+                db_image.id, db_image.checksum,
+                await processing_executor.run_threaded(codec.decode, await self.image_service._read_image_bytes(db_image))
+            )
+        data = await processing_executor.run_threaded(
+            _render_edits, state, parse_steps(edits)[start:], keys[start:], db_image.checksum, cost_ms, image_format
+        )
+
+        if db_image.checksum:
+            await run_in_threadpool(result_cache.put, cache_key, data)
+        return RenderedImage(data, media_type, len(stack), version, cached=False)
+
+    async def flatten(self, image_id: str) -> Optional[Tuple[Image, int]]:
+        """
+        Export explicite: le rendu devient le contenu de l'image et la pile passe
+        au journal. Retourne l'image et le nombre d'opérations aplaties.
+        """
+        db_image = await self.db.get(ImageDB, image_id)
+        if not db_image:
+            return None
+
+        stack = await self._stack_rows(image_id)
+        if not stack:
+            return self.image_service._db_to_model(db_image), 0
+
+        rendered = await self._render(db_image, stack)
+        checksum = await run_in_threadpool(compute_checksum, rendered.data)
+        previous_checksum, previous_size = db_image.checksum, db_image.file_size or 0
+
+        content = await acquire_content(self.db, rendered.data, checksum)
+        db_image.width = content.width
+        db_image.height = content.height
+        db_image.channels = content.channels
+        db_image.file_size = content.file_size
+        db_image.checksum = content.checksum
+        db_image.blob_key = content.blob_key
+
+        await self.db.execute(
+            update(ImageHistoryDB)
+            .where(ImageHistoryDB.id.in_([row.id for row in stack]))
+            .values(position=None)
+        )
+        await adjust_project_stats(self.db, db_image.project_id, 0, (content.file_size or 0) - previous_size)
+        orphan_blob = await release_content(self.db, previous_checksum)
+        await commit_contents(self.db, {content.blob_key: partial(blob_store.put, rendered.data, checksum)})
+        await self.db.refresh(db_image)
+
+        decode_cache.discard_image(image_id)
+        await purge_blob(self.db, orphan_blob)
+        logger.info(f"Flattened {len(stack)} edit(s) into image {image_id}")
+
+        return self.image_service._db_to_model(db_image), len(stack)
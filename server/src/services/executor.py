@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from src.services.tiling import call_core
+
+logger = logging.getLogger(__name__)
+
+FILTER_THREADS = int(os.getenv("FILTER_THREADS", str(min(8, os.cpu_count() or 1))))
+
+class _PoolMetrics:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_latency = 0.0
+
+    def start(self):
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.in_flight - self.workers)
+
+    def finish(self, latency: float, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self._total_latency += latency
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_latency_ms": self._total_latency / done * 1000 if done else 0.0
+            }
+
+
+class ProcessingExecutor:
+    """
+    Exécute les traitements CPU hors de la boucle asyncio, dans un pool de
+    threads: décodage/encodage PIL, OpenCV, ufuncs et LUT numpy relâchent le
+    GIL pendant le calcul, les threads avancent donc en parallèle sans copie
+    de l'image vers un autre processus. Le pool est créé au premier usage.
+    """
+
+    def __init__(self, threads: int = FILTER_THREADS):
+        self._threads = max(1, threads)
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.thread_metrics = _PoolMetrics(self._threads)
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                logger.info(f"Starting filter thread pool ({self._threads} threads)")
+                self._thread_pool = ThreadPoolExecutor(self._threads, thread_name_prefix="filters")
+            return self._thread_pool
+
+    async def run_threaded(self, fn: Callable, *args, **kwargs) -> Any:
+        """Appel bloquant qui relâche le GIL (PIL, OpenCV, numpy, E/S)"""
+        pool = self._get_thread_pool()
+        self.thread_metrics.start()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                pool, functools.partial(fn, *args, **kwargs)
+            )
+            failed = False
+            return result
+        finally:
+            self.thread_metrics.finish(time.perf_counter() - started, failed)
+
+    async def run_core(self, operation: str, image_array: np.ndarray, *args, **kwargs) -> np.ndarray:
+        """
+        Appelle `core_service.<operation>(image_array, ...)` dans le pool.
+        Les grandes images sont traitées par tuiles (voir tiling).
+        """
+        return await self.run_threaded(call_core, operation, image_array, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"threads": self.thread_metrics.snapshot()}
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+
+processing_executor = ProcessingExecutor()
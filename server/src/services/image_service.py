@@ -1,134 +1,217 @@
-from typing import Optional, List
+import asyncio
+from collections import Counter, defaultdict
+from functools import partial
+from typing import Optional, List, Tuple, Union
 from uuid import uuid4
-import hashlib
 import json
-from PIL import Image as PILImage
 import io
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 
 from src.models.database import get_db, ImageDB, ImageHistoryDB
 from src.models.image import Image, ImageCreate, ImageProcess, ImageHistory, ImageImport
+from src.storage.blob_store import blob_store
+from src.services.project_stats import adjust_project_stats
+from src.services.content_service import (
+    acquire_content, acquire_contents, commit_contents, release_content, purge_blob, compute_checksum,
+    BlobMissing
+)
+from src.services.upload_service import StreamedUpload
+from src.services.decode_cache import decode_cache
+from src.services.preview_store import preview_store
+from src.services.executor import processing_executor
 
 
 class ImageService:
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_db)):
         self.db = db
     
     async def create_image(self, image_data: ImageCreate) -> Image:
         image_id = str(uuid4())
         
-        checksum = hashlib.md5(image_data.data).hexdigest()
-        
-        width, height, channels = None, None, None
-        try:
-            pil_image = PILImage.open(io.BytesIO(image_data.data))
-            width, height = pil_image.size
-            channels = len(pil_image.getbands()) if pil_image.mode else None
-        except Exception as e:
-            print(f"Warning: Could not extract image metadata: {e}")
+        content = await acquire_content(self.db, image_data.data)
         
         db_image = ImageDB(
             id=image_id,
             filename=image_data.filename,
             content_type=image_data.content_type,
             project_id=image_data.project_id,
-            width=width,
-            height=height,
-            channels=channels,
-            file_size=len(image_data.data),
-            checksum=checksum,
-            data=image_data.data
+            width=content.width,
+            height=content.height,
+            channels=content.channels,
+            file_size=content.file_size,
+            checksum=content.checksum,
+            blob_key=content.blob_key
         )
         
         self.db.add(db_image)
-        self.db.commit()
-        self.db.refresh(db_image)
+        await adjust_project_stats(self.db, db_image.project_id, 1, db_image.file_size)
+        await commit_contents(
+            self.db, {content.blob_key: partial(blob_store.put, image_data.data, content.checksum)}
+        )
+        await self.db.refresh(db_image)
+        
+        return self._db_to_model(db_image)
+    
+    async def create_image_from_upload(self, upload: StreamedUpload) -> Image:
+        """
+        Enregistre une image dont le contenu a déjà été écrit en flux dans le blob store.
+        Le corps de la requête n'est pas conservé: si le blob a été supprimé par une
+        purge concurrente avant d'être référencé, BlobMissing (l'upload est à refaire).
+        """
+        contents, errors = await acquire_contents(
+            self.db,
+            {upload.checksum: None},
+            {upload.checksum: 1},
+            headers={upload.checksum: upload.header} if upload.header else None
+        )
+        if upload.checksum in errors:
+            raise errors[upload.checksum]
+        content = contents[upload.checksum]
+        
+        db_image = ImageDB(
+            id=str(uuid4()),
+            filename=upload.filename,
+            content_type=upload.content_type,
+            project_id=upload.project_id,
+            width=content.width,
+            height=content.height,
+            channels=content.channels,
+            file_size=content.file_size,
+            checksum=content.checksum,
+            blob_key=content.blob_key
+        )
+        
+        self.db.add(db_image)
+        await adjust_project_stats(self.db, db_image.project_id, 1, db_image.file_size)
+        try:
+            await commit_contents(self.db, {content.blob_key: None})
+        except BlobMissing:
+            await self.db.rollback()
+            raise
+        await self.db.refresh(db_image)
         
         return self._db_to_model(db_image)
     
     async def get_image(self, image_id: str) -> Optional[Image]:
-        db_image = self.db.query(ImageDB).filter(ImageDB.id == image_id).first()
+        db_image = await self.db.get(ImageDB, image_id)
         return self._db_to_model(db_image) if db_image else None
     
-    async def get_image_data(self, image_id: str) -> Optional[ImageDB]:
-        return self.db.query(ImageDB).filter(ImageDB.id == image_id).first()
+    async def get_image_bytes(self, image_id: str) -> Optional[bytes]:
+        """Charge explicitement les données binaires, jamais chargées avec les métadonnées"""
+        db_image = await self.db.get(ImageDB, image_id)
+        return await self._read_image_bytes(db_image) if db_image else None
     
-    async def process_image(self, image_id: str, process_data: ImageProcess) -> Optional[Image]:
-        db_image = self.db.query(ImageDB).filter(ImageDB.id == image_id).first()
+    async def _read_image_bytes(self, db_image: ImageDB) -> bytes:
+        if db_image.blob_key:
+            return await run_in_threadpool(blob_store.read, db_image.blob_key)
         
+        # image pas encore migrée: données encore inline dans la table
+        return await self.db.scalar(select(ImageDB.data).where(ImageDB.id == db_image.id))
+    
+    async def get_preview(self, image_id: str, width: int, height: int) -> Optional[bytes]:
+        """Aperçu JPEG servi depuis la pyramide du contenu, générée au premier appel"""
+        db_image = await self.db.get(ImageDB, image_id)
         if not db_image:
             return None
         
-        # TODO: Intégration avec le core C++ ici
-        # Pour l'instant, on simule le traitement
-        processed_data = await self._simulate_processing(db_image.data, process_data)
+        if db_image.blob_key:
+            source = blob_store.path_for(db_image.blob_key)
+        else:
+            source = io.BytesIO(await self._read_image_bytes(db_image))
         
-        new_filename = f"{process_data.operation}_{db_image.filename}"
-        new_image_data = ImageCreate(
-            filename=new_filename,
-            content_type=db_image.content_type,
-            project_id=db_image.project_id,
-            data=processed_data
+        return await processing_executor.run_threaded(preview_store.render, db_image.checksum, source, width, height)
+    
+    async def save_processed_images(
+        self,
+        results: List[Tuple[ImageDB, bytes, ImageProcess]]
+    ) -> List[Union[Image, Exception]]:
+        """
+        Enregistre des résultats de traitement (nouvelle image dans le projet de la
+        source + entrée d'historique sur la source) en une seule transaction.
+        Un contenu qui ne peut pas être écrit donne une exception à sa position
+        sans interrompre le lot.
+        """
+        checksums = await asyncio.gather(
+            *(run_in_threadpool(compute_checksum, data) for _, data, _ in results)
+        )
+        contents, errors = await acquire_contents(
+            self.db,
+            {checksum: data for checksum, (_, data, _) in zip(checksums, results)},
+            dict(Counter(checksums))
         )
         
-        result_image = await self.create_image(new_image_data)
-        
-        await self._add_to_history(image_id, process_data, result_image.id)
-        
-        return result_image
+        saved: List[Union[ImageDB, Exception]] = []
+        stats = defaultdict(lambda: [0, 0])
+        for checksum, (source, _, process_data) in zip(checksums, results):
+            if checksum in errors:
+                saved.append(errors[checksum])
+                continue
+            
+            content = contents[checksum]
+            db_image = ImageDB(
+                id=str(uuid4()),
+                filename=f"{process_data.operation.value}_{source.filename}",
+                content_type=source.content_type,
+                project_id=source.project_id,
+                width=content.width,
+                height=content.height,
+                channels=content.channels,
+                file_size=content.file_size,
+                checksum=content.checksum,
+                blob_key=content.blob_key
+            )
+            self.db.add(db_image)
+            self.db.add(ImageHistoryDB(
+                id=str(uuid4()),
+                image_id=source.id,
+                operation=process_data.operation.value,
+                parameters=json.dumps(process_data.parameters)
+            ))
+            stats[source.project_id][0] += 1
+            stats[source.project_id][1] += content.file_size or 0
+            saved.append(db_image)
+        
+        for project_id, (count, size) in stats.items():
+            await adjust_project_stats(self.db, project_id, count, size)
+        data_by_checksum = {checksum: data for checksum, (_, data, _) in zip(checksums, results)}
+        await commit_contents(self.db, {
+            content.blob_key: partial(blob_store.put, data_by_checksum[checksum], checksum)
+            for checksum, content in contents.items()
+        })
+        
+        return [item if isinstance(item, Exception) else self._db_to_model(item) for item in saved]
     
     async def delete_image(self, image_id: str) -> bool:
-        db_image = self.db.query(ImageDB).filter(ImageDB.id == image_id).first()
+        db_image = await self.db.get(ImageDB, image_id)
         
         if not db_image:
             return False
         
-        self.db.delete(db_image)
-        self.db.commit()
+        await self.db.delete(db_image)
+        await adjust_project_stats(self.db, db_image.project_id, -1, -(db_image.file_size or 0))
+        # le contenu peut être partagé par d'autres images: le blob n'est supprimé
+        # qu'à la disparition de la dernière référence
+        orphan_blob = await release_content(self.db, db_image.checksum)
+        await self.db.commit()
+        
+        decode_cache.discard_image(image_id)
+        await purge_blob(self.db, orphan_blob)
         
         return True
     
     async def get_image_history(self, image_id: str) -> List[ImageHistory]:
-        db_history = self.db.query(ImageHistoryDB).filter(
-            ImageHistoryDB.image_id == image_id
-        ).order_by(ImageHistoryDB.timestamp.desc()).all()
+        db_history = (await self.db.scalars(
+            select(ImageHistoryDB)
+            .where(ImageHistoryDB.image_id == image_id)
+            .order_by(ImageHistoryDB.timestamp.desc())
+        )).all()
         
         return [self._history_db_to_model(hist) for hist in db_history]
     
-    async def _simulate_processing(self, image_data: bytes, process_data: ImageProcess) -> bytes:
-        try:
-            pil_image = PILImage.open(io.BytesIO(image_data))
-            
-            if process_data.operation == "brightness":
-                pass
-            elif process_data.operation == "resize":
-                width = process_data.parameters.get("width", pil_image.width)
-                height = process_data.parameters.get("height", pil_image.height)
-                pil_image = pil_image.resize((width, height), PILImage.Resampling.LANCZOS)
-            
-            output = io.BytesIO()
-            pil_image.save(output, format='JPEG')
-            return output.getvalue()
-            
-        except Exception as e:
-            print(f"Error processing image: {e}")
-            return image_data
-    
-    async def _add_to_history(self, image_id: str, process_data: ImageProcess, result_id: str):
-        history_id = str(uuid4())
-        
-        db_history = ImageHistoryDB(
-            id=history_id,
-            image_id=image_id,
-            operation=process_data.operation,
-            parameters=json.dumps(process_data.parameters)
-        )
-        
-        self.db.add(db_history)
-        self.db.commit()
-    
     def _db_to_model(self, db_image: ImageDB) -> Image:
         return Image(
             id=db_image.id,
@@ -154,7 +237,8 @@ class ImageService:
             operation=db_history.operation,
             parameters=parameters,
             timestamp=db_history.timestamp,
-            user_id=db_history.user_id
+            user_id=db_history.user_id,
+            position=db_history.position
         )
     
     async def create_image_with_data(self, image_import: 'ImageImport', image_data: bytes) -> Image:
@@ -0,0 +1,144 @@
+import time
+from typing import Any, Dict, TYPE_CHECKING
+
+from src.models.database import SessionLocal
+from src.models.image import ImageProcess
+from src.models.job import FilterJobPayload, BatchJobPayload, ImportJobPayload
+from src.services.image_service import ImageService
+from src.services.project_service import ProjectService
+from src.services.archive_service import import_project_archive, staged_archive_path, discard_staged_archive
+from src.services.batch_service import BatchService, BATCH_CONCURRENCY, summarize, missing_items
+from src.services.pipeline_service import parse_steps
+
+if TYPE_CHECKING:
+    from src.services.job_service import JobContext
+
+
+def _process_data(payload: Dict[str, Any]) -> ImageProcess:
+    return ImageProcess(operation=payload["operation"], parameters=payload["parameters"])
+
+
+def validate_filter_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    parsed = FilterJobPayload.model_validate(payload)
+    parse_steps([ImageProcess(operation=parsed.operation, parameters=parsed.parameters)])
+    return parsed.model_dump(mode="json")
+
+
+def validate_batch_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    parsed = BatchJobPayload.model_validate(payload)
+    if (parsed.project_id is None) == (parsed.image_ids is None):
+        raise ValueError("Provide either 'project_id' or 'image_ids'")
+    parse_steps([ImageProcess(operation=parsed.operation, parameters=parsed.parameters)])
+    return parsed.model_dump(mode="json", exclude_none=True)
+
+
+def validate_import_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    parsed = ImportJobPayload.model_validate(payload)
+    staged_archive_path(parsed.archive)
+    return parsed.model_dump(mode="json")
+
+
+async def run_filter_job(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+    """Une opération sur une image à pleine résolution; le résultat devient une nouvelle image"""
+    process_data = _process_data(payload)
+    steps = parse_steps([process_data])
+
+    async with SessionLocal() as db:
+        batch_service = BatchService(ImageService(db))
+        images, missing = await batch_service.resolve_images(image_ids=[payload["image_id"]])
+        if missing:
+            raise ValueError("Image not found")
+
+        await context.report(0.0, "processing")
+        item = (await batch_service.run(images, process_data, steps, 1))[0]
+
+    if item["status"] != "succeeded":
+        raise RuntimeError(item.get("error") or "Processing failed")
+    return item
+
+
+async def run_batch_job(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+    """
+    Lot d'images (voir BatchService). Les images sources sont fixées à la première
+    exécution et le point de reprise liste celles déjà enregistrées: une tâche
+    reprise après redémarrage ne les retraite pas, et n'y ajoute pas les images
+    produites entre-temps dans le projet.
+    """
+    process_data = _process_data(payload)
+    steps = parse_steps([process_data])
+    checkpoint = context.checkpoint or {}
+    already_done = set(checkpoint.get("succeeded", []))
+    started = time.perf_counter()
+
+    async with SessionLocal() as db:
+        batch_service = BatchService(ImageService(db))
+        if "image_ids" in checkpoint:
+            # reprise: images sources retenues à la première exécution (les supprimées sont en échec)
+            images, missing = await batch_service.resolve_images(image_ids=checkpoint["image_ids"])
+            missing = [image_id for image_id in missing if image_id not in already_done]
+        else:
+            images, missing = await batch_service.resolve_images(payload.get("project_id"), payload.get("image_ids"))
+        source_ids = [db_image.id for db_image in images] + missing
+        await context.save_checkpoint({"image_ids": source_ids, "succeeded": sorted(already_done)})
+
+        remaining = [db_image for db_image in images if db_image.id not in already_done]
+        total = len(already_done) + len(remaining)
+
+        succeeded = set(already_done)
+        finished = len(already_done)
+
+        async def on_progress(items):
+            nonlocal finished
+            finished += len(items)
+            succeeded.update(item["image_id"] for item in items if item["status"] == "succeeded")
+            await context.report(
+                finished / total,
+                f"{finished}/{total} images",
+                checkpoint=lambda: {"image_ids": source_ids, "succeeded": sorted(succeeded)}
+            )
+
+        items = await batch_service.run(
+            remaining, process_data, steps, payload.get("concurrency") or BATCH_CONCURRENCY, on_progress
+        )
+
+    summary = summarize(process_data.operation.value, items + missing_items(missing), started)
+    summary["resumed"] = len(already_done)
+    return summary
+
+
+async def run_import_job(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+    """
+    Import d'une archive de projet déposée dans le dossier d'attente. Le point de
+    reprise garde le projet créé: une reprise le complète s'il est resté vide, et
+    s'arrête là si les images y ont déjà été enregistrées.
+    """
+    archive_path = staged_archive_path(payload["archive"])
+    checkpoint = context.checkpoint or {}
+
+    async with SessionLocal() as db:
+        project_service = ProjectService(db)
+        project = None
+        if checkpoint.get("project_id"):
+            project = await project_service.get_project(checkpoint["project_id"])
+            if project is not None and project.image_count:
+                return {
+                    "project": project.model_dump(mode="json"),
+                    "imported_images_count": project.image_count,
+                    "failed_images": [],
+                    "resumed": True
+                }
+
+        async def on_project(created):
+            await context.save_checkpoint({"project_id": created.id})
+
+        async def on_progress(done: int, total: int):
+            await context.report(done / total if total else 1.0, f"{done}/{total} images")
+
+        with open(archive_path, "rb") as archive_file:
+            result = await import_project_archive(project_service, archive_file, project, on_project, on_progress)
+
+    return {**result, "project": result["project"].model_dump(mode="json")}
+
+
+def finish_import_job(payload: Dict[str, Any]):
+    discard_staged_archive(payload.get("archive"))
@@ -0,0 +1,399 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from fastapi import Depends
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database import get_db, SessionLocal, JobDB
+from src.models.job import Job, JobCreate, JobStatus, JobType, FINISHED_STATUSES
+from src.services.job_handlers import (
+    validate_filter_job, run_filter_job,
+    validate_batch_job, run_batch_job,
+    validate_import_job, run_import_job, finish_import_job
+)
+
+logger = logging.getLogger(__name__)
+
+# délai max avant de revérifier la file sans notification
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# au-delà, une tâche interrompue par des redémarrages successifs est abandonnée
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# fréquence max d'écriture de l'avancement en base (les abonnés SSE sont notifiés à chaque étape)
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))
+JOB_KEEPALIVE_INTERVAL = 15.0
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """JOB_LIMITS="filter=2,batch=1": tâches simultanées par type"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        job_type, _, limit = entry.partition("=")
+        limits[job_type.strip()] = int(limit)
+    return limits
+
+
+JOB_LIMITS = {
+    JobType.FILTER.value: 2,
+    JobType.BATCH.value: 1,
+    JobType.IMPORT.value: 1,
+    **_parse_limits(os.getenv("JOB_LIMITS", ""))
+}
+
+
+class JobContext:
+    """Passé au gestionnaire d'une tâche: avancement et point de reprise"""
+
+    def __init__(self, manager: "JobManager", job_id: str, checkpoint: Optional[Dict[str, Any]]):
+        self._manager = manager
+        self.job_id = job_id
+        # état enregistré par une exécution précédente, interrompue par un redémarrage
+        self.checkpoint = checkpoint
+        self._last_write = 0.0
+
+    async def report(
+        self,
+        progress: float,
+        message: Optional[str] = None,
+        checkpoint: Optional[Callable[[], Dict[str, Any]]] = None
+    ):
+        """
+        Publie l'avancement (entre 0 et 1). `checkpoint` n'est évalué qu'au moment
+        d'une écriture en base, au plus une fois par JOB_PROGRESS_INTERVAL.
+        """
+        progress = min(max(progress, 0.0), 1.0)
+        self._manager.publish(self.job_id, {"status": JobStatus.RUNNING.value, "progress": progress, "message": message})
+
+        now = time.monotonic()
+        if now - self._last_write < JOB_PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+
+        values = {"progress": progress, "message": message}
+        if checkpoint is not None:
+            values["checkpoint"] = json.dumps(checkpoint())
+        await self._manager.update(self.job_id, **values)
+
+    async def save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Écrit le point de reprise tout de suite (avant un travail qu'il doit couvrir)"""
+        self.checkpoint = checkpoint
+        await self._manager.update(self.job_id, checkpoint=json.dumps(checkpoint))
+
+
+class JobHandler:
+    def __init__(
+        self,
+        validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+        run: Callable[[Dict[str, Any], JobContext], Awaitable[Dict[str, Any]]],
+        limit: int,
+        on_finish: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.validate = validate
+        self.run = run
+        self.limit = max(1, limit)
+        # appelé une fois la tâche terminée, quel que soit son statut (fichiers temporaires...)
+        self.on_finish = on_finish
+
+
+class JobManager:
+    """
+    File de tâches persistée dans la table `jobs`. Un répartiteur lance les tâches
+    en attente par priorité puis ancienneté, dans la limite de chaque type; les
+    tâches encore "running" au démarrage (serveur arrêté en cours d'exécution)
+    sont remises en file et reprennent depuis leur dernier point de reprise.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running: Counter = Counter()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    def validate(self, job_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Paramètres normalisés de la tâche (ValueError si invalides)"""
+        handler = self._handlers.get(job_type)
+        if handler is None:
+            raise ValueError(f"Unknown job type '{job_type}'")
+        return handler.validate(payload)
+
+    def finished(self, job_type: str, payload: Dict[str, Any]):
+        handler = self._handlers.get(job_type)
+        if handler is None or handler.on_finish is None:
+            return
+        try:
+            handler.on_finish(payload)
+        except Exception as e:
+            logger.warning(f"Cleanup of {job_type} job failed: {e}")
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        await self._recover()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Les tâches en cours restent "running" en base: reprises au prochain démarrage"""
+        self._stopping = True
+        tasks = [task for task in (self._dispatcher, *self._tasks.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    def cancel_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def _recover(self):
+        async with SessionLocal() as db:
+            interrupted = (await db.scalars(
+                select(JobDB).where(JobDB.status == JobStatus.RUNNING.value)
+            )).all()
+
+            for job in interrupted:
+                if job.attempts >= JOB_MAX_ATTEMPTS:
+                    job.status = JobStatus.FAILED.value
+                    job.error = f"Interrupted {job.attempts} times"
+                    job.finished_at = datetime.utcnow()
+                    self.finished(job.job_type, json.loads(job.payload) if job.payload else {})
+                else:
+                    job.status = JobStatus.QUEUED.value
+            await db.commit()
+
+        if interrupted:
+            logger.info(f"Recovered {len(interrupted)} interrupted job(s)")
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                await self._dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error dispatching jobs: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _dispatch(self):
+        async with SessionLocal() as db:
+            for job_type, handler in self._handlers.items():
+                free = handler.limit - self._running[job_type]
+                if free <= 0:
+                    continue
+
+                candidates = (await db.scalars(
+                    select(JobDB)
+                    .where(JobDB.status == JobStatus.QUEUED.value, JobDB.job_type == job_type)
+                    .order_by(JobDB.priority.desc(), JobDB.created_at, JobDB.id)
+                    .limit(free)
+                )).all()
+
+                for job in candidates:
+                    # réservation conditionnelle: une annulation a pu passer entre-temps
+                    claimed = await db.execute(
+                        update(JobDB)
+                        .where(JobDB.id == job.id, JobDB.status == JobStatus.QUEUED.value)
+                        .values(
+                            status=JobStatus.RUNNING.value,
+                            started_at=datetime.utcnow(),
+                            attempts=JobDB.attempts + 1
+                        )
+                    )
+                    await db.commit()
+                    if claimed.rowcount != 1:
+                        continue
+
+                    self._running[job_type] += 1
+                    payload = json.loads(job.payload) if job.payload else {}
+                    checkpoint = json.loads(job.checkpoint) if job.checkpoint else None
+                    self._tasks[job.id] = asyncio.create_task(self._run(job.id, job_type, payload, checkpoint))
+                    self.publish(job.id, {"status": JobStatus.RUNNING.value, "progress": job.progress or 0.0, "message": None})
+
+    async def _run(self, job_id: str, job_type: str, payload: Dict[str, Any], checkpoint: Optional[Dict[str, Any]]):
+        handler = self._handlers[job_type]
+        terminal = True
+        try:
+            result = await handler.run(payload, JobContext(self, job_id, checkpoint))
+            await self._finish(job_id, JobStatus.SUCCEEDED, result=json.dumps(result), progress=1.0)
+        except asyncio.CancelledError:
+            if self._stopping:
+                # reprise au prochain démarrage
+                terminal = False
+                raise
+            await self._finish(job_id, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job_type}) failed: {e}")
+            await self._finish(job_id, JobStatus.FAILED, error=str(e))
+        finally:
+            if terminal:
+                self.finished(job_type, payload)
+            self._running[job_type] -= 1
+            self._tasks.pop(job_id, None)
+            self.wake()
+
+    async def _finish(self, job_id: str, status: JobStatus, **values):
+        await self.update(job_id, status=status.value, finished_at=datetime.utcnow(), message=None, checkpoint=None, **values)
+        self.publish(job_id, {
+            "status": status.value,
+            "progress": values.get("progress"),
+            "message": None,
+            "error": values.get("error")
+        })
+
+    async def update(self, job_id: str, **values):
+        async with SessionLocal() as db:
+            await db.execute(update(JobDB).where(JobDB.id == job_id).values(**values))
+            await db.commit()
+
+    def publish(self, job_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait({"id": job_id, **event})
+
+    async def events(self, job_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        État courant de la tâche puis chaque changement, jusqu'à la fin de la tâche.
+        None signale une période sans changement (pour maintenir la connexion).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # abonnement avant la lecture de l'état: aucun changement ne peut être manqué
+        self._subscribers[job_id].add(queue)
+        try:
+            async with SessionLocal() as db:
+                job = await db.get(JobDB, job_id)
+            if job is None:
+                return
+
+            yield {"id": job_id, "status": job.status, "progress": job.progress, "message": job.message, "error": job.error}
+            if JobStatus(job.status) in FINISHED_STATUSES:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), JOB_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if JobStatus(event["status"]) in FINISHED_STATUSES:
+                    return
+        finally:
+            self._subscribers[job_id].discard(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            job_type: {"running": self._running[job_type], "limit": handler.limit}
+            for job_type, handler in self._handlers.items()
+        }
+
+
+job_manager = JobManager()
+job_manager.register(JobType.FILTER.value, JobHandler(validate_filter_job, run_filter_job, JOB_LIMITS[JobType.FILTER.value]))
+job_manager.register(JobType.BATCH.value, JobHandler(validate_batch_job, run_batch_job, JOB_LIMITS[JobType.BATCH.value]))
+job_manager.register(
+    JobType.IMPORT.value,
+    JobHandler(validate_import_job, run_import_job, JOB_LIMITS[JobType.IMPORT.value], finish_import_job)
+)
+
+
+class JobService:
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def submit_job(self, job_data: JobCreate) -> Job:
+        """Enregistre la tâche en file (ValueError si paramètres invalides)"""
+        payload = job_manager.validate(job_data.type.value, job_data.payload)
+
+        db_job = JobDB(
+            id=str(uuid4()),
+            job_type=job_data.type.value,
+            status=JobStatus.QUEUED.value,
+            priority=job_data.priority,
+            payload=json.dumps(payload)
+        )
+        self.db.add(db_job)
+        await self.db.commit()
+
+        job_manager.wake()
+        return self._db_to_model(db_job)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        db_job = await self.db.get(JobDB, job_id)
+        return self._db_to_model(db_job) if db_job else None
+
+    async def get_jobs(
+        self,
+        status: Optional[JobStatus] = None,
+        job_type: Optional[JobType] = None,
+        limit: int = 50
+    ) -> List[Job]:
+        query = select(JobDB).order_by(JobDB.created_at.desc(), JobDB.id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(JobDB.status == status.value)
+        if job_type is not None:
+            query = query.where(JobDB.job_type == job_type.value)
+        return [self._db_to_model(db_job) for db_job in (await self.db.scalars(query)).all()]
+
+    async def cancel_job(self, job_id: str) -> Optional[Job]:
+        """
+        Une tâche en file est annulée immédiatement; une tâche en cours est
+        interrompue et passe à "cancelled" dès que son exécution s'arrête.
+        """
+        cancelled = await self.db.execute(
+            update(JobDB)
+            .where(JobDB.id == job_id, JobDB.status == JobStatus.QUEUED.value)
+            .values(status=JobStatus.CANCELLED.value, finished_at=datetime.utcnow())
+        )
+        await self.db.commit()
+
+        db_job = await self.db.get(JobDB, job_id, populate_existing=True)
+        if cancelled.rowcount:
+            job_manager.publish(job_id, {"status": JobStatus.CANCELLED.value, "progress": None, "message": None})
+            job_manager.finished(db_job.job_type, json.loads(db_job.payload) if db_job.payload else {})
+        else:
+            job_manager.cancel_running(job_id)
+
+        return self._db_to_model(db_job) if db_job else None
+
+    def _db_to_model(self, db_job: JobDB) -> Job:
+        return Job(
+            id=db_job.id,
+            type=db_job.job_type,
+            status=db_job.status,
+            priority=db_job.priority,
+            progress=db_job.progress or 0.0,
+            message=db_job.message,
+            payload=json.loads(db_job.payload) if db_job.payload else {},
+            result=json.loads(db_job.result) if db_job.result else None,
+            error=db_job.error,
+            attempts=db_job.attempts or 0,
+            created_at=db_job.created_at,
+            started_at=db_job.started_at,
+            finished_at=db_job.finished_at
+        )
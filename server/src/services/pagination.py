@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import Select, tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    payload = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_page(
+    stmt: Select,
+    created_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False
+) -> Select:
+    """
+    Pagination par clé (created_at, id): reprend juste après la dernière ligne
+    vue au lieu de parcourir et jeter `offset` lignes. Une ligne de plus que
+    `limit` est demandée pour savoir s'il existe une page suivante.
+    """
+    key = tuple_(created_column, id_column)
+
+    if cursor:
+        cursor_key = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key < cursor_key if descending else key > cursor_key)
+
+    if descending:
+        stmt = stmt.order_by(created_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(created_column.asc(), id_column.asc())
+
+    return stmt.limit(limit + 1)
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Retourne les lignes de la page et le curseur de la suivante (None si dernière page)"""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
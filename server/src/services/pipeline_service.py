@@ -0,0 +1,344 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.models.image import ImageProcess, ProcessingOperation
+from src.services.core_service import core_service
+from src.services.tone_service import parse_adjustment, apply_adjustments, ToneAdjustment
+from src.services.tiling import gaussian_blur_halo, sharpen_halo, should_tile, run_tiled
+
+# flou gaussien: au-delà de BOX_BLUR_MIN_SIGMA, coût indépendant de sigma
+MAX_SIGMA = 200.0
+MAX_RADIUS = 10.0
+MAX_DIMENSION = 8192
+
+# opérations qui ne font que déplacer/rééchantillonner les pixels: l'image peut
+# rester en uint8 tant qu'on n'a rencontré qu'elles
+GEOMETRY_OPERATIONS = {"resize", "rotate"}
+
+# mode approché: un flou n'est passé après une réduction que si son sigma, mis à
+# l'échelle, reste au moins de cette taille (en dessous, l'écart dépasse le niveau)
+APPROXIMATE_MIN_SIGMA = 1.5
+
+# opérations ponctuelles non linéaires, compilées en LUT par tone_service
+TONE_OPERATIONS = {
+    ProcessingOperation.LEVELS,
+    ProcessingOperation.GAMMA,
+    ProcessingOperation.CURVES,
+    ProcessingOperation.AUTO_LEVELS,
+    ProcessingOperation.AUTO_CONTRAST,
+}
+
+
+class PipelineStep:
+    """Étape interne du pipeline, après validation et normalisation des paramètres"""
+
+    def __init__(self, operation: str, **parameters):
+        self.operation = operation
+        self.parameters = parameters
+
+    def describe(self) -> Dict[str, Any]:
+        return {"operation": self.operation, **self.parameters}
+
+    def __repr__(self) -> str:
+        return f"PipelineStep({self.operation}, {self.parameters})"
+
+
+def _number(parameters: Dict[str, Any], name: str, default: float, low: float, high: float) -> float:
+    value = parameters.get(name, default)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"Parameter '{name}' must be a number")
+    if not low <= value <= high:
+        raise ValueError(f"Parameter '{name}' must be between {low} and {high}")
+    return float(value)
+
+
+def parse_steps(steps: List[ImageProcess]) -> List[PipelineStep]:
+    """Convertit les ProcessingOperation demandées en étapes internes (ValueError si invalide)"""
+    parsed = []
+    for index, step in enumerate(steps):
+        parameters = step.parameters
+        operation = step.operation
+        try:
+            if operation == ProcessingOperation.BRIGHTNESS:
+                parsed.append(PipelineStep(
+                    "affine", gain=1.0, bias=_number(parameters, "brightness", 0.0, -100.0, 100.0)
+                ))
+            elif operation == ProcessingOperation.CONTRAST:
+                parsed.append(PipelineStep(
+                    "affine", gain=_number(parameters, "contrast", 1.0, 0.1, 3.0), bias=0.0
+                ))
+            elif operation == ProcessingOperation.BRIGHTNESS_CONTRAST:
+                parsed.append(PipelineStep(
+                    "affine",
+                    gain=_number(parameters, "contrast", 1.0, 0.1, 3.0),
+                    bias=_number(parameters, "brightness", 0.0, -100.0, 100.0)
+                ))
+            elif operation == ProcessingOperation.GAUSSIAN_BLUR:
+                parsed.append(PipelineStep(
+                    "gaussian_blur", sigma=_number(parameters, "sigma", 1.0, 0.1, MAX_SIGMA)
+                ))
+            elif operation == ProcessingOperation.UNSHARP_MASK:
+                parsed.append(PipelineStep(
+                    "unsharp_mask",
+                    strength=_number(parameters, "strength", 1.0, 0.0, 3.0),
+                    radius=_number(parameters, "radius", 1.0, 0.1, MAX_RADIUS)
+                ))
+            elif operation == ProcessingOperation.RESIZE:
+                parsed.append(PipelineStep(
+                    "resize",
+                    width=int(_number(parameters, "width", 0, 1, MAX_DIMENSION)),
+                    height=int(_number(parameters, "height", 0, 1, MAX_DIMENSION)),
+                    interpolation=str(parameters.get("interpolation", "lanczos"))
+                ))
+            elif operation == ProcessingOperation.ROTATE:
+                parsed.append(PipelineStep("rotate", angle=_number(parameters, "angle", 0.0, -360.0, 360.0)))
+            elif operation in TONE_OPERATIONS:
+                parsed.append(PipelineStep("tone", adjustments=[parse_adjustment(operation, parameters)]))
+            elif operation == ProcessingOperation.CONVERT_COLOR_SPACE:
+                mode = str(parameters.get("mode", "grayscale")).lower()
+                if mode not in ("grayscale", "gray"):
+                    raise ValueError(f"Unsupported color space '{mode}'")
+                parsed.append(PipelineStep("grayscale"))
+            else:
+                raise ValueError(f"Unsupported operation '{operation}'")
+        except ValueError as e:
+            raise ValueError(f"Step {index} ({operation.value}): {e}")
+    return parsed
+
+
+def scale_steps(steps: List[PipelineStep], scale: float) -> List[PipelineStep]:
+    """Mode proxy: les paramètres exprimés en pixels suivent la réduction de l'image"""
+    if scale >= 1.0:
+        return steps
+
+    scaled = []
+    for step in steps:
+        parameters = dict(step.parameters)
+        if step.operation == "gaussian_blur":
+            parameters["sigma"] *= scale
+        elif step.operation == "unsharp_mask":
+            parameters["radius"] *= scale
+        elif step.operation == "resize":
+            parameters["width"] = max(1, round(parameters["width"] * scale))
+            parameters["height"] = max(1, round(parameters["height"] * scale))
+        scaled.append(PipelineStep(step.operation, **parameters))
+    return scaled
+
+
+def _output_size(step: PipelineStep, size: Tuple[int, int]) -> Tuple[int, int]:
+    width, height = size
+    if step.operation == "resize":
+        return step.parameters["width"], step.parameters["height"]
+    if step.operation == "rotate":
+        radians = math.radians(step.parameters["angle"])
+        cos_val, sin_val = abs(math.cos(radians)), abs(math.sin(radians))
+        return int(height * sin_val + width * cos_val), int(height * cos_val + width * sin_val)
+    return size
+
+
+def _move_resize_before(
+    resize: PipelineStep,
+    previous: PipelineStep,
+    size: Tuple[int, int],
+    approximate: bool
+) -> Optional[Tuple[PipelineStep, PipelineStep]]:
+    """
+    (redimensionnement, étape équivalente à `previous`) une fois l'ordre inversé,
+    ou None si l'échange n'est pas valide
+    """
+    if previous.operation in ("affine", "grayscale"):
+        # opérations ponctuelles linéaires: commutent avec le rééchantillonnage, à
+        # condition qu'il travaille en float32 comme après elles (pas d'arrondi ni
+        # d'écrêtage uint8 intermédiaire)
+        return PipelineStep("resize", **{**resize.parameters, "in_float": True}), previous
+
+    if approximate and previous.operation == "gaussian_blur":
+        # approché seulement: rééchantillonnage et flou ne commutent pas exactement
+        # (l'interpolation filtre aussi). La netteté n'est jamais déplacée: son
+        # résultat est écrêté, l'écart serait trop grand
+        scale_x = resize.parameters["width"] / size[0]
+        scale_y = resize.parameters["height"] / size[1]
+        if abs(scale_x - scale_y) > 0.01 * max(scale_x, scale_y):
+            return None
+        sigma = previous.parameters["sigma"] * (scale_x + scale_y) / 2
+        if sigma < APPROXIMATE_MIN_SIGMA:
+            return None
+        return resize, PipelineStep("gaussian_blur", sigma=sigma)
+
+    return None
+
+
+def optimize_steps(
+    steps: List[PipelineStep],
+    size: Tuple[int, int],
+    approximate: bool = False
+) -> List[PipelineStep]:
+    """
+    Réordonne et fusionne les étapes sans changer le résultat (aux arrondis près):
+    - un redimensionnement qui réduit l'image passe devant les opérations ponctuelles
+      linéaires (luminosité/contraste, niveaux de gris): elles traitent alors moins
+      de pixels. Avec `approximate`, il passe aussi devant un flou gaussien dont le
+      sigma mis à l'échelle reste >= APPROXIMATE_MIN_SIGMA, au prix d'un petit écart
+    - les opérations affines consécutives (luminosité/contraste) n'en font qu'une
+    - deux flous gaussiens consécutifs font un flou de sigma = sqrt(s1² + s2²)
+    - une suite d'opérations ponctuelles contenant un ajustement de tons (niveaux,
+      gamma, courbes, auto) devient une seule LUT
+    """
+    steps = list(steps)
+
+    moved = True
+    while moved:
+        moved = False
+        sizes = [size]
+        for step in steps:
+            sizes.append(_output_size(step, sizes[-1]))
+
+        for index in range(1, len(steps)):
+            step, previous = steps[index], steps[index - 1]
+            if step.operation != "resize":
+                continue
+            input_width, input_height = sizes[index]
+            if step.parameters["width"] * step.parameters["height"] >= input_width * input_height:
+                continue
+
+            swapped = _move_resize_before(step, previous, sizes[index - 1], approximate)
+            if swapped is not None:
+                steps[index - 1], steps[index] = swapped
+                moved = True
+                break
+
+    fused: List[PipelineStep] = []
+    for step in steps:
+        last = fused[-1] if fused else None
+        if last is not None and last.operation == step.operation == "affine":
+            gain = last.parameters["gain"] * step.parameters["gain"]
+            bias = last.parameters["bias"] * step.parameters["gain"] + step.parameters["bias"]
+            fused[-1] = PipelineStep("affine", gain=gain, bias=bias)
+        elif last is not None and {last.operation, step.operation} <= {"affine", "tone"}:
+            fused[-1] = PipelineStep("tone", adjustments=_as_adjustments(last) + _as_adjustments(step))
+        elif last is not None and last.operation == step.operation == "gaussian_blur":
+            sigma = math.hypot(last.parameters["sigma"], step.parameters["sigma"])
+            fused[-1] = PipelineStep("gaussian_blur", sigma=sigma)
+        else:
+            fused.append(step)
+
+    return [
+        step for step in fused
+        if not (step.operation == "affine" and step.parameters["gain"] == 1.0 and step.parameters["bias"] == 0.0)
+    ]
+
+
+def _as_adjustments(step: PipelineStep) -> List[ToneAdjustment]:
+    if step.operation == "affine":
+        return [ToneAdjustment("affine", gain=step.parameters["gain"], bias=step.parameters["bias"])]
+    return list(step.parameters["adjustments"])
+
+
+def _step_halo(step: PipelineStep) -> Optional[int]:
+    """Marge nécessaire pour exécuter l'étape par tuiles, None si elle a besoin de toute l'image"""
+    if step.operation in ("affine", "grayscale"):
+        return 0
+    if step.operation == "gaussian_blur":
+        return gaussian_blur_halo(step.parameters["sigma"])
+    if step.operation == "unsharp_mask":
+        return sharpen_halo(radius=step.parameters["radius"])
+    if step.operation == "tone":
+        # auto_* lisent l'histogramme de l'image entière
+        if not any(a.operation in ("auto_levels", "auto_contrast") for a in step.parameters["adjustments"]):
+            return 0
+    return None
+
+
+def _segments(steps: List[PipelineStep]) -> List[Tuple[bool, List[PipelineStep]]]:
+    """Regroupe les étapes consécutives selon qu'elles peuvent s'exécuter par tuiles"""
+    segments: List[Tuple[bool, List[PipelineStep]]] = []
+    for step in steps:
+        tileable = _step_halo(step) is not None
+        if segments and segments[-1][0] == tileable:
+            segments[-1][1].append(step)
+        else:
+            segments.append((tileable, [step]))
+    return segments
+
+
+def quantize(image_array: np.ndarray) -> np.ndarray:
+    if image_array.dtype != np.uint8:
+        return np.clip(np.rint(image_array), 0, 255).astype(np.uint8)
+    return image_array
+
+
+def _run_steps(image_array: np.ndarray, steps: List[PipelineStep]) -> np.ndarray:
+    result = image_array
+    for step in steps:
+        parameters = step.parameters
+
+        if step.operation == "tone":
+            # les LUT s'appliquent sur des entiers: quantification si on était passé en float32
+            result = apply_adjustments(quantize(result), parameters["adjustments"])
+            continue
+
+        in_float = step.operation not in GEOMETRY_OPERATIONS or parameters.get("in_float", False)
+        if in_float and result.dtype != np.float32:
+            result = result.astype(np.float32)
+
+        if step.operation == "affine":
+            result = result * parameters["gain"] + parameters["bias"]
+        elif step.operation == "gaussian_blur":
+            result = core_service.apply_gaussian_blur(result, parameters["sigma"])
+        elif step.operation == "unsharp_mask":
+            blurred = cv2.GaussianBlur(result, (0, 0), parameters["radius"])
+            result = cv2.addWeighted(result, 1.0 + parameters["strength"], blurred, -parameters["strength"], 0)
+        elif step.operation == "resize":
+            result = core_service.resize_image(
+                result, parameters["width"], parameters["height"], parameters["interpolation"]
+            )
+        elif step.operation == "rotate":
+            result = core_service.rotate_image(result, parameters["angle"])
+        elif step.operation == "grayscale":
+            gray = cv2.cvtColor(result, cv2.COLOR_RGB2GRAY)
+            result = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+    return result
+
+
+def run_pipeline(image_array: np.ndarray, steps: List[PipelineStep]) -> np.ndarray:
+    """
+    Exécute les étapes sur une seule image décodée (appel bloquant). Les
+    intermédiaires sont en float32 dès la première opération non géométrique:
+    une seule quantification, à la fin.
+    Sur une grande image, chaque suite d'étapes locales (ponctuelles, flous) est
+    exécutée par tuiles avec la somme de leurs marges: les intermédiaires float32
+    restent à la taille d'une tuile, au prix d'une quantification en fin de suite.
+    """
+    result = image_array
+    for tileable, segment in _segments(steps):
+        if tileable and should_tile(result):
+            halo = sum(_step_halo(step) for step in segment)
+            result = run_tiled(
+                result,
+                lambda tile, segment=segment: quantize(_run_steps(tile, segment)),
+                halo,
+                output_dtype=np.uint8
+            )
+        else:
+            result = _run_steps(result, segment)
+
+    return quantize(result)
+
+
+def run_step(image_array: np.ndarray, step: PipelineStep) -> np.ndarray:
+    """
+    Exécute une seule étape, sans quantification finale: enchaîner run_step
+    donne le même résultat qu'un seul _run_steps, ce qui permet de reprendre
+    un rendu à partir d'un état intermédiaire conservé. Une étape locale est
+    tuilée sur une grande image, avec une sortie du type qu'elle produirait
+    sur l'image entière.
+    """
+    halo = _step_halo(step)
+    if halo is None or not should_tile(image_array):
+        return _run_steps(image_array, [step])
+
+    output_dtype = np.uint8 if step.operation == "tone" else np.float32
+    return run_tiled(image_array, lambda tile: _run_steps(tile, [step]), halo, output_dtype=output_dtype)
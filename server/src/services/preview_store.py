@@ -0,0 +1,108 @@
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple, Union, BinaryIO
+
+from PIL import Image as PILImage
+
+DEFAULT_PREVIEW_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "previews"
+PREVIEW_LEVELS: Tuple[int, ...] = (128, 256, 512, 1024)
+PREVIEW_QUALITY = 85
+
+ImageSource = Union[str, Path, BinaryIO]
+
+
+def _to_rgb(image: PILImage.Image) -> PILImage.Image:
+    if image.mode == "RGB":
+        return image
+    if image.mode in ("RGBA", "LA", "P"):
+        # aplatit la transparence sur fond blanc plutôt que sur du noir
+        rgba = image.convert("RGBA")
+        background = PILImage.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _encode_jpeg(image: PILImage.Image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=PREVIEW_QUALITY)
+    return output.getvalue()
+
+
+class PreviewStore:
+    """
+    Pyramide d'aperçus JPEG par contenu (checksum): une rendition par puissance de
+    deux, générées ensemble au premier aperçu demandé. Une requête est servie par
+    la plus petite rendition couvrant la taille demandée, redimensionnée à peu de
+    frais (ou renvoyée telle quelle si elle tient déjà dans la boîte).
+    """
+
+    def __init__(self, root: Path, levels: Tuple[int, ...] = PREVIEW_LEVELS):
+        self.root = Path(root)
+        self.levels = tuple(sorted(levels))
+
+    def _directory(self, checksum: str) -> Path:
+        return self.root / checksum[:2] / checksum
+
+    def _path(self, checksum: str, level: int) -> Path:
+        return self._directory(checksum) / f"{level}.jpg"
+
+    def render(self, checksum: Optional[str], source: ImageSource, width: int, height: int) -> bytes:
+        """Aperçu JPEG tenant dans width x height (appel bloquant)"""
+        level = next((level for level in self.levels if level >= max(width, height)), None)
+
+        if checksum is None or level is None:
+            # plus grand que la pyramide (ou contenu non adressable): rendu direct
+            with PILImage.open(source) as original:
+                original.draft("RGB", (width, height))
+                image = _to_rgb(original)
+                image.thumbnail((width, height), PILImage.Resampling.LANCZOS)
+                return _encode_jpeg(image)
+
+        path = self._path(checksum, level)
+        if not path.is_file():
+            self._build(checksum, source)
+
+        with PILImage.open(path) as rendition:
+            if rendition.width <= width and rendition.height <= height:
+                return path.read_bytes()
+
+            rendition.thumbnail((width, height), PILImage.Resampling.BICUBIC)
+            return _encode_jpeg(rendition)
+
+    def _build(self, checksum: str, source: ImageSource):
+        """Décode l'original une seule fois et en dérive chaque niveau depuis le précédent"""
+        directory = self._directory(checksum)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with PILImage.open(source) as original:
+            largest = self.levels[-1]
+            # JPEG: décodage directement à l'échelle 1/2, 1/4 ou 1/8 si possible
+            original.draft("RGB", (largest, largest))
+            image = _to_rgb(original)
+
+            for level in reversed(self.levels):
+                image.thumbnail((level, level), PILImage.Resampling.LANCZOS, reducing_gap=3.0)
+                self._write(self._path(checksum, level), _encode_jpeg(image))
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            # rename atomique: deux requêtes simultanées peuvent générer le même niveau
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, checksum: str):
+        shutil.rmtree(self._directory(checksum), ignore_errors=True)
+
+
+preview_store = PreviewStore(Path(os.getenv("PREVIEW_CACHE_DIR", str(DEFAULT_PREVIEW_DIR))))
@@ -1,28 +1,43 @@
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Tuple, Dict
+import asyncio
+from functools import partial
 from uuid import uuid4
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 import base64
-import hashlib
-from PIL import Image as PILImage
-import io
 
 from src.models.database import get_db, ProjectDB, ImageDB
 from src.models.project import Project, ProjectCreate, ProjectUpdate
 from src.models.image import Image
+from src.storage.blob_store import blob_store
+from src.services.content_service import acquire_contents, commit_contents, compute_checksum
+from src.services.project_stats import adjust_project_stats
+from src.services.pagination import keyset_page, split_page
 
 
 class ProjectService:
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_db)):
         self.db = db
     
-    async def get_projects(self, skip: int = 0, limit: int = 100) -> List[Project]:
-        db_projects = self.db.query(ProjectDB).offset(skip).limit(limit).all()
-        return [self._db_to_model(db_project) for db_project in db_projects]
+    async def get_projects(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Project], Optional[str]]:
+        """Projets du plus récent au plus ancien, avec le curseur de la page suivante"""
+        db_projects = (await self.db.scalars(keyset_page(
+            select(ProjectDB), ProjectDB.created_at, ProjectDB.id,
+            cursor, limit, descending=True
+        ))).all()
+        
+        db_projects, next_cursor = split_page(db_projects, limit)
+        return [self._db_to_model(db_project) for db_project in db_projects], next_cursor
     
     async def get_project(self, project_id: str) -> Optional[Project]:
-        db_project = self.db.query(ProjectDB).filter(ProjectDB.id == project_id).first()
+        db_project = await self.db.get(ProjectDB, project_id)
         return self._db_to_model(db_project) if db_project else None
     
     async def create_project(self, project_data: ProjectCreate) -> Project:
@@ -40,13 +55,13 @@ class ProjectService:
         )
         
         self.db.add(db_project)
-        self.db.commit()
-        self.db.refresh(db_project)
+        await self.db.commit()
+        await self.db.refresh(db_project)
         
         return self._db_to_model(db_project)
     
     async def update_project(self, project_id: str, project_data: ProjectUpdate) -> Optional[Project]:
-        db_project = self.db.query(ProjectDB).filter(ProjectDB.id == project_id).first()
+        db_project = await self.db.get(ProjectDB, project_id)
         
         if not db_project:
             return None
@@ -55,94 +70,187 @@ class ProjectService:
         for field, value in update_data.items():
             setattr(db_project, field, value)
         
-        self.db.commit()
-        self.db.refresh(db_project)
+        await self.db.commit()
+        await self.db.refresh(db_project)
         
         return self._db_to_model(db_project)
     
     async def delete_project(self, project_id: str) -> bool:
-        db_project = self.db.query(ProjectDB).filter(ProjectDB.id == project_id).first()
+        db_project = await self.db.get(ProjectDB, project_id)
         
         if not db_project:
             return False
         
-        self.db.delete(db_project)
-        self.db.commit()
+        await self.db.delete(db_project)
+        await self.db.commit()
         
         return True
     
-    async def get_project_images(self, project_id: str) -> List[dict]:
-        images = self.db.query(ImageDB).filter(ImageDB.project_id == project_id).all()
-        return [self._image_db_to_dict(img) for img in images]
+    async def get_project_images(
+        self,
+        project_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 200
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Images du projet dans l'ordre d'ajout, avec le curseur de la page suivante"""
+        images = (await self.db.scalars(keyset_page(
+            select(ImageDB).where(ImageDB.project_id == project_id),
+            ImageDB.created_at, ImageDB.id, cursor, limit
+        ))).all()
+        
+        images, next_cursor = split_page(images, limit)
+        return [self._image_db_to_dict(img) for img in images], next_cursor
+    
+    async def get_all_project_images(self, project_id: str) -> List[dict]:
+        images, cursor = await self.get_project_images(project_id)
+        while cursor:
+            page, cursor = await self.get_project_images(project_id, cursor=cursor)
+            images.extend(page)
+        return images
 
     async def add_image_to_project(self, project_id: str, image_data: dict) -> dict:
+        images, failures = await self.add_images_to_project(project_id, [image_data])
+        if failures:
+            raise ValueError(f"Failed to add image: {failures[0]['error']}")
+        return images[0]
+
+    async def add_images_to_project(
+        self,
+        project_id: str,
+        images_data: List[dict]
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Import par lot: décodage et analyse en parallèle, puis une seule transaction
+        (insertions, compteurs de contenus et stats du projet) et un seul commit.
+        Une image invalide est signalée dans les échecs sans interrompre le lot.
+        """
+        decoded = await asyncio.gather(
+            *(run_in_threadpool(self._decode_payload, image_data) for image_data in images_data),
+            return_exceptions=True
+        )
+        
+        failures = []
+        payloads = {}
+        for index, (image_data, result) in enumerate(zip(images_data, decoded)):
+            if isinstance(result, Exception):
+                failures.append(self._failure(index, image_data, result))
+            else:
+                payloads[index] = result
+        
+        return await self._insert_images(project_id, images_data, payloads, failures)
+
+    async def add_stored_images_to_project(
+        self,
+        project_id: str,
+        images_data: List[dict],
+        checksums: List[str],
+        rewrites: Optional[Dict[str, Callable[[], Any]]] = None
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Comme `add_images_to_project` pour des contenus déjà écrits dans le blob store;
+        `rewrites[checksum]` réécrit un blob supprimé avant d'être référencé
+        """
+        payloads = {index: (None, checksum) for index, checksum in enumerate(checksums)}
+        return await self._insert_images(project_id, images_data, payloads, [], rewrites)
+
+    async def _insert_images(
+        self,
+        project_id: str,
+        images_data: List[dict],
+        payloads: Dict[int, Tuple[Optional[bytes], str]],
+        failures: List[dict],
+        rewrites: Optional[Dict[str, Callable[[], Any]]] = None
+    ) -> Tuple[List[dict], List[dict]]:
+        checksums = {checksum for _, checksum in payloads.values()}
+        existing = {
+            db_image.checksum: db_image
+            for db_image in (await self.db.scalars(
+                select(ImageDB).where(
+                    ImageDB.project_id == project_id,
+                    ImageDB.checksum.in_(checksums)
+                )
+            )).all()
+        } if checksums else {}
+        
+        # une seule nouvelle image par contenu absent du projet
+        first_index = {}
+        for index, (_, checksum) in payloads.items():
+            if checksum not in existing:
+                first_index.setdefault(checksum, index)
+        
+        # un blob supprimé avant d'être référencé est réécrit (données ou `rewrites`)
+        rewrites = dict(rewrites or {})
+        for data, checksum in payloads.values():
+            if data is not None:
+                rewrites.setdefault(checksum, partial(blob_store.put, data, checksum))
+        
         try:
-            base64_data = image_data.get('data', '')
-            if not base64_data:
-                raise ValueError("No image data provided")
-            
-            try:
-                binary_data = base64.b64decode(base64_data)
-            except Exception as e:
-                raise ValueError(f"Invalid base64 data: {e}")
-            
-            checksum = hashlib.md5(binary_data).hexdigest()
-            
-            existing_image = self.db.query(ImageDB).filter(
-                ImageDB.project_id == project_id,
-                ImageDB.checksum == checksum
-            ).first()
-            
-            if existing_image:
-                return self._image_db_to_dict(existing_image)
-            
-            width, height, channels = None, None, None
-            try:
-                pil_image = PILImage.open(io.BytesIO(binary_data))
-                width, height = pil_image.size
-                channels = len(pil_image.getbands()) if hasattr(pil_image, 'getbands') else None
-                pil_image.close()
-            except:
-                pass
-            
-            image_id = str(uuid4())
-            db_image = ImageDB(
-                id=image_id,
-                filename=image_data.get('name', 'uploaded_image.jpg'),
-                content_type=image_data.get('type', 'image/jpeg'),
-                project_id=project_id,
-                width=width,
-                height=height,
-                channels=channels,
-                color_mode='RGB',
-                file_size=len(binary_data),
-                checksum=checksum,
-                data=binary_data
+            contents, errors = await acquire_contents(
+                self.db,
+                {checksum: payloads[index][0] for checksum, index in first_index.items()},
+                {checksum: 1 for checksum in first_index},
+                rewrites=rewrites
             )
             
-            self.db.add(db_image)
-            self.db.commit()
-            self.db.refresh(db_image)
-            
-            await self._update_project_stats(project_id)
+            new_images = {}
+            for checksum, content in contents.items():
+                image_data = images_data[first_index[checksum]]
+                new_images[checksum] = ImageDB(
+                    id=str(uuid4()),
+                    filename=image_data.get('name', 'uploaded_image.jpg'),
+                    content_type=image_data.get('type', 'image/jpeg'),
+                    project_id=project_id,
+                    width=content.width,
+                    height=content.height,
+                    channels=content.channels,
+                    color_mode='RGB',
+                    file_size=content.file_size,
+                    checksum=checksum,
+                    blob_key=content.blob_key
+                )
             
-            return self._image_db_to_dict(db_image)
+            self.db.add_all(new_images.values())
+            await adjust_project_stats(
+                self.db,
+                project_id,
+                len(new_images),
+                sum(db_image.file_size for db_image in new_images.values())
+            )
+            await commit_contents(
+                self.db, {content.blob_key: rewrites.get(checksum) for checksum, content in contents.items()}
+            )
             
         except Exception as e:
-            self.db.rollback()
-            raise ValueError(f"Failed to add image: {e}")
+            await self.db.rollback()
+            raise ValueError(f"Failed to add images: {e}")
+        
+        images = []
+        for index, (_, checksum) in sorted(payloads.items()):
+            if checksum in errors:
+                failures.append(self._failure(index, images_data[index], errors[checksum]))
+                continue
+            db_image = existing.get(checksum) or new_images[checksum]
+            images.append(self._image_db_to_dict(db_image))
+        
+        failures.sort(key=lambda failure: failure["index"])
+        return images, failures
 
-    async def _update_project_stats(self, project_id: str):
-        images = self.db.query(ImageDB).filter(ImageDB.project_id == project_id).all()
+    @staticmethod
+    def _decode_payload(image_data: dict) -> Tuple[bytes, str]:
+        base64_data = image_data.get('data', '')
+        if not base64_data:
+            raise ValueError("No image data provided")
         
-        image_count = len(images)
-        total_size = sum(img.file_size for img in images)
+        try:
+            binary_data = base64.b64decode(base64_data)
+        except Exception as e:
+            raise ValueError(f"Invalid base64 data: {e}")
         
-        db_project = self.db.query(ProjectDB).filter(ProjectDB.id == project_id).first()
-        if db_project:
-            db_project.image_count = image_count
-            db_project.file_size = total_size
-            self.db.commit()
+        return binary_data, compute_checksum(binary_data)
+
+    @staticmethod
+    def _failure(index: int, image_data: dict, error: Exception) -> dict:
+        return {"index": index, "name": image_data.get('name'), "error": str(error)}
 
     def _image_db_to_dict(self, db_image: ImageDB) -> dict:
         return {
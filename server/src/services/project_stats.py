@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import func, select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.database import SessionLocal, ProjectDB, ImageDB
+
+logger = logging.getLogger(__name__)
+
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+
+
+async def adjust_project_stats(
+    db: AsyncSession,
+    project_id: Optional[str],
+    image_delta: int,
+    size_delta: int
+):
+    """
+    Applique un delta aux compteurs du projet dans la transaction courante:
+    coût constant quel que soit le nombre d'images du projet
+    """
+    if not project_id or (image_delta == 0 and size_delta == 0):
+        return
+
+    await db.execute(
+        update(ProjectDB)
+        .where(ProjectDB.id == project_id)
+        .values(
+            image_count=func.coalesce(ProjectDB.image_count, 0) + image_delta,
+            file_size=func.coalesce(ProjectDB.file_size, 0) + size_delta
+        )
+    )
+
+
+async def reconcile_project_stats(db: AsyncSession) -> int:
+    """Recalcule les compteurs à partir des images et corrige les projets divergents"""
+    actual = (
+        select(
+            ImageDB.project_id.label("project_id"),
+            func.count(ImageDB.id).label("image_count"),
+            func.coalesce(func.sum(ImageDB.file_size), 0).label("file_size")
+        )
+        .where(ImageDB.project_id.is_not(None))
+        .group_by(ImageDB.project_id)
+        .subquery()
+    )
+
+    actual_count = func.coalesce(actual.c.image_count, 0)
+    actual_size = func.coalesce(actual.c.file_size, 0)
+
+    drifted = (await db.execute(
+        select(ProjectDB.id, actual_count, actual_size)
+        .outerjoin(actual, actual.c.project_id == ProjectDB.id)
+        .where(or_(
+            func.coalesce(ProjectDB.image_count, 0) != actual_count,
+            func.coalesce(ProjectDB.file_size, 0) != actual_size
+        ))
+    )).all()
+
+    for project_id, image_count, file_size in drifted:
+        logger.warning(
+            f"Project {project_id} stats drifted, resetting to {image_count} images / {file_size} bytes"
+        )
+        await db.execute(
+            update(ProjectDB)
+            .where(ProjectDB.id == project_id)
+            .values(image_count=image_count, file_size=file_size)
+        )
+
+    await db.commit()
+    return len(drifted)
+
+
+async def run_stats_reconciler(interval: float = STATS_RECONCILE_INTERVAL):
+    """
+    Tâche de fond: une réconciliation au démarrage puis toutes les `interval` secondes
+    (STATS_RECONCILE_INTERVAL=0 pour une seule passe)
+    """
+    while True:
+        try:
+            async with SessionLocal() as db:
+                repaired = await reconcile_project_stats(db)
+            if repaired:
+                logger.info(f"Reconciled stats of {repaired} project(s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reconciling project stats: {e}")
+
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
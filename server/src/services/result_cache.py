@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_CACHE_DIR = Path(__file__).parent.parent.parent / "data" / "cache" / "results"
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv("RESULT_CACHE_MEMORY_BYTES", str(128 * 1024 * 1024)))
+RESULT_CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+CacheKey = Tuple[str, str]
+
+
+def _canonical(value: Any) -> Any:
+    """1 et 1.0 doivent donner la même clé; l'ordre des paramètres ne compte pas"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+class FilterResultCache:
+    """
+    Cache des résultats encodés des filtres, sur deux niveaux: LRU en mémoire
+    puis fichiers sur disque. La clé dépend du checksum du contenu source:
+    des images identiques partagent leurs résultats, et tout est invalidé
+    quand le contenu disparaît. Méthodes bloquantes (E/S disque).
+    """
+
+    def __init__(self, root: Path, memory_bytes: int, disk_bytes: int):
+        self.root = Path(root)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._memory_used = 0
+        self._disk: "Optional[OrderedDict[Path, int]]" = None
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        checksum: str,
+        operation: str,
+        parameters: Dict[str, Any],
+        output_format: str,
+        version: str = ""
+    ) -> CacheKey:
+        """`version`: version des traitements, pour ne plus servir un résultat calculé autrement"""
+        variant = json.dumps(
+            [operation.lower().replace("-", "_"), _canonical(parameters), output_format.lower(), version],
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return checksum, hashlib.sha256(variant.encode()).hexdigest()
+
+    def _path(self, key: CacheKey) -> Path:
+        checksum, variant = key
+        return self.root / checksum[:2] / checksum / variant
+
+    def _load_disk_index(self):
+        """Inventaire des fichiers existants, du plus ancien au plus récent (appelé sous verrou)"""
+        if self._disk is not None:
+            return
+
+        entries = []
+        if self.root.is_dir():
+            for path in self.root.glob("*/*/*"):
+                if path.name.startswith(".tmp-"):
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+        entries.sort(key=lambda entry: entry[0])
+        self._disk = OrderedDict((path, size) for _, path, size in entries)
+        self._disk_used = sum(size for _, _, size in entries)
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+            self._load_disk_index()
+            path = self._path(key)
+            if path not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(path)
+
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget_disk(path)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: CacheKey, data: bytes):
+        with self._lock:
+            self._remember(key, data)
+            self._load_disk_index()
+
+        if len(data) > self.disk_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write filter result to disk cache: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        with self._lock:
+            self._forget_disk(path)
+            self._disk[path] = len(data)
+            self._disk_used += len(data)
+            self._evict_disk()
+
+    def invalidate(self, checksum: str):
+        """Supprime tous les résultats calculés à partir de ce contenu"""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == checksum]:
+                self._memory_used -= len(self._memory.pop(key))
+
+            self._load_disk_index()
+            directory = self.root / checksum[:2] / checksum
+            for path in [path for path in self._disk if path.parent == directory]:
+                self._forget_disk(path)
+
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _remember(self, key: CacheKey, data: bytes):
+        if len(data) > self.memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= len(previous)
+        self._memory[key] = data
+        self._memory_used += len(data)
+
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _forget_disk(self, path: Path):
+        size = self._disk.pop(path, None)
+        if size is not None:
+            self._disk_used -= size
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "max_memory_bytes": self.memory_bytes,
+                "disk_entries": len(self._disk) if self._disk is not None else None,
+                "disk_bytes": self._disk_used if self._disk is not None else None,
+                "max_disk_bytes": self.disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0
+            }
+
+
+result_cache = FilterResultCache(
+    Path(os.getenv("RESULT_CACHE_DIR", str(DEFAULT_RESULT_CACHE_DIR))),
+    memory_bytes=RESULT_CACHE_MEMORY_BYTES,
+    disk_bytes=RESULT_CACHE_DISK_BYTES
+)
@@ -0,0 +1,106 @@
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.core_service import core_service, box_blur_sizes, BOX_BLUR_MIN_SIGMA
+
+TILE_SIZE = int(os.getenv("TILE_SIZE", "1024"))
+TILE_THRESHOLD_PIXELS = int(os.getenv("TILE_THRESHOLD_PIXELS", str(4096 * 4096)))
+TILE_THREADS = int(os.getenv("TILE_THREADS", str(os.cpu_count() or 1)))
+
+
+def gaussian_blur_halo(sigma: float = 1.0) -> int:
+    if sigma > BOX_BLUR_MIN_SIGMA:
+        # flous boîte successifs: leurs rayons s'additionnent (environ 3 sigma)
+        return sum(size // 2 for size in box_blur_sizes(sigma)) + 1
+    # couvre le noyau OpenCV de CoreImageService.apply_gaussian_blur (3 sigma)
+    # et celui du core C++ (ksize 0: jusqu'à 4 sigma en float32)
+    return math.ceil(4 * sigma) + 1
+
+
+def sharpen_halo(strength: float = 1.0, radius: float = 1.0) -> int:
+    # noyau choisi par OpenCV pour ksize=(0, 0): au plus 4 sigma de chaque côté
+    return math.ceil(4 * radius) + 1
+
+
+# méthodes de core_service qui conservent la taille de l'image, avec la marge
+# (halo) de pixels voisins dont chaque pixel de sortie dépend
+CORE_HALOS: Dict[str, Callable[..., int]] = {
+    "apply_gaussian_blur": gaussian_blur_halo,
+    "apply_sharpen_filter": sharpen_halo,
+    "adjust_brightness_contrast": lambda *args, **kwargs: 0,
+}
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # pool distinct de celui de ProcessingExecutor: un calcul tuilé y tourne déjà
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max(1, TILE_THREADS), thread_name_prefix="tiles")
+        return _pool
+
+
+def should_tile(image_array: np.ndarray) -> bool:
+    height, width = image_array.shape[:2]
+    return height * width > TILE_THRESHOLD_PIXELS
+
+
+def _tile_grid(height: int, width: int, tile_size: int) -> List[Tuple[int, int, int, int]]:
+    return [
+        (y, min(y + tile_size, height), x, min(x + tile_size, width))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def run_tiled(
+    image_array: np.ndarray,
+    apply: Callable[[np.ndarray], np.ndarray],
+    halo: int,
+    output_dtype: Optional[np.dtype] = None,
+    tile_size: int = TILE_SIZE
+) -> np.ndarray:
+    """
+    Applique `apply` tuile par tuile, en parallèle, dans une sortie préallouée.
+    Chaque tuile est lue avec `halo` pixels de marge puis recadrée: le résultat est
+    identique au traitement de l'image entière, les bords réels de l'image restant
+    gérés par OpenCV. Les temporaires ne dépassent pas la taille d'une tuile.
+    `apply` doit conserver la taille de l'image et ne pas modifier son entrée.
+    """
+    height, width = image_array.shape[:2]
+    output = np.empty(image_array.shape, dtype=output_dtype or image_array.dtype)
+
+    def process(tile: Tuple[int, int, int, int]):
+        y0, y1, x0, x1 = tile
+        top, left = max(0, y0 - halo), max(0, x0 - halo)
+        bottom, right = min(height, y1 + halo), min(width, x1 + halo)
+
+        result = apply(image_array[top:bottom, left:right])
+        output[y0:y1, x0:x1] = result[y0 - top:y1 - top, x0 - left:x1 - left]
+
+    # list() pour propager la première exception d'une tuile
+    list(_get_pool().map(process, _tile_grid(height, width, tile_size)))
+    return output
+
+
+def call_core(operation: str, image_array: np.ndarray, *args, **kwargs) -> np.ndarray:
+    """`core_service.<operation>`, tuilé pour les grandes images quand l'opération le permet"""
+    method = getattr(core_service, operation)
+    halo = CORE_HALOS.get(operation)
+
+    if halo is None or not should_tile(image_array):
+        return method(image_array, *args, **kwargs)
+
+    return run_tiled(
+        image_array,
+        lambda tile: method(tile, *args, **kwargs),
+        halo(*args, **kwargs)
+    )
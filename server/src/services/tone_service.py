@@ -0,0 +1,252 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from src.models.image import ProcessingOperation
+
+# les paramètres s'expriment en niveaux 8 bits (comme ImageProcessor côté C++),
+# ils sont mis à l'échelle pour les images 16 bits
+REFERENCE_MAX = 255.0
+
+CHANNELS = {"all": None, "red": 0, "green": 1, "blue": 2}
+
+
+class ToneAdjustment:
+    """Ajustement ponctuel validé: ne dépend que de la valeur du pixel (et de l'histogramme pour auto_*)"""
+
+    def __init__(self, operation: str, channel: str = "all", **parameters):
+        self.operation = operation
+        self.channel = channel
+        self.parameters = parameters
+
+    def describe(self) -> Dict[str, Any]:
+        return {"operation": self.operation, "channel": self.channel, **self.parameters}
+
+    def __repr__(self) -> str:
+        return f"ToneAdjustment({self.operation}, {self.channel}, {self.parameters})"
+
+
+def _number(parameters: Dict[str, Any], name: str, default: float, low: float, high: float) -> float:
+    value = parameters.get(name, default)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"Parameter '{name}' must be a number")
+    if not low <= value <= high:
+        raise ValueError(f"Parameter '{name}' must be between {low} and {high}")
+    return float(value)
+
+
+def _channel(parameters: Dict[str, Any]) -> str:
+    channel = str(parameters.get("channel", "all")).lower()
+    if channel not in CHANNELS:
+        raise ValueError(f"Parameter 'channel' must be one of {sorted(CHANNELS)}")
+    return channel
+
+
+def _curve_points(parameters: Dict[str, Any]) -> List[List[float]]:
+    points = parameters.get("points")
+    if not isinstance(points, (list, tuple)) or len(points) < 2:
+        raise ValueError("Parameter 'points' must contain at least two [x, y] pairs")
+
+    parsed = []
+    for point in points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError("Curve points must be [x, y] pairs")
+        x, y = (float(value) for value in point)
+        if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+            raise ValueError("Curve points must be within [0, 1]")
+        parsed.append([x, y])
+
+    parsed.sort(key=lambda point: point[0])
+    if len({x for x, _ in parsed}) != len(parsed):
+        raise ValueError("Curve points must have distinct x values")
+    return parsed
+
+
+def parse_adjustment(operation: ProcessingOperation, parameters: Dict[str, Any]) -> ToneAdjustment:
+    """Valide une opération ponctuelle (ValueError si paramètres invalides)"""
+    if operation == ProcessingOperation.BRIGHTNESS:
+        return ToneAdjustment("affine", gain=1.0, bias=_number(parameters, "brightness", 0.0, -100.0, 100.0))
+    if operation == ProcessingOperation.CONTRAST:
+        return ToneAdjustment("affine", gain=_number(parameters, "contrast", 1.0, 0.1, 3.0), bias=0.0)
+    if operation == ProcessingOperation.BRIGHTNESS_CONTRAST:
+        return ToneAdjustment(
+            "affine",
+            gain=_number(parameters, "contrast", 1.0, 0.1, 3.0),
+            bias=_number(parameters, "brightness", 0.0, -100.0, 100.0)
+        )
+    if operation == ProcessingOperation.LEVELS:
+        input_min = _number(parameters, "input_min", 0.0, 0.0, 255.0)
+        input_max = _number(parameters, "input_max", 255.0, 0.0, 255.0)
+        if input_max <= input_min:
+            raise ValueError("'input_max' must be greater than 'input_min'")
+        return ToneAdjustment(
+            "levels",
+            channel=_channel(parameters),
+            input_min=input_min,
+            input_max=input_max,
+            gamma=_number(parameters, "gamma", 1.0, 0.1, 10.0),
+            output_min=_number(parameters, "output_min", 0.0, 0.0, 255.0),
+            output_max=_number(parameters, "output_max", 255.0, 0.0, 255.0)
+        )
+    if operation == ProcessingOperation.GAMMA:
+        return ToneAdjustment("gamma", channel=_channel(parameters), gamma=_number(parameters, "gamma", 1.0, 0.1, 10.0))
+    if operation == ProcessingOperation.CURVES:
+        interpolation = str(parameters.get("interpolation", "linear")).lower()
+        if interpolation not in ("linear", "smooth"):
+            raise ValueError("Parameter 'interpolation' must be 'linear' or 'smooth'")
+        return ToneAdjustment(
+            "curves", channel=_channel(parameters), points=_curve_points(parameters), interpolation=interpolation
+        )
+    if operation == ProcessingOperation.AUTO_LEVELS:
+        return ToneAdjustment("auto_levels")
+    if operation == ProcessingOperation.AUTO_CONTRAST:
+        return ToneAdjustment("auto_contrast")
+    raise ValueError(f"'{operation.value}' is not a point operation")
+
+
+def _smooth_curve(xs: np.ndarray, ys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Interpolation cubique monotone (Fritsch-Carlson): pas de dépassement entre les points"""
+    slopes = np.diff(ys) / np.diff(xs)
+    tangents = np.empty_like(ys)
+    tangents[0], tangents[-1] = slopes[0], slopes[-1]
+    tangents[1:-1] = np.where(
+        slopes[:-1] * slopes[1:] > 0, (slopes[:-1] + slopes[1:]) / 2, 0.0
+    )
+    for index, slope in enumerate(slopes):
+        if slope == 0:
+            tangents[index] = tangents[index + 1] = 0.0
+            continue
+        alpha, beta = tangents[index] / slope, tangents[index + 1] / slope
+        norm = alpha * alpha + beta * beta
+        if norm > 9:
+            factor = 3 / np.sqrt(norm)
+            tangents[index], tangents[index + 1] = factor * alpha * slope, factor * beta * slope
+
+    segment = np.clip(np.searchsorted(xs, values) - 1, 0, len(xs) - 2)
+    width = xs[segment + 1] - xs[segment]
+    t = np.clip((values - xs[segment]) / width, 0.0, 1.0)
+    t2, t3 = t * t, t * t * t
+    result = (
+        (2 * t3 - 3 * t2 + 1) * ys[segment]
+        + (t3 - 2 * t2 + t) * width * tangents[segment]
+        + (-2 * t3 + 3 * t2) * ys[segment + 1]
+        + (t3 - t2) * width * tangents[segment + 1]
+    )
+    return np.where(values <= xs[0], ys[0], np.where(values >= xs[-1], ys[-1], result))
+
+
+def _levels(values: np.ndarray, input_min: float, input_max: float,
+            gamma: float, output_min: float, output_max: float) -> np.ndarray:
+    """Même formule que ImageProcessor::adjustLevels (exposant = gamma)"""
+    normalized = np.clip((values - input_min) / (input_max - input_min), 0.0, 1.0)
+    return output_min + np.power(normalized, gamma) * (output_max - output_min)
+
+
+def _occupied_range(histogram: np.ndarray, curve: np.ndarray):
+    """Min/max des valeurs présentes dans l'image, après les ajustements déjà appliqués"""
+    present = curve[histogram > 0]
+    if present.size == 0:
+        return 0.0, 0.0
+    return float(present.min()), float(present.max())
+
+
+def compile_lut(adjustments: Sequence[ToneAdjustment], histograms: Optional[np.ndarray],
+                channels: int, max_value: int) -> np.ndarray:
+    """
+    Compose la chaîne en une table par canal (channels x (max_value + 1)).
+    Chaque ajustement est évalué une fois par niveau possible, en flottant, avec
+    saturation entre les étapes comme si elles étaient appliquées successivement;
+    l'arrondi n'a lieu qu'une fois. Les ajustements automatiques lisent l'histogramme
+    de l'image transformée par les étapes précédentes, sans repasser sur les pixels.
+    """
+    scale = max_value / REFERENCE_MAX
+    ramp = np.arange(max_value + 1, dtype=np.float64)
+    curves = np.tile(ramp, (channels, 1))
+
+    for adjustment in adjustments:
+        parameters = adjustment.parameters
+        target = CHANNELS[adjustment.channel]
+        selected = range(channels) if target is None else [target] if target < channels else []
+
+        if adjustment.operation in ("auto_levels", "auto_contrast"):
+            if histograms is None:
+                raise ValueError(f"'{adjustment.operation}' needs the image histogram")
+            ranges = [_occupied_range(histograms[c], curves[c]) for c in range(channels)]
+            if adjustment.operation == "auto_contrast":
+                # même étirement pour tous les canaux: la teinte est conservée
+                low, high = min(r[0] for r in ranges), max(r[1] for r in ranges)
+                ranges = [(low, high)] * channels
+            for c in range(channels):
+                low, high = ranges[c]
+                if high > low:
+                    curves[c] = (curves[c] - low) * (max_value / (high - low))
+        else:
+            for c in selected:
+                values = curves[c]
+                if adjustment.operation == "affine":
+                    curves[c] = values * parameters["gain"] + parameters["bias"] * scale
+                elif adjustment.operation == "levels":
+                    curves[c] = _levels(
+                        values,
+                        parameters["input_min"] * scale, parameters["input_max"] * scale,
+                        parameters["gamma"],
+                        parameters["output_min"] * scale, parameters["output_max"] * scale
+                    )
+                elif adjustment.operation == "gamma":
+                    curves[c] = np.power(np.clip(values / max_value, 0.0, 1.0), parameters["gamma"]) * max_value
+                elif adjustment.operation == "curves":
+                    points = np.asarray(parameters["points"], dtype=np.float64)
+                    xs, ys = points[:, 0] * max_value, points[:, 1] * max_value
+                    if parameters["interpolation"] == "smooth":
+                        curves[c] = _smooth_curve(xs, ys, values)
+                    else:
+                        curves[c] = np.interp(values, xs, ys)
+
+        np.clip(curves, 0, max_value, out=curves)
+
+    dtype = np.uint8 if max_value <= 255 else np.uint16
+    return np.rint(curves).astype(dtype)
+
+
+def _histograms(image_array: np.ndarray, channels: int, max_value: int) -> np.ndarray:
+    planes = image_array.reshape(-1, channels)
+    if max_value <= 255:
+        return np.stack([
+            cv2.calcHist([np.ascontiguousarray(planes[:, c])], [0], None, [256], [0, 256]).ravel()
+            for c in range(channels)
+        ])
+    return np.stack([np.bincount(planes[:, c], minlength=max_value + 1) for c in range(channels)])
+
+
+def apply_lut(image_array: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Une seule passe sur les pixels, quel que soit le nombre d'ajustements compilés"""
+    channels = lut.shape[0]
+    if image_array.dtype == np.uint8:
+        if image_array.ndim == 2:
+            return cv2.LUT(image_array, lut[0])
+        return cv2.LUT(image_array, lut.T.reshape(256, 1, channels).copy())
+
+    if image_array.ndim == 2:
+        return lut[0][image_array]
+    result = np.empty_like(image_array)
+    for c in range(channels):
+        result[..., c] = lut[c][image_array[..., c]]
+    return result
+
+
+def apply_adjustments(image_array: np.ndarray, adjustments: Sequence[ToneAdjustment]) -> np.ndarray:
+    """Compile la chaîne d'ajustements en LUT et l'applique (appel bloquant)"""
+    if image_array.dtype == np.uint8:
+        max_value = 255
+    elif image_array.dtype == np.uint16:
+        max_value = 65535
+    else:
+        raise ValueError(f"Point operations need 8 or 16-bit images, got {image_array.dtype}")
+
+    channels = 1 if image_array.ndim == 2 else image_array.shape[2]
+    needs_histogram = any(a.operation in ("auto_levels", "auto_contrast") for a in adjustments)
+    histograms = _histograms(image_array, channels, max_value) if needs_histogram else None
+
+    lut = compile_lut(adjustments, histograms, channels, max_value)
+    return apply_lut(image_array, lut)
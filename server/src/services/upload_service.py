@@ -0,0 +1,228 @@
+import io
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image as PILImage
+
+from src.storage.blob_store import blob_store, BlobWriter
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(1024 * 1024 * 1024)))
+SNIFF_LIMIT = 1024 * 1024
+MAX_FIELD_SIZE = 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class StreamedUpload:
+    """Fichier reçu en flux: déjà écrit dans le blob store sous `checksum`"""
+
+    def __init__(self, filename: str, content_type: str, project_id: Optional[str],
+                 checksum: str, size: int, header: Optional[Tuple]):
+        self.filename = filename
+        self.content_type = content_type
+        self.project_id = project_id
+        self.checksum = checksum
+        self.size = size
+        self.header = header
+
+
+class _UploadSink:
+    """
+    Reçoit les morceaux du fichier au fil de la requête: hachage et écriture sur
+    disque par blocs de UPLOAD_CHUNK_SIZE, en-tête analysé dès qu'il est complet
+    """
+
+    def __init__(self):
+        self.header: Optional[Tuple] = None
+        self._writer: Optional[BlobWriter] = None
+        self._buffer = bytearray()
+        self._head = bytearray()
+        self._next_sniff = 1024
+        self.received = 0
+
+    async def feed(self, data: bytes):
+        self.received += len(data)
+        if self.received > UPLOAD_MAX_SIZE:
+            raise UploadTooLarge(f"Upload exceeds {UPLOAD_MAX_SIZE} bytes")
+
+        self._sniff(data)
+        self._buffer += data
+        if len(self._buffer) >= UPLOAD_CHUNK_SIZE:
+            await self._flush()
+
+    def _sniff(self, data: bytes):
+        """
+        PIL n'a besoin que de l'en-tête: on réessaie tant qu'il n'est pas complet,
+        à chaque doublement du préfixe reçu pour borner le nombre de tentatives
+        """
+        if self.header or len(self._head) >= SNIFF_LIMIT:
+            return
+
+        self._head += data[:SNIFF_LIMIT - len(self._head)]
+        if len(self._head) < min(self._next_sniff, SNIFF_LIMIT):
+            return
+        self._next_sniff = len(self._head) * 2
+        try:
+            with PILImage.open(io.BytesIO(self._head)) as pil_image:
+                width, height = pil_image.size
+                self.header = (width, height, len(pil_image.getbands()))
+        except Exception:
+            # en-tête incomplet (ou placé en fin de fichier, ex. certains TIFF):
+            # les dimensions seront lues sur le blob une fois écrit
+            return
+        self._head = bytearray()
+
+    async def _flush(self):
+        if self._writer is None:
+            self._writer = await run_in_threadpool(blob_store.writer)
+        chunk, self._buffer = bytes(self._buffer), bytearray()
+        await run_in_threadpool(self._writer.write, chunk)
+
+    async def commit(self) -> Tuple[str, int]:
+        await self._flush()
+        checksum = await run_in_threadpool(self._writer.commit)
+        return checksum, self._writer.size
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.abort()
+
+
+class _MultipartReader:
+    """
+    Adaptateur des callbacks de python-multipart: seule la partie fichier est
+    transmise au sink, les champs texte (project_id) sont gardés en mémoire
+    """
+
+    def __init__(self, boundary: bytes):
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self.fields = {}
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.file_chunks = []
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._field_name: Optional[str] = None
+        self._field_value = bytearray()
+        self._in_file = False
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._field_name = None
+        self._field_value = bytearray()
+        self._in_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise ValueError('Multipart part without a "name"')
+
+        if b"filename" in options:
+            if self.filename is not None:
+                raise ValueError("Only one file can be uploaded per request")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+            self._in_file = True
+        else:
+            self._field_name = options[b"name"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.file_chunks.append(data[start:end])
+            return
+
+        self._field_value += data[start:end]
+        if len(self._field_value) > MAX_FIELD_SIZE:
+            raise ValueError(f"Field '{self._field_name}' is too large")
+
+    def _on_part_end(self):
+        if self._field_name is not None:
+            self.fields[self._field_name] = self._field_value.decode("utf-8", "replace")
+
+
+async def receive_upload(
+    content_type_header: str,
+    stream: AsyncIterator[bytes],
+    filename: Optional[str] = None,
+    project_id: Optional[str] = None
+) -> StreamedUpload:
+    """
+    Écrit le corps de la requête dans le blob store sans le charger en mémoire.
+    Accepte du multipart/form-data (partie fichier + champ project_id) ou un corps
+    binaire brut (nom et projet en paramètres, type via Content-Type).
+    """
+    media_type, options = parse_options_header(content_type_header or "")
+    media_type = media_type.decode("latin-1")
+
+    reader = None
+    if media_type == "multipart/form-data":
+        if b"boundary" not in options:
+            raise ValueError("Missing boundary in multipart body")
+        reader = _MultipartReader(options[b"boundary"])
+
+    sink = _UploadSink()
+    try:
+        async for chunk in stream:
+            if not chunk:
+                continue
+            if reader is None:
+                await sink.feed(chunk)
+                continue
+
+            reader.parser.write(chunk)
+            for file_chunk in reader.file_chunks:
+                await sink.feed(file_chunk)
+            reader.file_chunks.clear()
+
+        if reader is not None:
+            reader.parser.finalize()
+            if reader.filename is None:
+                raise ValueError("No file part in multipart body")
+            filename = reader.filename or filename
+            project_id = reader.fields.get("project_id") or project_id
+            media_type = reader.content_type or "application/octet-stream"
+
+        if sink.received == 0:
+            raise ValueError("Empty upload")
+        checksum, size = await sink.commit()
+    except BaseException:
+        sink.abort()
+        raise
+
+    return StreamedUpload(
+        filename=filename or "uploaded_image",
+        content_type=media_type or "application/octet-stream",
+        project_id=project_id,
+        checksum=checksum,
+        size=size,
+        header=sink.header
+    )
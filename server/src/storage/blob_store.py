@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_DIR = Path(__file__).parent.parent.parent / "data" / "blobs"
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{32,128}$")
+
+
+class BlobWriter:
+    """
+    Écriture incrémentale d'un blob dont la clé n'est connue qu'à la fin:
+    les données sont hachées au fil de l'eau dans un fichier temporaire,
+    puis renommées vers leur emplacement définitif par `commit()`
+    """
+
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self.size = 0
+        self._hasher = hashlib.md5()
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.root, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> str:
+        key = self._hasher.hexdigest()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+        path = self.store.path_for(key)
+        if path.is_file():
+            os.unlink(self._tmp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return key
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+
+class BlobStore:
+    """Stockage sur disque des données d'images, adressé par contenu (checksum)"""
+
+    def __init__(self, root: Path, shard_levels: int = 2, shard_width: int = 2):
+        self.root = Path(root)
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def compute_key(data: bytes) -> str:
+        return hashlib.md5(data).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        """
+        Chemin du blob: <root>/ab/cd/abcdef... pour répartir les fichiers
+        sur plusieurs répertoires
+        """
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+
+        shards = [
+            key[i * self.shard_width:(i + 1) * self.shard_width]
+            for i in range(self.shard_levels)
+        ]
+        return self.root.joinpath(*shards, key)
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).is_file()
+
+    def size(self, key: str) -> int:
+        return self.path_for(key).stat().st_size
+
+    def put(self, data: bytes, key: Optional[str] = None) -> str:
+        """
+        Écrit les données si elles ne sont pas déjà présentes et retourne la clé.
+        Des données identiques partagent donc le même fichier.
+        """
+        key = key or self.compute_key(data)
+        path = self.path_for(key)
+
+        if path.is_file():
+            return key
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            # rename atomique: un lecteur ne voit jamais un blob partiel
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return key
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put_stream(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """Écrit un flux de morceaux sans jamais le charger entièrement en mémoire"""
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.commit(), writer.size
+        except Exception:
+            writer.abort()
+            raise
+
+    def iter_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        with open(self.path_for(key), "rb") as blob_file:
+            while chunk := blob_file.read(chunk_size):
+                yield chunk
+
+    @contextmanager
+    def open(self, key: str) -> Iterator[memoryview]:
+        """Expose le blob via mmap, sans copie, le temps du bloc `with`"""
+        path = self.path_for(key)
+        with open(path, "rb") as blob_file:
+            if os.fstat(blob_file.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+
+            with mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def read(self, key: str) -> bytes:
+        with self.open(key) as view:
+            return bytes(view)
+
+    def delete(self, key: str) -> bool:
+        path = self.path_for(key)
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+
+blob_store = BlobStore(Path(os.getenv("BLOB_STORE_DIR", str(DEFAULT_BLOB_DIR))))
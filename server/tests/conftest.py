@@ -0,0 +1,73 @@
+import base64
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# base, blobs et caches dans un dossier temporaire: à régler avant tout import de src
+_DATA_DIR = Path(tempfile.mkdtemp(prefix="bettergimp-tests-"))
+os.environ.setdefault("DATABASE_DIR", str(_DATA_DIR))
+os.environ.setdefault("BLOB_STORE_DIR", str(_DATA_DIR / "blobs"))
+os.environ.setdefault("PREVIEW_CACHE_DIR", str(_DATA_DIR / "previews"))
+os.environ.setdefault("RESULT_CACHE_DIR", str(_DATA_DIR / "results"))
+os.environ.setdefault("IMPORT_STAGING_DIR", str(_DATA_DIR / "imports"))
+os.environ.setdefault("BACKEND_TABLE_PATH", str(_DATA_DIR / "backends.json"))
+os.environ.setdefault("BACKEND_AUTOTUNE", "off")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import create_app  # noqa: E402
+
+
+def png_bytes(width: int = 64, height: int = 48, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    output = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (height, width, 3), dtype=np.uint8)).save(output, format="PNG")
+    return output.getvalue()
+
+
+class RecordingContext:
+    """JobContext sans base: garde le dernier point de reprise écrit"""
+
+    def __init__(self, checkpoint=None):
+        self.checkpoint = checkpoint
+
+    async def report(self, progress, message=None, checkpoint=None):
+        if checkpoint is not None:
+            self.checkpoint = checkpoint()
+
+    async def save_checkpoint(self, checkpoint):
+        self.checkpoint = checkpoint
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(create_app()) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def project_id(client):
+    response = client.post("/api/projects/", json={"name": "tests", "width": 10, "height": 10})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest.fixture
+def add_image(client):
+    def add(project_id: str, name: str = "image.png", width: int = 64, height: int = 48, seed: int = 0) -> dict:
+        response = client.post(f"/api/projects/{project_id}/images", json={
+            "name": name,
+            "type": "image/png",
+            "data": base64.b64encode(png_bytes(width, height, seed)).decode()
+        })
+        assert response.status_code == 200
+        return response.json()
+    return add
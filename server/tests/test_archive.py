@@ -0,0 +1,116 @@
+import io
+import time
+
+import pytest
+from sqlalchemy import select
+
+from src.models.database import SessionLocal, ImageContentDB
+from src.services.archive_service import stage_archive, import_project_archive, IMPORT_STAGING_DIR
+from src.services.content_service import purge_blob
+from src.services.job_handlers import run_import_job
+from src.services.project_service import ProjectService
+from src.storage.blob_store import blob_store
+
+from tests.conftest import RecordingContext
+
+
+def _export(client, project_id) -> bytes:
+    response = client.get(f"/api/projects/{project_id}/export", params={"format": "zip"})
+    assert response.status_code == 200
+    return response.content
+
+
+def _wait_for_job(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} still {job['status']}")
+
+
+def _archive_of_removed_image(client, project_id, add_image, seed) -> tuple:
+    """Archive d'une image supprimée depuis: son contenu n'est plus dans le blob store"""
+    image = add_image(project_id, "a.png", seed=seed)
+    data = _export(client, project_id)
+    assert client.delete(f"/api/images/{image['id']}").status_code == 200
+    assert not blob_store.exists(image["checksum"])
+    return data, image["checksum"]
+
+
+async def _import(data, on_progress):
+    async with SessionLocal() as db:
+        return await import_project_archive(ProjectService(db), io.BytesIO(data), on_progress=on_progress)
+
+
+async def _content_exists(checksum):
+    async with SessionLocal() as db:
+        return await db.scalar(select(ImageContentDB.checksum).where(ImageContentDB.checksum == checksum)) is not None
+
+
+def test_import_rewrites_a_blob_purged_before_it_was_referenced(client, project_id, add_image):
+    data, checksum = _archive_of_removed_image(client, project_id, add_image, seed=11)
+
+    async def purge_concurrently(done, total):
+        # suppression concurrente du même contenu, entre l'extraction et le commit
+        async with SessionLocal() as db:
+            await purge_blob(db, checksum)
+        assert not blob_store.exists(checksum)
+
+    result = client.portal.call(_import, data, purge_concurrently)
+
+    assert result["imported_images_count"] == 1
+    assert blob_store.exists(checksum)
+    image_id = client.get(f"/api/projects/{result['project'].id}/images").json()["images"][0]["id"]
+    assert client.get(f"/api/images/{image_id}/render").status_code == 200
+
+
+def test_failed_import_removes_the_blobs_it_extracted(client, project_id, add_image):
+    data, checksum = _archive_of_removed_image(client, project_id, add_image, seed=12)
+
+    async def fail(done, total):
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        client.portal.call(_import, data, fail)
+
+    assert not blob_store.exists(checksum)
+    assert not client.portal.call(_content_exists, checksum)
+
+
+def test_background_archive_import_runs_as_a_job(client, project_id, add_image):
+    add_image(project_id, "a.png", seed=1)
+    add_image(project_id, "b.png", seed=2)
+
+    response = client.post(
+        "/api/projects/import/archive",
+        params={"background": "true"},
+        files={"file": ("p.zip", _export(client, project_id), "application/zip")}
+    )
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.json()["id"])
+
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"]["imported_images_count"] == 2
+    imported = client.get(f"/api/projects/{job['result']['project']['id']}").json()
+    assert imported["image_count"] == 2
+    # l'archive en attente est supprimée une fois la tâche terminée
+    assert not (IMPORT_STAGING_DIR / job["payload"]["archive"]).exists()
+
+
+def test_resumed_import_completes_the_project_created_before_interruption(client, project_id, add_image):
+    add_image(project_id, "a.png", seed=3)
+    archive = stage_archive(io.BytesIO(_export(client, project_id)))
+
+    # projet créé puis serveur arrêté avant l'enregistrement des images
+    empty = client.post("/api/projects/", json={"name": "partial", "width": 1, "height": 1}).json()
+    context = RecordingContext({"project_id": empty["id"]})
+    result = client.portal.call(run_import_job, {"archive": archive}, context)
+    assert result["project"]["id"] == empty["id"]
+    assert client.get(f"/api/projects/{empty['id']}").json()["image_count"] == 1
+
+    # images déjà enregistrées: la reprise ne réimporte rien
+    result = client.portal.call(run_import_job, {"archive": archive}, context)
+    assert result["resumed"] is True
+    assert client.get(f"/api/projects/{empty['id']}").json()["image_count"] == 1
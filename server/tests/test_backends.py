@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.services.backend_registry import Backend, BackendRegistry
+from src.services.core_service import CoreImageService, INTERPOLATIONS, BOX_BLUR_MIN_SIGMA, box_blur_sizes
+
+# bruit: le cas où un noyau différent de celui de la référence se voit le plus
+NOISE = np.random.default_rng(0).integers(0, 256, (240, 360, 3), dtype=np.uint8)
+SIZES = [(180, 120), (90, 60), (120, 80), (500, 333)]
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    return CoreImageService(tmp_path_factory.mktemp("backends") / "backends.json")
+
+
+@pytest.mark.parametrize("interpolation", sorted(INTERPOLATIONS))
+@pytest.mark.parametrize("size", SIZES)
+def test_every_resize_candidate_matches_the_reference(service, interpolation, size):
+    reference = service._resize_opencv(NOISE, *size, interpolation).astype(np.int16)
+
+    for name in service.backends.backend_names("resize"):
+        service.backends.set_overrides({"resize": name})
+        result = service.resize_image(NOISE, *size, interpolation).astype(np.int16)
+
+        assert result.shape == reference.shape, name
+        assert np.abs(result - reference).max() <= 1, name
+    service.backends.set_overrides({})
+
+
+def test_pil_reduce_is_only_offered_for_integer_area_reductions(service):
+    def selected(width, height, interpolation):
+        service.backends.set_overrides({"resize": "pil_reduce"})
+        try:
+            return service.backends.select("resize", NOISE, width, height, interpolation).name
+        finally:
+            service.backends.set_overrides({})
+
+    assert selected(180, 120, "area") == "pil_reduce"
+    assert selected(90, 60, "area") == "pil_reduce"
+    for interpolation in ("nearest", "linear", "cubic", "lanczos"):
+        assert selected(180, 120, interpolation) != "pil_reduce"
+    # facteur non entier, agrandissement
+    assert selected(120, 90, "area") != "pil_reduce"
+    assert selected(720, 480, "area") != "pil_reduce"
+
+
+def test_overrides_are_persisted_with_the_table(tmp_path):
+    def registry():
+        backends = BackendRegistry(tmp_path / "backends.json")
+        backends.register("op", Backend("reference", lambda image: image))
+        backends.register("op", Backend("fast", lambda image: image))
+        return backends
+
+    first = registry()
+    first.set_overrides({"op/uint8/small": "fast"})
+    with pytest.raises(ValueError):
+        first.set_overrides({"op": "missing"})
+
+    reloaded = registry()
+    assert reloaded.describe()["overrides"] == {"op/uint8/small": "fast"}
+    assert reloaded.select("op", NOISE).name == "fast"
+    assert reloaded.select("op", np.zeros((2048, 2048), np.uint8)).name == "reference"
+
+
+# mosaïque de blocs contrastés: le pire cas mesuré pour l'approximation par boîtes
+BLOCKS = np.kron(
+    np.random.default_rng(1).integers(0, 256, (12, 12, 3)), np.ones((64, 64, 1))
+).astype(np.uint8)
+
+
+@pytest.mark.parametrize("sigma", [12.0, 30.0, 80.0, 200.0])
+def test_box_blur_widths_add_up_to_the_gaussian_variance(sigma):
+    sizes = box_blur_sizes(sigma)
+
+    assert all(size % 2 == 1 for size in sizes)
+    variance = sum((size * size - 1) / 12 for size in sizes)
+    assert variance == pytest.approx(sigma * sigma, rel=0.05)
+
+
+@pytest.mark.parametrize("image", [BLOCKS, NOISE[:, :240]], ids=["blocks", "noise"])
+@pytest.mark.parametrize("sigma", [BOX_BLUR_MIN_SIGMA + 0.5, 50.0, 200.0])
+def test_box_blur_stays_close_to_the_exact_gaussian(service, image, sigma):
+    result = service.apply_gaussian_blur(image, sigma).astype(np.int16)
+    exact = cv2.GaussianBlur(image, (0, 0), sigma).astype(np.int16)
+
+    difference = np.abs(result - exact)
+    assert difference.mean() <= 1.2
+    assert difference.max() <= 6
+
+
+def test_exact_kernel_is_kept_up_to_the_threshold(service):
+    service.backends.set_overrides({"gaussian_blur": "opencv"})
+    try:
+        result = service.apply_gaussian_blur(BLOCKS, BOX_BLUR_MIN_SIGMA)
+    finally:
+        service.backends.set_overrides({})
+
+    assert np.array_equal(result, service._gaussian_blur_opencv(BLOCKS, BOX_BLUR_MIN_SIGMA))
+
+
+def test_processing_version_follows_overrides_and_blur_settings(service, monkeypatch):
+    from src.services import core_service as core_module
+
+    before = service.processing_version()
+    service.backends.set_overrides({"resize": "opencv"})
+    try:
+        assert service.processing_version() != before
+    finally:
+        service.backends.set_overrides({})
+    assert service.processing_version() == before
+
+    monkeypatch.setattr(core_module, "BOX_BLUR_MIN_SIGMA", 20.0)
+    assert service.processing_version() != before
+
+
+def test_cached_filter_results_are_not_served_after_an_override(client, project_id, add_image):
+    image_id = add_image(project_id, seed=30)["id"]
+    blur = client.app.url_path_for("apply_gaussian_blur")
+    overrides = client.app.url_path_for("set_backend_overrides")
+
+    assert client.post(blur, json={"image_id": image_id, "sigma": 2.0}).headers["x-cache"] == "MISS"
+    assert client.post(blur, json={"image_id": image_id, "sigma": 2.0}).headers["x-cache"] == "HIT"
+
+    assert client.put(overrides, json={"overrides": {"gaussian_blur": "opencv"}}).status_code == 200
+    try:
+        assert client.post(blur, json={"image_id": image_id, "sigma": 2.0}).headers["x-cache"] == "MISS"
+    finally:
+        client.put(overrides, json={"overrides": {}})
@@ -0,0 +1,83 @@
+import numpy as np
+
+from src.services.checkpoint_cache import CheckpointCache, CHECKPOINT_CACHE_BYTES, prefix_keys
+
+MB = 1024 * 1024
+
+
+def _state(megabytes: int = 1, dtype=np.uint8) -> np.ndarray:
+    return np.zeros((megabytes * MB // np.dtype(dtype).itemsize,), dtype)
+
+
+def test_default_budget_holds_the_float32_state_of_a_24_megapixel_photo():
+    state_bytes = 6000 * 4000 * 3 * 4
+    assert CHECKPOINT_CACHE_BYTES >= 2 * state_bytes
+
+
+def test_state_larger_than_the_budget_is_rejected():
+    cache = CheckpointCache(max_bytes=2 * MB)
+    assert not cache.put("source", "big", _state(3), cost_ms=1000)
+    assert cache.stats()["entries"] == 0
+
+
+def test_put_leaves_the_callers_array_writable():
+    cache = CheckpointCache(max_bytes=4 * MB)
+    state = np.full((64, 64, 3), 0.5, np.float32)
+    assert cache.put("source", "key", state, cost_ms=10)
+    assert state.flags.writeable
+
+    _, cached, _ = cache.resume(["key"])
+    assert not cached.flags.writeable
+    assert cached.dtype == np.float32
+
+
+def test_integral_float_states_are_stored_as_uint8_and_restored_exactly():
+    cache = CheckpointCache(max_bytes=4 * MB)
+    state = np.random.default_rng(0).integers(0, 256, (256, 256, 3)).astype(np.float32)
+    assert cache.put("source", "key", state, cost_ms=10)
+    assert cache.stats()["bytes"] == state.size
+
+    _, cached, _ = cache.resume(["key"])
+    assert cached.dtype == np.float32
+    assert np.array_equal(cached, state)
+
+
+def test_nothing_is_evicted_for_a_state_that_cannot_fit():
+    cache = CheckpointCache(max_bytes=3 * MB)
+    assert cache.put("source", "dear", _state(1), cost_ms=500)
+    assert cache.put("source", "cheap", _state(1), cost_ms=5)
+    # il faudrait aussi évincer "dear", qui vaut plus: refus, et "cheap" reste en place
+    assert not cache.put("source", "new", _state(3), cost_ms=60)
+    assert sorted(cache._entries) == ["cheap", "dear"]
+    assert cache.evictions == 0
+
+
+def test_cheapest_state_per_byte_is_evicted_first():
+    cache = CheckpointCache(max_bytes=3 * MB)
+    for key, cost in (("cheap", 5), ("dear", 500), ("mid", 50)):
+        assert cache.put("source", key, _state(1), cost_ms=cost)
+    assert cache.put("source", "new", _state(1), cost_ms=100)
+    assert sorted(cache._entries) == ["dear", "mid", "new"]
+
+
+def test_resume_returns_the_deepest_cached_prefix():
+    cache = CheckpointCache(max_bytes=4 * MB)
+    keys = prefix_keys("source", [("brightness", {"brightness": 10}), ("gaussian_blur", {"sigma": 2}), ("rotate", {"angle": 5})])
+    cache.put("source", keys[0], _state(1), cost_ms=10)
+    cache.put("source", keys[1], _state(1), cost_ms=30)
+
+    start, _, cost = cache.resume(keys)
+    assert (start, cost) == (2, 30)
+
+    changed = prefix_keys("source", [("brightness", {"brightness": 10}), ("gaussian_blur", {"sigma": 3}), ("rotate", {"angle": 5})])
+    assert changed[0] == keys[0] and changed[1:] != keys[1:]
+    assert cache.resume(changed)[0] == 1
+
+
+def test_invalidate_drops_states_of_a_purged_source():
+    cache = CheckpointCache(max_bytes=4 * MB)
+    cache.put("a", "ka", _state(1), cost_ms=10)
+    cache.put("b", "kb", _state(1), cost_ms=10)
+    cache.invalidate("a")
+    assert sorted(cache._entries) == ["kb"]
+    assert cache.stats()["bytes"] == MB
@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from src.services import codec
+from src.services.pipeline_service import PipelineStep, run_pipeline
+from tests.conftest import png_bytes
+
+
+def test_image_format_from_content_type():
+    assert codec.image_format("image/jpg") == "JPEG"
+    assert codec.image_format("image/jpeg") == "JPEG"
+    assert codec.image_format("image/png") == "PNG"
+
+
+def test_decode_converts_to_rgb():
+    output = io.BytesIO()
+    Image.new("RGBA", (8, 6), (10, 20, 30, 128)).save(output, format="PNG")
+
+    decoded = codec.decode(output.getvalue())
+
+    assert decoded.shape == (6, 8, 3)
+    assert decoded.dtype == np.uint8
+
+
+def test_encode_rounds_float_arrays_like_the_pipeline():
+    image = codec.decode(png_bytes(seed=3))
+    step = PipelineStep("affine", gain=1.3, bias=-12.4)
+    state = image.astype(np.float32) * 1.3 - 12.4
+
+    encoded = codec.decode(codec.encode(state, "PNG"))
+
+    assert np.array_equal(encoded, run_pipeline(image, [step]))
+
+
+def test_filter_endpoint_encodes_in_the_source_format(client, project_id, add_image):
+    image_id = add_image(project_id, seed=6)["id"]
+
+    response = client.post(client.app.url_path_for("apply_gaussian_blur"), json={"image_id": image_id, "sigma": 1.5})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert codec.decode(response.content).shape == (48, 64, 3)
@@ -0,0 +1,125 @@
+import pytest
+from sqlalchemy import select
+
+from src.models.database import SessionLocal, ImageContentDB, ImageDB
+from src.models.image import ImageCreate, ImageProcess
+from src.services import image_service
+from src.services.content_service import acquire_contents, commit_contents, compute_checksum, BlobMissing
+from src.services.image_service import ImageService
+from src.services.upload_service import StreamedUpload
+from src.storage.blob_store import blob_store
+from tests.conftest import png_bytes
+
+
+async def _acquire_then_lose_blob(data, rewrite):
+    checksum = compute_checksum(data)
+    async with SessionLocal() as db:
+        contents, errors = await acquire_contents(db, {checksum: data}, {checksum: 1})
+        assert not errors
+        # purge concurrente entre l'acquisition et le commit
+        blob_store.delete(contents[checksum].blob_key)
+        try:
+            await commit_contents(db, {contents[checksum].blob_key: rewrite})
+        except BlobMissing:
+            await db.rollback()
+            raise
+    async with SessionLocal() as db:
+        return await db.scalar(select(ImageContentDB.ref_count).where(ImageContentDB.checksum == checksum))
+
+
+def test_commit_rewrites_a_blob_removed_after_acquisition(client):
+    data = png_bytes(seed=21)
+    checksum = compute_checksum(data)
+
+    ref_count = client.portal.call(_acquire_then_lose_blob, data, lambda: blob_store.put(data, checksum))
+
+    assert ref_count == 1
+    assert blob_store.read(checksum) == data
+
+
+def test_commit_fails_when_a_removed_blob_cannot_be_rewritten(client):
+    data = png_bytes(seed=22)
+
+    with pytest.raises(BlobMissing):
+        client.portal.call(_acquire_then_lose_blob, data, None)
+
+    assert not blob_store.exists(compute_checksum(data))
+
+
+async def _create_from_upload(upload):
+    async with SessionLocal() as db:
+        return await ImageService(db).create_image_from_upload(upload)
+
+
+def test_streamed_upload_purged_before_it_is_referenced_fails(client, project_id):
+    data = png_bytes(seed=23)
+    checksum = blob_store.put(data)
+    upload = StreamedUpload("a.png", "image/png", project_id, checksum, len(data), None)
+    # purge concurrente: le blob n'est encore référencé par aucun contenu
+    blob_store.delete(checksum)
+
+    with pytest.raises(BlobMissing):
+        client.portal.call(_create_from_upload, upload)
+
+    assert client.get(f"/api/projects/{project_id}").json()["image_count"] == 0
+
+
+def test_streamed_upload_is_referenced(client, project_id):
+    response = client.post(
+        "/api/images/upload",
+        params={"filename": "a.png", "project_id": project_id},
+        content=png_bytes(seed=24),
+        headers={"Content-Type": "image/png"}
+    )
+
+    assert response.status_code == 200
+    assert blob_store.exists(response.json()["checksum"])
+
+
+@pytest.fixture
+def purge_before_commit(monkeypatch):
+    """Supprime les blobs donnés juste avant le commit, comme une purge concurrente"""
+    def install(module, checksums):
+        original = module.adjust_project_stats
+
+        async def adjust_then_purge(*args, **kwargs):
+            await original(*args, **kwargs)
+            for checksum in checksums:
+                blob_store.delete(checksum)
+
+        monkeypatch.setattr(module, "adjust_project_stats", adjust_then_purge)
+    return install
+
+
+async def _create_image(data, project_id):
+    async with SessionLocal() as db:
+        return await ImageService(db).create_image(
+            ImageCreate(filename="a.png", content_type="image/png", project_id=project_id, data=data)
+        )
+
+
+async def _save_processed(source_id, data):
+    async with SessionLocal() as db:
+        image_service = ImageService(db)
+        source = await db.get(ImageDB, source_id)
+        process = ImageProcess(operation="brightness", parameters={"brightness": 10})
+        return await image_service.save_processed_images([(source, data, process)])
+
+
+def test_created_image_keeps_a_blob_purged_before_commit(client, project_id, purge_before_commit):
+    data = png_bytes(seed=25)
+    purge_before_commit(image_service, [compute_checksum(data)])
+
+    image = client.portal.call(_create_image, data, project_id)
+
+    assert blob_store.read(image.checksum) == data
+
+
+def test_processed_image_keeps_a_blob_purged_before_commit(client, project_id, add_image, purge_before_commit):
+    source = add_image(project_id, seed=26)
+    data = png_bytes(seed=27)
+    purge_before_commit(image_service, [compute_checksum(data)])
+
+    saved, = client.portal.call(_save_processed, source["id"], data)
+
+    assert blob_store.read(saved.checksum) == data
@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from src.services import edit_service
+from src.services.checkpoint_cache import checkpoint_cache
+from src.services.result_cache import result_cache
+from src.services.content_service import compute_checksum
+from src.storage.blob_store import blob_store
+
+
+def _add_edit(client, image_id, operation="brightness", parameters=None):
+    response = client.post(f"/api/images/{image_id}/process", json={
+        "operation": operation,
+        "parameters": parameters or {"brightness": 20}
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_render_etag_changes_after_flatten_with_the_same_stack(client, project_id, add_image):
+    image_id = add_image(project_id, seed=4)["id"]
+
+    _add_edit(client, image_id)
+    before = client.get(f"/api/images/{image_id}/render")
+    assert before.status_code == 200
+
+    assert client.post(f"/api/images/{image_id}/flatten").json()["flattened"] == 1
+    _add_edit(client, image_id)
+    after = client.get(f"/api/images/{image_id}/render", headers={"If-None-Match": before.headers["etag"]})
+
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.content != before.content
+
+
+def test_render_is_revalidated_while_the_stack_is_unchanged(client, project_id, add_image):
+    image_id = add_image(project_id, seed=5)["id"]
+    _add_edit(client, image_id)
+
+    first = client.get(f"/api/images/{image_id}/render")
+    assert client.get(f"/api/images/{image_id}/render", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    _add_edit(client, image_id, "gaussian_blur", {"sigma": 2})
+    assert client.get(f"/api/images/{image_id}/render", headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+
+def test_render_resumed_from_a_checkpoint_matches_a_render_from_the_original(client, project_id, add_image, monkeypatch):
+    # chaque état est conservé, quel que soit son coût
+    monkeypatch.setattr(edit_service, "CHECKPOINT_MIN_MS", 0.0)
+    image_id = add_image(project_id, width=200, height=150, seed=6)["id"]
+    _add_edit(client, image_id, "gaussian_blur", {"sigma": 3})
+    _add_edit(client, image_id, "brightness", {"brightness": 15})
+    _add_edit(client, image_id, "rotate", {"angle": 12})
+    client.get(f"/api/images/{image_id}/render")
+
+    last = client.get(f"/api/images/{image_id}/edits").json()["edits"][-1]["id"]
+    client.delete(f"/api/images/{image_id}/edits/{last}")
+    _add_edit(client, image_id, "rotate", {"angle": -7})
+    hits = checkpoint_cache.hits
+    resumed = client.get(f"/api/images/{image_id}/render")
+    assert checkpoint_cache.hits == hits + 1
+
+    # rendu complet depuis l'original: plus d'état conservé ni de résultat en cache
+    checkpoint_cache.clear()
+    result_cache.invalidate(client.get(f"/api/images/{image_id}").json()["checksum"])
+    cold = client.get(f"/api/images/{image_id}/render")
+    assert cold.headers["x-cache"] == "MISS"
+
+    decode = lambda response: np.array(Image.open(io.BytesIO(response.content)))
+    assert np.array_equal(decode(resumed), decode(cold))
+
+
+def test_flatten_keeps_a_rendered_blob_purged_before_commit(client, project_id, add_image, monkeypatch):
+    image_id = add_image(project_id, seed=28)["id"]
+    _add_edit(client, image_id, parameters={"brightness": 35})
+    rendered = client.get(f"/api/images/{image_id}/render").content
+    original = edit_service.adjust_project_stats
+
+    async def adjust_then_purge(*args, **kwargs):
+        # purge concurrente du rendu, avant que la ligne de contenu soit validée
+        await original(*args, **kwargs)
+        blob_store.delete(compute_checksum(rendered))
+
+    monkeypatch.setattr(edit_service, "adjust_project_stats", adjust_then_purge)
+    assert client.post(f"/api/images/{image_id}/flatten").json()["flattened"] == 1
+
+    image = client.get(f"/api/images/{image_id}").json()
+    assert blob_store.read(image["checksum"]) == rendered
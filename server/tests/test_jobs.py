@@ -0,0 +1,39 @@
+from src.services.job_handlers import run_batch_job
+
+from tests.conftest import RecordingContext
+
+
+def _image_count(client, project_id):
+    return client.get(f"/api/projects/{project_id}").json()["image_count"]
+
+
+def test_resumed_batch_does_not_process_its_own_results(client, project_id, add_image):
+    for seed in range(3):
+        add_image(project_id, f"source{seed}.png", seed=seed)
+    payload = {"project_id": project_id, "operation": "brightness", "parameters": {"brightness": 10}}
+
+    first = RecordingContext()
+    summary = client.portal.call(run_batch_job, payload, first)
+    assert summary["succeeded"] == 3
+    assert _image_count(client, project_id) == 6
+
+    # redémarrage avant l'écriture du statut final: reprise avec le dernier point enregistré
+    resumed = RecordingContext(first.checkpoint)
+    summary = client.portal.call(run_batch_job, payload, resumed)
+    assert summary["resumed"] == 3
+    assert summary["total"] == 0
+    assert _image_count(client, project_id) == 6
+
+
+def test_interrupted_batch_resumes_with_the_original_sources(client, project_id, add_image):
+    sources = [add_image(project_id, f"source{seed}.png", seed=seed)["id"] for seed in range(2)]
+    payload = {"project_id": project_id, "operation": "brightness", "parameters": {"brightness": 10}}
+
+    # première exécution interrompue après la première image, dont le résultat est déjà enregistré
+    client.portal.call(run_batch_job, {**payload, "project_id": None, "image_ids": sources[:1]}, RecordingContext())
+    checkpoint = {"image_ids": sources, "succeeded": sources[:1]}
+
+    summary = client.portal.call(run_batch_job, payload, RecordingContext(checkpoint))
+    assert summary["resumed"] == 1
+    assert [item["image_id"] for item in summary["items"]] == sources[1:]
+    assert _image_count(client, project_id) == 4
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from src.models.image import ImageProcess
+from src.services.backend_registry import sample_image
+from src.services.pipeline_service import parse_steps, optimize_steps, run_pipeline
+
+SIZE = 512
+
+
+def _steps(*steps):
+    return parse_steps([ImageProcess(operation=operation, parameters=parameters) for operation, parameters in steps])
+
+
+def _difference(steps, approximate=False):
+    image = sample_image(SIZE, "uint8")
+    plan = optimize_steps(steps, (SIZE, SIZE), approximate)
+    reference = run_pipeline(image, steps).astype(np.int16)
+    optimized = run_pipeline(image, plan).astype(np.int16)
+    assert optimized.shape == reference.shape
+    return np.abs(optimized - reference), plan
+
+
+RESIZE = ("resize", {"width": 200, "height": 200, "interpolation": "linear"})
+
+
+@pytest.mark.parametrize("steps", [
+    [("brightness_contrast", {"brightness": 25, "contrast": 1.4}), RESIZE],
+    [("convert_color_space", {"mode": "grayscale"}), RESIZE],
+    [("brightness", {"brightness": -30}), ("convert_color_space", {"mode": "grayscale"}), RESIZE],
+])
+def test_resize_moved_ahead_of_linear_steps_keeps_the_result(steps):
+    difference, plan = _difference(_steps(*steps))
+
+    assert plan[0].operation == "resize"
+    assert difference.max() <= 1
+    assert difference.mean() < 0.01
+
+
+@pytest.mark.parametrize("steps", [
+    [("gaussian_blur", {"sigma": 2.0}), RESIZE],
+    [("unsharp_mask", {"strength": 1.5, "radius": 2.0}), RESIZE],
+])
+def test_resize_stays_after_filters_by_default(steps):
+    difference, plan = _difference(_steps(*steps))
+
+    assert plan[-1].operation == "resize"
+    assert difference.max() == 0
+
+
+@pytest.mark.parametrize("steps", [
+    [("gaussian_blur", {"sigma": 1.5}), ("gaussian_blur", {"sigma": 2.0})],
+    [("brightness_contrast", {"brightness": 10, "contrast": 1.2}), ("levels", {"input_min": 20, "input_max": 230})],
+])
+def test_fused_steps_stay_within_rounding(steps):
+    difference, plan = _difference(_steps(*steps))
+
+    assert len(plan) == 1
+    assert difference.max() <= 1
+
+
+def test_approximate_moves_resize_ahead_of_blur_within_tolerance():
+    steps = _steps(("gaussian_blur", {"sigma": 4.0}), ("resize", {"width": 256, "height": 256}))
+    difference, plan = _difference(steps, approximate=True)
+
+    assert [step.operation for step in plan] == ["resize", "gaussian_blur"]
+    assert plan[1].parameters["sigma"] == pytest.approx(2.0)
+    assert difference.max() <= 3
+    assert difference.mean() < 0.5
+
+
+def test_approximate_keeps_small_blurs_before_the_resize():
+    # sigma 0,8 après réduction: l'écart serait de plusieurs niveaux
+    steps = _steps(("gaussian_blur", {"sigma": 2.0}), RESIZE)
+    _, plan = _difference(steps, approximate=True)
+
+    assert plan[-1].operation == "resize"
+
+
+def test_approximate_never_moves_resize_ahead_of_sharpening():
+    steps = _steps(("unsharp_mask", {"strength": 1.5, "radius": 2.0}), RESIZE)
+    _, plan = _difference(steps, approximate=True)
+
+    assert plan[-1].operation == "resize"
@@ -0,0 +1,69 @@
+import base64
+
+from src.services.project_service import ProjectService
+from tests.conftest import png_bytes
+
+
+def _payload(seed):
+    return {"name": f"{seed}.png", "type": "image/png", "data": base64.b64encode(png_bytes(seed=seed)).decode()}
+
+
+def test_bulk_upload_reports_invalid_images_without_failing_the_batch(client, project_id):
+    response = client.post(f"/api/projects/{project_id}/images/bulk", json={"images": [
+        _payload(40), {"name": "broken.png", "data": "not base64!"}, _payload(41)
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [image["filename"] for image in body["images"]] == ["40.png", "41.png"]
+    assert [failure["index"] for failure in body["failed_images"]] == [1]
+
+
+def test_bulk_upload_validates_its_body(client, project_id):
+    response = client.post(f"/api/projects/{project_id}/images/bulk", json={"images": [{"name": "a.png"}]})
+
+    assert response.status_code == 422
+
+
+def test_bulk_upload_maps_value_errors_to_400(client, project_id, monkeypatch):
+    async def reject(self, project_id, images_data):
+        raise ValueError("Failed to add images: bad input")
+
+    monkeypatch.setattr(ProjectService, "add_images_to_project", reject)
+    response = client.post(f"/api/projects/{project_id}/images/bulk", json={"images": [_payload(42)]})
+
+    assert response.status_code == 400
+
+
+def _walk(client, url, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_project_listing_pages_newest_first_through_the_cursor_header(client):
+    created = [client.post("/api/projects/", json={"name": f"page {n}", "width": 10, "height": 10}).json()["id"] for n in range(3)]
+
+    listed = [project["id"] for page in _walk(client, "/api/projects/", 1) for project in page]
+
+    assert [project_id for project_id in listed if project_id in created] == created[::-1]
+
+
+def test_project_images_page_in_insertion_order_through_the_cursor_header(client, project_id, add_image):
+    added = [add_image(project_id, name=f"{n}.png", seed=50 + n)["id"] for n in range(3)]
+
+    pages = _walk(client, f"/api/projects/{project_id}/images", 1)
+
+    assert all("next_cursor" not in page and len(page["images"]) == 1 for page in pages)
+    assert [image["id"] for page in pages for image in page["images"]] == added
+
+
+def test_invalid_cursor_is_rejected(client, project_id):
+    assert client.get("/api/projects/", params={"cursor": "nope"}).status_code == 400
+    assert client.get(f"/api/projects/{project_id}/images", params={"cursor": "nope"}).status_code == 400